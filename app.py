@@ -12,7 +12,7 @@ logging.basicConfig(
     ]
 )
 
-from flask import Flask, render_template, redirect, url_for, jsonify
+from flask import Flask, render_template, redirect, url_for, jsonify, request
 from blueprints.diagnostics import diagnostics_bp
 from blueprints.domains import domains_bp
 from blueprints.ietf import ietf_bp
@@ -23,12 +23,10 @@ from blueprints.edu_monitor import edu_monitor_bp
 from blueprints.ai import ai_bp
 from blueprints.analytics import analytics_bp
 from blueprints.isp_intelligence import isp_intelligence_bp
+from blueprints.admin import admin_bp
 from services.database_service import db_service
 from services.automation_service import automation_service
-from services.inference_service import inference_service
-
-# Force-clear inference cache on reload/startup
-inference_service.clear_cache()
+from services.query_monitor_service import query_monitor
 
 # Initialize Flask app
 app = Flask(__name__, static_folder='static')
@@ -36,15 +34,11 @@ app = Flask(__name__, static_folder='static')
 # Ensure output directory exists for visualizations
 os.makedirs('static/output', exist_ok=True)
 
-# Initialize MongoDB connection
-logging.info("Initializing MongoDB connection...")
-if db_service.connect():
-    logging.info("[OK] MongoDB Atlas connected successfully")
-    # Start background automation pulse (only in main process to avoid duplicates in debug mode)
-    if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
-        automation_service.start()
-else:
-    logging.warning("[WARN] MongoDB connection failed - services will use JSON fallback")
+# MongoDB is connected lazily by each worker on first use (after gunicorn forks),
+# so importing the app never opens a client that a forked child would inherit.
+# Start background automation pulse (only in main process to avoid duplicates in debug mode)
+if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    automation_service.start()
 
 # Register cleanup handler for graceful shutdown
 def cleanup():
@@ -67,6 +61,17 @@ app.register_blueprint(edu_monitor_bp)
 app.register_blueprint(ai_bp, url_prefix='/api/ai')
 app.register_blueprint(analytics_bp)
 app.register_blueprint(isp_intelligence_bp)
+app.register_blueprint(admin_bp)
+
+# Attribute every MongoDB command to the route that issued it
+@app.before_request
+def begin_query_tracking():
+    # Unmatched URLs (404s, scanners) share one label so the stats stay bounded
+    query_monitor.begin_request(request.endpoint or "<unmatched>")
+
+@app.teardown_request
+def end_query_tracking(exc=None):
+    query_monitor.end_request()
 
 @app.route('/')
 def home():
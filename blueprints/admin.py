@@ -0,0 +1,114 @@
+import os
+import hmac
+import functools
+from flask import Blueprint, jsonify, request
+from services.query_monitor_service import query_monitor
+from services.database_service import db_service
+from services.model_registry_service import model_registry
+from services.cache_backend_service import cache_stats, get_cache
+from services.single_flight_service import coalescing_stats
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+
+def require_admin(view):
+    """Guards admin endpoints with the ADMIN_TOKEN env var; closed when none is configured."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = os.getenv('ADMIN_TOKEN')
+        if not token:
+            return jsonify({"error": "Admin API disabled: ADMIN_TOKEN is not configured"}), 503
+        supplied = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return jsonify({"error": "Admin token required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@admin_bp.route('/query-stats')
+@require_admin
+def get_query_stats():
+    """Per-route MongoDB query histograms collected by the command listener."""
+    return jsonify(query_monitor.get_stats())
+
+
+@admin_bp.route('/query-stats/reset', methods=['POST'])
+@require_admin
+def reset_query_stats():
+    """Clears the collected query statistics."""
+    query_monitor.reset()
+    return jsonify({"status": "reset"})
+
+
+@admin_bp.route('/read-cache')
+@require_admin
+def get_read_cache_stats():
+    """Hit rate, entry counts and invalidation mode of this worker's read cache."""
+    return jsonify(db_service.read_cache.stats())
+
+
+@admin_bp.route('/read-cache/invalidate', methods=['POST'])
+@require_admin
+def invalidate_read_cache():
+    """Drops this worker's cached reads (optionally for one ?collection=)."""
+    db_service.read_cache.invalidate(request.args.get('collection'))
+    return jsonify({"status": "invalidated"})
+
+
+@admin_bp.route('/caches')
+@require_admin
+def get_cache_stats():
+    """Hits, misses, stale entries and evictions per cache namespace (and tier) in this worker."""
+    return jsonify(cache_stats())
+
+
+@admin_bp.route('/caches/<name>/clear', methods=['POST'])
+@require_admin
+def clear_cache(name):
+    """Empties one cache namespace, including its shared tier when one is configured."""
+    if name not in cache_stats():
+        return jsonify({"error": f"Unknown cache: {name}"}), 404
+    get_cache(name).clear()
+    return jsonify({"status": "cleared", "cache": name})
+
+
+@admin_bp.route('/coalescing')
+@require_admin
+def get_coalescing_stats():
+    """Calls per coalesced function in this worker and how many shared an in-flight result."""
+    return jsonify(coalescing_stats())
+
+
+@admin_bp.route('/locks')
+@require_admin
+def get_locks():
+    """Single-flight leases currently held (e.g. a running dashboard rebuild)."""
+    if not db_service.connect():
+        return jsonify({"error": "Database unavailable"}), 503
+    leases = db_service._db[db_service.COLLECTION_REGISTRY["DISTRIBUTED_LOCKS"]].find({})
+    return jsonify([{"name": lease.pop("_id"), **lease} for lease in leases])
+
+
+@admin_bp.route('/models')
+@require_admin
+def get_models():
+    """Published versions per model and the version loaded in this worker."""
+    return jsonify(model_registry.describe())
+
+
+@admin_bp.route('/models/<name>/activate', methods=['POST'])
+@require_admin
+def activate_model(name):
+    """Hot-swaps `name` to the given version (other workers follow within the poll interval)."""
+    if not model_registry.is_registered(name):
+        return jsonify({"error": f"Unknown model: {name}"}), 404
+    version = (request.get_json(silent=True) or {}).get('version') or request.args.get('version')
+    if not version:
+        return jsonify({"error": "version is required"}), 400
+    try:
+        loaded = model_registry.activate(name, version)
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": f"Could not load {name} {version}: {e}"}), 400
+    return jsonify({"status": "activated", "name": name, **loaded.describe()})
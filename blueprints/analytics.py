@@ -10,17 +10,14 @@ from datetime import datetime, timedelta
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
 from services.external_data_service import external_data_service
 from services.asn_intelligence_service import asn_intel_service
+from services.country_profile_service import country_profile_service
+from services.http_cache_service import conditional
 domain_service = APACDomainMonitorService()
 @analytics_bp.route('/benchmarks')
 def get_benchmarks():
     """Returns official IPv6 adoption benchmarks from APNIC, Google, etc."""
     country = request.args.get('country', 'ALL')
-    
-    # Optional: Trigger a background refresh (hydrating the cache)
-    external_data_service.fetch_apnic_data()
-    external_data_service.fetch_google_data()
-    external_data_service.fetch_cloudflare_data()
-    
+    # Pure read: benchmarks are ingested by the scheduled benchmark_refresh job
     return jsonify(external_data_service.get_benchmarks(country))
 
 @analytics_bp.route('/peer-benchmarks')
@@ -29,6 +26,18 @@ def get_peer_benchmarks():
     country = request.args.get('country', 'IN').upper()
     return jsonify(asn_intel_service.get_peer_benchmarks(country))
 
+@analytics_bp.route('/country-profile')
+@conditional([db_service.COLLECTION_REGISTRY["COUNTRY_PROFILES"]])
+def get_country_profile():
+    """One-read country drill-down: national, sector, peer, forecast, ASN and compliance data."""
+    country = request.args.get('country', 'IN').upper()
+    profile = country_profile_service.get(country)
+    if not profile:
+        if not country_profile_service.is_built():
+            return jsonify({"status": "building", "message": "Country profiles are being built; retry shortly"}), 202
+        return jsonify({"error": f"No profile for {country}"}), 404
+    return jsonify(profile)
+
 @analytics_bp.route('/forecast/<sector>')
 def get_forecast(sector):
     """Returns predictive adoption forecast for the given sector and optional country."""
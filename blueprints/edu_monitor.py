@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template, jsonify, request
 from services.edu_monitor_service import APACEduMonitorService
 from services.stats_service import StatsService
+from services.database_service import db_service
+from services.http_cache_service import conditional
+from services.scan_results_service import results_response
 from datetime import datetime
 import logging
 
@@ -14,13 +17,10 @@ def index():
     return render_template('edu_monitor.html')
 
 @edu_monitor_bp.route('/api/results')
+@conditional([db_service.COLLECTION_REGISTRY["EDU_SCANS"]])
 def get_results():
-    """Return the cached campus scan results (optionally filtered by country)."""
-    data = edu_service.get_results()
-    country = request.args.get('country')
-    if country and country.upper() in data:
-        return jsonify({country.upper(): data[country.upper()]})
-    return jsonify(data)
+    """Return the latest scan per domain: grouped by country, a keyset page or an NDJSON stream."""
+    return results_response(edu_service)
 
 @edu_monitor_bp.route('/api/history')
 def get_history():
@@ -38,7 +38,7 @@ def get_stats():
         from services.database_service import db_service
         NAME_MAP = {}
         if db_service.connect():
-            cursor = db_service.country_codes.find({}, {"_id": 0})
+            cursor = db_service.cached_find(db_service.COLLECTION_REGISTRY["COUNTRY_CODES"], {}, {"_id": 0}, copy_result=False)
             NAME_MAP = {c['code']: c['name'] for c in cursor}
             
         if not NAME_MAP:
@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template, jsonify, request
 from services.domain_monitor_service import APACDomainMonitorService
 from services.stats_service import StatsService
+from services.database_service import db_service
+from services.http_cache_service import conditional
+from services.scan_results_service import results_response
 from datetime import datetime
 import logging
 
@@ -14,13 +17,10 @@ def index():
     return render_template('gov_monitor.html')
 
 @gov_monitor_bp.route('/api/results')
+@conditional([db_service.COLLECTION_REGISTRY["GOV_SCANS"]])
 def get_results():
-    """Return the cached scan results (optionally filtered by country)."""
-    data = monitor_service.get_results()
-    country = request.args.get('country')
-    if country and country.upper() in data:
-        return jsonify({country.upper(): data[country.upper()]})
-    return jsonify(data)
+    """Return the latest scan per domain: grouped by country, a keyset page or an NDJSON stream."""
+    return results_response(monitor_service)
 
 @gov_monitor_bp.route('/api/history')
 def get_history():
@@ -38,7 +38,7 @@ def get_stats():
         from services.database_service import db_service
         NAME_MAP = {}
         if db_service.connect():
-            cursor = db_service.country_codes.find({}, {"_id": 0})
+            cursor = db_service.cached_find(db_service.COLLECTION_REGISTRY["COUNTRY_CODES"], {}, {"_id": 0}, copy_result=False)
             NAME_MAP = {c['code']: c['name'] for c in cursor}
         
         if not NAME_MAP:
@@ -83,15 +83,10 @@ def compare():
     if not id1 or not id2:
         return jsonify({"error": "Two entities required for comparison"}), 400
 
-    # Get Domain readiness scores
-    gov_stats = monitor_service.get_detailed_stats().get('ranking', [])
-    
-    # Get National adoption stats
-    nat_stats_all = stats_service.get_all_apac_ipv6_stats()
-
     def get_combined_data(cid):
-        domain_item = next((x for x in gov_stats if x['country'] == cid), {})
-        nat_item = nat_stats_all.get(cid, {})
+        # Indexed lookups: cached ranking row + the single country's national stats
+        domain_item = monitor_service.get_country_ranking(cid) or {}
+        nat_item = stats_service.get_apac_ipv6_stats(cid) or {}
         
         return {
             "id": cid,
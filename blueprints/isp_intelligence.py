@@ -1,28 +1,36 @@
 from flask import Blueprint, render_template, jsonify, request
 from services.asn_intelligence_service import asn_intel_service
 from services.database_service import db_service
+from services.http_cache_service import conditional
 
 isp_intelligence_bp = Blueprint('isp_intelligence', __name__)
 
 @isp_intelligence_bp.route('/api/asn')
+@conditional([db_service.COLLECTION_REGISTRY[k] for k in
+              ("ASN_REGISTRY", "ASN_ORGANIZATIONS", "ASN_READINESS", "BGP_TOPOLOGY", "ASN_DIRECTORY")])
 def get_asn_list():
     """
     Standardized API for Country-wise ASN List with server-side pagination.
     GET /api/asn?country=IN&page=1&per_page=25&filter=all&search=reliance
+    Pass the previous response's next_cursor as &cursor= for a keyset page.
     """
     country = request.args.get('country', 'IN').upper()
     filter_type = request.args.get('filter', 'all')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 25, type=int)
     search = request.args.get('search', None)
+    cursor = request.args.get('cursor') or None
     
     # Clamp per_page to prevent abuse
-    per_page = min(per_page, 100)
+    per_page = max(1, min(per_page, 100))
     page = max(page, 1)
     
-    result = asn_intel_service.get_country_directory(
-        country, filter_type, page=page, per_page=per_page, search=search
-    )
+    try:
+        result = asn_intel_service.get_country_directory(
+            country, filter_type, page=page, per_page=per_page, search=search, cursor=cursor
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
     
     # Serialize _id fields for JSON
     for d in result.get('data', []):
@@ -33,6 +41,20 @@ def get_asn_list():
             
     return jsonify(result)
 
+@isp_intelligence_bp.route('/api/asn/search')
+def search_asns():
+    """
+    Typeahead over ASN numbers and organization names (in-memory index).
+    GET /api/asn/search?q=reli&country=IN&limit=10
+    """
+    from services.asn_search_service import asn_search_service
+    query = request.args.get('q', '').strip()
+    country = request.args.get('country') or None
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    if not query:
+        return jsonify({"query": query, "results": []})
+    return jsonify({"query": query, "results": asn_search_service.search(query, country, limit)})
+
 @isp_intelligence_bp.route('/api/asn/bgp')
 def get_asn_bgp_details():
     """
@@ -53,6 +75,39 @@ def get_asn_bgp_details():
         "resilience": resilience
     })
 
+@isp_intelligence_bp.route('/api/asn/bgp/dependencies')
+def get_asn_bgp_dependencies():
+    """
+    Transitive upstream dependencies of an ASN, or the shortest upstream path to a target.
+    GET /api/asn/bgp/dependencies?asn=55836&depth=3
+    GET /api/asn/bgp/dependencies?asn=55836&target=3356
+    """
+    from services.bgp_intelligence_service import bgp_intel_service
+    asn = request.args.get('asn')
+    if not asn:
+        return jsonify({"error": "ASN required"}), 400
+
+    target = request.args.get('target')
+    if target:
+        return jsonify({"asn": asn, "target": target, "path": bgp_intel_service.get_dependency_path(asn, target)})
+
+    depth = request.args.get('depth', type=int)
+    return jsonify({"asn": asn, "upstreams": bgp_intel_service.get_transitive_upstreams(asn, depth)})
+
+@isp_intelligence_bp.route('/api/asn/bgp/upstream-counts')
+def get_asn_bgp_upstream_counts():
+    """
+    Direct upstream counts for a batch of ASNs.
+    GET /api/asn/bgp/upstream-counts?asns=55836,9498,4755
+    """
+    from services.bgp_intelligence_service import bgp_intel_service
+    raw = [a.strip().upper().replace('AS', '') for a in request.args.get('asns', '').split(',')]
+    asns = [int(a) for a in raw if a.isdigit()][:500]
+    if not asns:
+        return jsonify({"error": "ASN list required"}), 400
+    counts = bgp_intel_service.get_upstream_counts(asns)
+    return jsonify({"counts": {str(asn): count for asn, count in counts.items()}})
+
 @isp_intelligence_bp.route('/isp-explorer')
 def index():
     """Renders the main ISP Intelligence Dashboard."""
@@ -3,6 +3,11 @@ import logging
 from services.stats_service import StatsService
 from services.registry_service import RegistryService
 from services.ml_sector_service import ml_sector_service
+from services.database_service import db_service
+from services.map_payload_service import map_payload_service, GEO_PAYLOAD, MAP_PAYLOAD
+from services.http_cache_service import variant_response, conditional
+from services.model_registry_service import model_data_version_key, ADOPTION_MODEL
+from services.single_flight_service import refresh_in_background
 from visualization import generate_lab_visualizations
 
 lab_bp = Blueprint('lab', __name__, url_prefix='/lab')
@@ -24,8 +29,8 @@ def get_countries():
     try:
         from services.database_service import db_service
         if db_service.connect():
-            cursor = db_service.country_codes.find({}, {"_id": 0, "last_updated": 0})
-            codes = list(cursor)
+            codes = db_service.cached_find(db_service.COLLECTION_REGISTRY["COUNTRY_CODES"],
+                                           {}, {"_id": 0, "last_updated": 0}, copy_result=False)
             if codes:
                 return jsonify({"apac_codes": codes})
 
@@ -35,13 +40,28 @@ def get_countries():
         return jsonify({'error': str(e)}), 500
 
 
+def _serve_payload(payload_id):
+    """Pre-compressed map payload (304 when current); None until the first build, which is kicked off here."""
+    payload = map_payload_service.get(payload_id)
+    if payload is None:
+        refresh_in_background("map_payload_build", map_payload_service.build, ttl=600)
+        return None
+    return variant_response(payload["variants"], payload["etag"], cache_control="no-cache",
+                            extra_headers={"X-Payload-Built-At": payload.get("built_at") or ""})
+
+
 @lab_bp.route('/api/map/countries.geo.json')
 def get_map_data():
-    """Serves GeoJSON map data from MongoDB with local JSON fallback."""
+    """Serves the simplified GeoJSON map payload, falling back to the raw document from MongoDB."""
     try:
+        response = _serve_payload(GEO_PAYLOAD)
+        if response is not None:
+            return response
+
         from services.database_service import db_service
         if db_service.connect():
-            map_doc = db_service.geojson_map.find_one({"id": "countries_map"})
+            map_doc = db_service.cached_find_one(db_service.COLLECTION_REGISTRY["GEOJSON_MAP"],
+                                                 {"id": "countries_map"}, copy_result=False)
             if map_doc and "data" in map_doc:
                 return jsonify(map_doc["data"])
 
@@ -51,6 +71,27 @@ def get_map_data():
         return jsonify({"error": str(e)}), 500
 
 
+@lab_bp.route('/api/map/payload.json')
+def get_map_payload():
+    """GeoJSON and all APAC stats in one pre-compressed, versioned response for the map pages."""
+    try:
+        response = _serve_payload(MAP_PAYLOAD)
+        if response is not None:
+            return response
+
+        from services.database_service import db_service
+        if db_service.connect():
+            map_doc = db_service.cached_find_one(db_service.COLLECTION_REGISTRY["GEOJSON_MAP"],
+                                                 {"id": "countries_map"}, copy_result=False)
+            if map_doc and "data" in map_doc:
+                return jsonify({"geo": map_doc["data"], "stats": stats_service.get_all_apac_ipv6_stats()})
+
+        return jsonify({"error": "GeoJSON map data not available in database"}), 500
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @lab_bp.route('/api/apac/ipv6')
 def get_ipv6_stats():
     """
@@ -75,6 +116,9 @@ def get_ipv6_stats():
 
 
 @lab_bp.route('/api/apac/all_stats')
+@conditional([db_service.COLLECTION_REGISTRY[k] for k in ("APAC_STATS", "APAC_AI_STATS",
+                                                 "EXTERNAL_STATS", "EXTERNAL_LATEST")]
+             + [model_data_version_key(ADOPTION_MODEL)])
 def get_all_apac_stats():
     """
     Internal Lab API: Returns ALL normalized stats for map coloring.
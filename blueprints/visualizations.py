@@ -1,23 +1,26 @@
 from flask import Blueprint, render_template, send_from_directory
 from services.dashboard_cache_service import dashboard_cache_service
+from services.database_service import db_service
+from services.http_cache_service import conditional
+from services.model_registry_service import model_data_version_key, ADOPTION_MODEL
 import logging
+import time
 
 visualizations_bp = Blueprint('visualizations', __name__)
 
 @visualizations_bp.route('/')
+# The header shows the stats age in minutes, so the page also varies per minute
+@conditional([db_service.COLLECTION_REGISTRY[k] for k in
+              ("DASHBOARD_CACHE", "APAC_STATS", "APAC_AI_STATS", "EXTERNAL_STATS", "EXTERNAL_LATEST")]
+             + [model_data_version_key(ADOPTION_MODEL)], key_func=lambda: int(time.time() // 60))
 def index():
     # Fetch metrics based on the selected country or default to India (IN)
     from flask import request
     country = (request.args.get('country') or 'IN').upper()
 
     # --- Fast Path: Read pre-computed dashboard cache (1 DB read) ---
-    cached = dashboard_cache_service.get_cached_dashboard()
-
-    if not cached:
-        # First-ever load or cache was cleared — rebuild synchronously (one-time cost)
-        logging.warning("[CACHE] Dashboard cache miss — rebuilding synchronously...")
-        dashboard_cache_service.rebuild_cache()
-        cached = dashboard_cache_service.get_cached_dashboard()
+    # On a miss the last-good snapshot is served while a single worker rebuilds
+    cached = dashboard_cache_service.get_dashboard()
 
     if cached:
         health_data = cached.get('health', {"score": 0, "status": "Loading", "yoy_growth": 0})
@@ -7,6 +7,7 @@ import logging
 sys.path.append(os.getcwd())
 
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
 
 # Configure logging
 logging.basicConfig(
@@ -37,10 +38,9 @@ def ingest_asn_registry(file_path):
     logging.info(f"🚀 Starting ingestion from {file_path}...")
     
     count = 0
-    updated = 0
     now = datetime.now()
 
-    with open(file_path, 'r', encoding='utf-8') as f:
+    with open(file_path, 'r', encoding='utf-8') as f, BulkWriter(col, label="asn registry") as writer:
         for line in f:
             if line.startswith('#') or not line.strip():
                 continue
@@ -86,7 +86,7 @@ def ingest_asn_registry(file_path):
                 # Upsert logic
                 # We use $setOnInsert for things that shouldn't change
                 # And $set for things that can be updated
-                result = col.update_one(
+                writer.update(
                     {"asn": asn_number},
                     {
                         "$set": asn_doc,
@@ -106,16 +106,13 @@ def ingest_asn_registry(file_path):
                 )
                 
                 count += 1
-                if result.upserted_id:
-                    updated += 1
-                
-                if count % 100 == 0:
+                if count % 1000 == 0:
                     logging.info(f"Processed {count} ASNs...")
 
             except ValueError:
                 continue
 
-    logging.info(f"✅ Ingestion Complete. Total: {count}, New: {updated}")
+    logging.info(f"✅ Ingestion Complete. Total: {count}, New: {writer.stats()['upserted']}")
 
 if __name__ == "__main__":
     registry_file = os.path.join("ASN", "delegated-apnic-latest")
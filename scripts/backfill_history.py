@@ -8,6 +8,7 @@ import random
 sys.path.append(os.getcwd())
 
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
 
 def backfill_history():
     """
@@ -88,21 +89,18 @@ def backfill_history():
 
     print(f"Upserting {len(all_records)} historical records...")
     
-    count = 0
-    for record in all_records:
-        query = {
-            "date": record["date"],
-            "sector": record["sector"]
-        }
-        if "country" in record:
-            query["country"] = record["country"]
-            
-        history_col.update_one(query, {"$set": record}, upsert=True)
-        count += 1
-        if count % 100 == 0:
-            print(f"Processed {count} records...")
+    with BulkWriter(history_col, label="history backfill") as writer:
+        for record in all_records:
+            query = {
+                "date": record["date"],
+                "sector": record["sector"],
+                # Regional snapshots are the ones without a country
+                "country": record.get("country", {"$exists": False})
+            }
+            writer.update(query, {"$set": record}, upsert=True)
 
-    print(f"\n[OK] Backfill complete! {count} historical snapshots updated.")
+    stats = writer.stats()
+    print(f"\n[OK] Backfill complete! {stats['ops']} historical snapshots updated ({stats['ops_per_sec']} ops/s).")
     print("The dashboard will now show dynamic YoY growth and Forecast milestones.")
 
 if __name__ == "__main__":
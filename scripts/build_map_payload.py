@@ -0,0 +1,41 @@
+import os
+import sys
+import argparse
+import logging
+
+# Ensure project root is in path
+sys.path.append(os.getcwd())
+
+from services.database_service import db_service
+from services.map_payload_service import map_payload_service
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def build_map_payload(force=False):
+    """
+    Builds the simplified, pre-compressed map payloads offline. The scheduler
+    does the same whenever the GeoJSON, stats or adoption model change.
+    """
+    if not db_service.connect():
+        logging.error("[ERROR] Database connection failed")
+        return 1
+
+    written = map_payload_service.build(force=force)
+    if written:
+        for payload_id in written:
+            doc = db_service._db[db_service.COLLECTION_REGISTRY["MAP_PAYLOADS"]].find_one(
+                {"_id": payload_id}, {"etag": 1, "sizes": 1})
+            sizes = ", ".join(f"{k}={v / 1024:.1f}KB" for k, v in (doc or {}).get("sizes", {}).items())
+            logging.info(f"[OK] {payload_id} {doc.get('etag') if doc else ''}: {sizes}")
+    else:
+        logging.info("[OK] Map payloads already current, nothing to do")
+    db_service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds the precomputed APAC map payloads.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the inputs are unchanged")
+    args = parser.parse_args()
+    sys.exit(build_map_payload(force=args.force))
@@ -0,0 +1,40 @@
+import os
+import sys
+import argparse
+import logging
+
+# Ensure project root is in path
+sys.path.append(os.getcwd())
+
+from services.database_service import db_service
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def ensure_indexes(force=False):
+    """
+    Applies the index spec once for a deployment. Web workers skip the build
+    when system_metadata already records the current INDEX_SPEC_VERSION.
+    """
+    db_service.auto_index = False
+    if not db_service.connect():
+        logging.error("[ERROR] Database connection failed")
+        return 1
+
+    failed = db_service.ensure_indexes(force=force)
+    db_service.close()
+    if failed is None:
+        logging.info(f"[OK] Index spec v{db_service.INDEX_SPEC_VERSION} already applied, nothing to do")
+    elif failed:
+        logging.error(f"[ERROR] Index spec v{db_service.INDEX_SPEC_VERSION} not applied, failed: {', '.join(failed)}")
+        return 1
+    else:
+        logging.info(f"[OK] Index spec v{db_service.INDEX_SPEC_VERSION} applied")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds MongoDB indexes once per deployment.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the spec version is current")
+    args = parser.parse_args()
+    sys.exit(ensure_indexes(force=args.force))
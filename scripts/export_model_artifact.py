@@ -0,0 +1,35 @@
+import sys
+import os
+import argparse
+sys.path.append(os.getcwd())
+import joblib
+from services.model_artifact_service import LinearModelArtifact, is_linear_estimator
+
+# Converts an already trained pickle into the coefficient artifact served by
+# IPv6InferenceService (new trainings export it directly).
+FEATURES = ["APNIC", "Google", "Cloudflare", "IPv6_Pulse"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a linear model pickle as a JSON coefficient artifact")
+    parser.add_argument("--model", default="models/ipv6_adoption_model.pkl")
+    parser.add_argument("--out", default="models/ipv6_adoption_model.json")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    if not is_linear_estimator(model):
+        print(f"{type(model).__name__} is not a linear model; keep serving the pickle.")
+        return 1
+
+    features = list(getattr(model, "feature_names_in_", FEATURES))
+    artifact = LinearModelArtifact.from_estimator(model, features, metadata={"source_pickle": args.model})
+    artifact.save(args.out)
+    print(f"Coefficient artifact {artifact.version} saved -> {args.out}")
+    for feat, coef in zip(artifact.features, artifact.coefficients):
+        print(f"  {feat:12}: {coef:+.6f}")
+    print(f"  {'intercept':12}: {artifact.intercept:+.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,8 @@ import os
 sys.path.append(os.getcwd())
 
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+from services.asn_directory_service import asn_directory_service
 
 # Configure logging
 logging.basicConfig(
@@ -68,9 +70,10 @@ def fetch_apnic_labs_data():
     
     # 4. Parse CSV
     logging.info("   - Parsing CSV stream...")
-    ipv6_docs = []
     reader = csv.reader(io.StringIO(csv_text))
     matched = 0
+    db[staging_coll].create_index([("asn", 1)], unique=True)
+    writer = BulkWriter(db[staging_coll], label="asn readiness staging")
     
     for row in reader:
         if not row or len(row) < 4: continue
@@ -83,7 +86,7 @@ def fetch_apnic_labs_data():
             if asn not in allowed_asns: continue
                 
             v6_score = float(row[3])
-            ipv6_docs.append({
+            writer.insert({
                 "asn": asn,
                 "ipv6_percentage": v6_score, # Legacy field for backwards compatibility
                 "ipv6_capable": v6_score,    # Schema field
@@ -93,18 +96,17 @@ def fetch_apnic_labs_data():
             })
             matched += 1
         except: continue
+    writer.close()
             
-    # 5. Insert into Staging and Atomic Swap
-    if ipv6_docs:
-        db[staging_coll].create_index([("asn", 1)], unique=True)
-        db[staging_coll].insert_many(ipv6_docs)
-        
+    # 5. Atomic Swap (documents were streamed into staging while parsing)
+    if matched:
         # Determine the target registry key
         # We'll use ASN_READINESS which maps to asn_ipv6_readiness
         target_key = "ASN_READINESS"
         
         if db_service.swap_collection(staging_coll, target_key):
             logging.info(f"[SUCCESS] IPv6 Scores updated atomically ({matched} ASNs).")
+            asn_directory_service.refresh()
         else:
             logging.error("[ERROR] FAILED: Atomic swap failed.")
     else:
@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+# Ensure project root is in path
+sys.path.append(os.getcwd())
+
+from services.database_service import db_service
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+_TODAY = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+_YEAR_AGO = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
+
+# Catalogue of the platform's hot queries, mirroring the shapes issued by the
+# services and blueprints. Keep this in sync when a new query shape is added.
+QUERY_CATALOGUE = [
+    # --- Monitor services ---
+    {"name": "gov latest scan per domain", "collection": "gov_scans", "kind": "aggregate",
+     "pipeline": [{"$sort": {"checked_at": -1}}, {"$group": {"_id": "$domain", "latest": {"$first": "$$ROOT"}}}]},
+    {"name": "edu latest scan per domain", "collection": "edu_scans", "kind": "aggregate",
+     "pipeline": [{"$sort": {"checked_at": -1}}, {"$group": {"_id": "$domain", "latest": {"$first": "$$ROOT"}}}]},
+    {"name": "gov domain scan history", "collection": "gov_scans", "kind": "find",
+     "filter": {"domain": "india.gov.in"}, "sort": [("checked_at", -1)]},
+    {"name": "gov ready count per country", "collection": "gov_scans", "kind": "count",
+     "filter": {"country": "IN", "ipv6_web": True, "ipv6_dns": True}},
+    {"name": "edu sector average per country", "collection": "edu_scans", "kind": "aggregate",
+     "pipeline": [{"$match": {"country": "IN"}},
+                  {"$group": {"_id": None, "avg": {"$avg": {"$cond": [{"$eq": ["$ipv6_web", True]}, 100, 0]}}}}]},
+    {"name": "gov active domains", "collection": "gov_domains", "kind": "count", "filter": {"country": "IN"}},
+    {"name": "gov domains keyset page", "collection": "gov_domains", "kind": "find",
+     "filter": {"country": "IN", "domain": {"$gt": "india.gov.in"}}, "sort": [("domain", 1)], "limit": 500},
+    {"name": "gov latest scans of a domain batch", "collection": "gov_scans", "kind": "aggregate",
+     "pipeline": [{"$match": {"domain": {"$in": ["india.gov.in", "mygov.in"]}}},
+                  {"$sort": {"domain": 1, "checked_at": -1}},
+                  {"$group": {"_id": "$domain", "latest": {"$first": "$$ROOT"}}}]},
+
+    # --- History / forecasting ---
+    {"name": "gov regional history", "collection": "history_logs", "kind": "find",
+     "filter": {"sector": "government", "country": {"$exists": False}}, "sort": [("date", 1)]},
+    {"name": "gov country history", "collection": "history_logs", "kind": "find",
+     "filter": {"sector": "government", "country": "IN"}, "sort": [("date", 1)]},
+    {"name": "daily snapshot upsert", "collection": "history_logs", "kind": "find",
+     "filter": {"date": _TODAY.strftime("%Y-%m-%d"), "sector": "government", "country": "IN"}},
+    {"name": "historical rate per country", "collection": "history_logs", "kind": "aggregate",
+     "pipeline": [{"$match": {"date": {"$lte": _YEAR_AGO}, "sector": "government"}},
+                  {"$sort": {"date": -1}},
+                  {"$group": {"_id": "$country", "historical_rate": {"$first": "$rate"}}}]},
+    {"name": "regional aggregate logs", "collection": "history_logs", "kind": "find",
+     "filter": {"sector": "government", "type": "regional_aggregate"}, "sort": [("date", -1)]},
+
+    # --- External benchmarks ---
+    {"name": "benchmarks for one country", "collection": "external_ipv6_stats", "kind": "find",
+     "filter": {"country": "IN"}, "sort": [("timestamp", -1)]},
+    {"name": "benchmarks for all countries", "collection": "external_ipv6_stats", "kind": "find",
+     "filter": {}, "sort": [("timestamp", -1)]},
+    {"name": "latest benchmark per source/country", "collection": "external_ipv6_stats", "kind": "find",
+     "filter": {"source": "Google", "country": "IN"}, "sort": [("timestamp", -1)], "limit": 1},
+    {"name": "daily source refresh", "collection": "external_ipv6_stats", "kind": "find",
+     "filter": {"source": "Google", "date": _TODAY.strftime("%Y-%m-%d")}},
+
+    # --- Community submissions ---
+    {"name": "submission rate limit", "collection": "community_submissions", "kind": "count",
+     "filter": {"ip_address": "203.0.113.7", "submitted_at": {"$gte": _TODAY.isoformat()}}},
+    {"name": "submission duplicate check", "collection": "community_submissions", "kind": "find",
+     "filter": {"domain": "example.edu.in"}, "limit": 1},
+
+    # --- ASN / BGP intelligence ---
+    {"name": "asn registry by country", "collection": "asn_registry", "kind": "find",
+     "filter": {"country": "IN"}},
+    {"name": "org name by asn", "collection": "asn_organizations", "kind": "find",
+     "filter": {"asn": 55836}, "limit": 1},
+    {"name": "top readiness by samples", "collection": "asn_ipv6_readiness", "kind": "find",
+     "filter": {}, "sort": [("sample_count", -1)], "limit": 50},
+    {"name": "bgp upstreams", "collection": "bgp_topology", "kind": "find",
+     "filter": {"downstream_asn": 55836}},
+    {"name": "bgp downstreams", "collection": "bgp_topology", "kind": "find",
+     "filter": {"upstream_asn": 55836}},
+    {"name": "asn directory page", "collection": "asn_directory", "kind": "find",
+     "filter": {"country": "IN", "ipv6_percentage": {"$gte": 50}},
+     "sort": [("ipv6_percentage", -1), ("asn", 1)], "limit": 26},
+    {"name": "asn directory keyset page", "collection": "asn_directory", "kind": "find",
+     "filter": {"country": "IN", "$or": [{"ipv6_percentage": {"$lt": 42.5}},
+                                         {"ipv6_percentage": 42.5, "asn": {"$gt": 55836}}]},
+     "sort": [("ipv6_percentage", -1), ("asn", 1)], "limit": 26},
+
+    # --- Reference data ---
+    {"name": "apac stats by country", "collection": "apac_ipv6_normalized", "kind": "find",
+     "filter": {"country_code": "IN"}, "limit": 1},
+    {"name": "dashboard snapshot", "collection": "dashboard_cache", "kind": "find",
+     "filter": {"key": "dashboard_snapshot"}, "limit": 1},
+]
+
+
+def _explain(db, entry):
+    """Runs explain() for a catalogue entry and returns the winning plan tree."""
+    coll = entry["collection"]
+    kind = entry["kind"]
+
+    if kind == "aggregate":
+        result = db.command("aggregate", coll, pipeline=entry["pipeline"], explain=True)
+    elif kind == "count":
+        result = db.command("explain", {"count": coll, "query": entry.get("filter", {})},
+                            verbosity="queryPlanner")
+    else:
+        cursor = db[coll].find(entry.get("filter", {}))
+        if entry.get("sort"):
+            cursor = cursor.sort(entry["sort"])
+        if entry.get("limit"):
+            cursor = cursor.limit(entry["limit"])
+        result = cursor.explain()
+    return result
+
+
+def _collect_plan_nodes(node, found):
+    """Walks an explain() document and collects every plan stage and index name."""
+    if isinstance(node, dict):
+        stage = node.get("stage")
+        if stage:
+            found["stages"].add(stage)
+            if node.get("indexName"):
+                found["indexes"].add(node["indexName"])
+        for value in node.values():
+            _collect_plan_nodes(value, found)
+    elif isinstance(node, list):
+        for item in node:
+            _collect_plan_nodes(item, found)
+
+
+def analyze_catalogue(db):
+    """Explains every catalogued query and flags collection scans and in-memory sorts."""
+    report = []
+    used_indexes = {}
+
+    existing = set(db.list_collection_names())
+    for entry in QUERY_CATALOGUE:
+        coll = entry["collection"]
+        row = {"name": entry["name"], "collection": coll, "issues": [], "indexes": []}
+
+        if coll not in existing:
+            row["issues"].append("collection missing")
+            report.append(row)
+            continue
+
+        try:
+            explain = _explain(db, entry)
+        except Exception as e:
+            row["issues"].append(f"explain failed: {e}")
+            report.append(row)
+            continue
+
+        found = {"stages": set(), "indexes": set()}
+        # Only the winning plans matter; rejected plans would produce false positives
+        explain.pop("rejectedPlans", None)
+        if "queryPlanner" in explain:
+            explain["queryPlanner"].pop("rejectedPlans", None)
+        _collect_plan_nodes(explain, found)
+
+        if "COLLSCAN" in found["stages"]:
+            row["issues"].append("COLLSCAN")
+        if "SORT" in found["stages"]:
+            row["issues"].append("in-memory SORT")
+
+        row["indexes"] = sorted(found["indexes"])
+        used_indexes.setdefault(coll, set()).update(found["indexes"])
+        report.append(row)
+
+    return report, used_indexes
+
+
+def find_unused_indexes(db, used_indexes):
+    """
+    Lists indexes that no catalogued query uses and that the server reports
+    zero accesses for since the last restart ($indexStats).
+    """
+    unused = []
+    for coll in sorted(used_indexes):
+        try:
+            stats = list(db[coll].aggregate([{"$indexStats": {}}]))
+        except Exception as e:
+            logging.warning(f"$indexStats unavailable for {coll}: {e}")
+            continue
+
+        for idx in stats:
+            name = idx.get("name")
+            if name == "_id_" or name in used_indexes[coll]:
+                continue
+            ops = idx.get("accesses", {}).get("ops", 0)
+            if ops == 0:
+                unused.append({"collection": coll, "index": name, "ops": ops})
+    return unused
+
+
+def run_advisor(as_json=False):
+    if not db_service.connect():
+        logging.error("[ERROR] Database connection failed")
+        return 1
+
+    db = db_service._db
+    report, used_indexes = analyze_catalogue(db)
+    unused = find_unused_indexes(db, used_indexes)
+    flagged = [r for r in report if r["issues"]]
+
+    if as_json:
+        print(json.dumps({"queries": report, "unused_indexes": unused}, indent=2))
+    else:
+        print("\n--- Query Plan Review ---")
+        for r in report:
+            status = "OK  " if not r["issues"] else "WARN"
+            detail = ", ".join(r["issues"]) if r["issues"] else ", ".join(r["indexes"]) or "-"
+            print(f"[{status}] {r['collection']:24} {r['name']:40} {detail}")
+
+        print("\n--- Unused Indexes ---")
+        if not unused:
+            print("None")
+        for u in unused:
+            print(f"[WARN] {u['collection']:24} {u['index']}")
+
+        print(f"\n{len(flagged)} of {len(report)} catalogued queries need attention, "
+              f"{len(unused)} unused indexes.")
+
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replays the query catalogue through explain() and reports index usage.")
+    parser.add_argument("--json", action="store_true", help="Emit a machine-readable report")
+    args = parser.parse_args()
+    sys.exit(run_advisor(as_json=args.json))
@@ -6,6 +6,8 @@ import logging
 from datetime import datetime
 from dotenv import load_dotenv
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+from services.asn_directory_service import asn_directory_service
 
 # Load Environment Variables
 load_dotenv()
@@ -62,13 +64,13 @@ def ingest():
     # 2. PARSE REGISTRY (APNIC)
     logging.info("Step 2: Parsing APNIC Registry...")
     target_asns = set()
-    registry_docs = []
 
     if not os.path.exists(APNIC_FILE):
         logging.error(f"Missing File: {APNIC_FILE}")
         return
 
-    with open(APNIC_FILE, 'r', encoding='utf-8') as f:
+    with open(APNIC_FILE, 'r', encoding='utf-8') as f, \
+            BulkWriter(db[staging["registry"]], label="registry staging") as registry_writer:
         for line in f:
             if line.startswith('#') or not line.strip():
                 continue
@@ -83,31 +85,30 @@ def ingest():
                     for i in range(count):
                         current_asn = start_asn + i
                         target_asns.add(current_asn)
-                        registry_docs.append({
+                        registry_writer.insert({
                             "asn": current_asn,
                             "country": cc,
                             "source": "APNIC"
                         })
                 except: continue
 
-    if registry_docs:
-        db[staging["registry"]].insert_many(registry_docs)
-        logging.info(f"✓ Inserted {len(registry_docs)} ASNs into STAGING registry")
+    if target_asns:
+        logging.info(f"✓ Inserted {registry_writer.stats()['inserted']} ASNs into STAGING registry")
     else:
         logging.error("No ASNs found matching criteria!")
         return
 
     # 3. PARSE ORGANIZATION (CAIDA)
     logging.info("Step 3: Mapping Organizations (STAGING)...")
-    org_docs = []
     if os.path.exists(CAIDA_FILE):
-        with open(CAIDA_FILE, 'r', encoding='utf-8') as f:
+        with open(CAIDA_FILE, 'r', encoding='utf-8') as f, \
+                BulkWriter(db[staging["orgs"]], label="orgs staging") as org_writer:
             for line in f:
                 try:
                     data = json.loads(line)
                     c_asn = int(data.get('asn'))
                     if c_asn in target_asns:
-                        org_docs.append({
+                        org_writer.insert({
                             "asn": c_asn,
                             "org_name": data.get('name'),
                             "country": data.get('country'),
@@ -115,9 +116,7 @@ def ingest():
                         })
                 except: continue
         
-        if org_docs:
-            db[staging["orgs"]].insert_many(org_docs)
-            logging.info(f"✓ Mapped {len(org_docs)} Organizations in STAGING")
+        logging.info(f"✓ Mapped {org_writer.stats()['inserted']} Organizations in STAGING")
 
     # 4. LIVE IPV6 READINESS WITH CHECKPOINTING
     logging.info("Step 4: Fetching Real-Time IPv6 Stats (Resumable)...")
@@ -129,7 +128,7 @@ def ingest():
         logging.info(f"Resuming from ASN {last_asn}...")
         sorted_asns = [a for a in sorted_asns if a > last_asn]
     
-    readiness_docs = []
+    readiness_writer = BulkWriter(db[staging["readiness"]], label="readiness staging")
     total = len(sorted_asns)
     
     for i, asn in enumerate(sorted_asns):
@@ -159,17 +158,15 @@ def ingest():
         except Exception as e:
             logging.warning(f"AS{asn} Error: {e}")
 
-        readiness_docs.append(doc)
+        readiness_writer.insert(doc)
 
-        # Batch write and checkpoint every 50
-        if len(readiness_docs) >= 50:
-            db[staging["readiness"]].insert_many(readiness_docs)
+        # Checkpoint every 50, only once everything up to this ASN is durable
+        if (i + 1) % 50 == 0:
+            readiness_writer.flush()
             checkpoint.save_asn(asn)
-            readiness_docs = []
             logging.info(f"Progress: {i+1}/{total} (Current ASN: {asn})")
 
-    if readiness_docs:
-        db[staging["readiness"]].insert_many(readiness_docs)
+    readiness_writer.close()
 
     # 5. ATOMIC SWAP
     logging.info("Step 5: Finalizing - Atomic Swap to Production...")
@@ -184,6 +181,9 @@ def ingest():
     db_service.swap_collection(staging["registry"], "ASN_REGISTRY")
     db_service.swap_collection(staging["orgs"], "ASN_ORGANIZATIONS")
     db_service.swap_collection(staging["readiness"], "ASN_READINESS")
+
+    # Re-derive the denormalized ASN directory from the swapped-in collections
+    asn_directory_service.refresh()
     
     # Clear checkpoint on success
     checkpoint.clear()
@@ -8,6 +8,8 @@ from datetime import datetime
 sys.path.append(os.getcwd())
 
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+from services.asn_directory_service import asn_directory_service
 
 # Try importing mrtparse
 try:
@@ -117,28 +119,15 @@ def ingest_bgp_topology():
     # 3. Bulk Insert
     logging.info("💾 Inserting edges into staging...")
     
-    batch_size = 5000
-    batch = []
-    inserted_total = 0
-    
-    for down, up in unique_edges:
-        doc = {
-            "downstream_asn": int(down),
-            "upstream_asn": int(up),
-            "source": "MRT_RIB_20260203"
-        }
-        batch.append(doc)
-        
-        if len(batch) >= batch_size:
-            db[staging_coll].insert_many(batch)
-            inserted_total += len(batch)
-            batch = []
-            
-    if batch:
-        db[staging_coll].insert_many(batch)
-        inserted_total += len(batch)
-        
-    logging.info(f"✅ Inserted {inserted_total} edges.")
+    with BulkWriter(db[staging_coll], label="bgp topology staging") as writer:
+        for down, up in unique_edges:
+            writer.insert({
+                "downstream_asn": int(down),
+                "upstream_asn": int(up),
+                "source": "MRT_RIB_20260203"
+            })
+
+    logging.info(f"✅ Inserted {writer.stats()['inserted']} edges.")
     
     # 4. Create Indexes & Swap
     logging.info("⚙️ Indexing & Swapping...")
@@ -147,6 +136,7 @@ def ingest_bgp_topology():
 
     if db_service.swap_collection(staging_coll, "BGP_TOPOLOGY"):
         logging.info("🚀 BGP Topology updated successfully!")
+        asn_directory_service.refresh()
     else:
         logging.error("❌ Atomic Swap Failed.")
 
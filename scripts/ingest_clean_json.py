@@ -7,6 +7,8 @@ import logging
 from datetime import datetime
 from dotenv import load_dotenv
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+from services.asn_directory_service import asn_directory_service
 
 # Setup
 load_dotenv()
@@ -25,8 +27,8 @@ def ingest_clean_data():
     logging.info(f"Step 1: Preparing staging collection {staging_coll}...")
     db[staging_coll].drop()
     
-    # Step 2 & 3: Load data
-    all_docs = []
+    # Step 2 & 3: Load data, streaming records into STAGING
+    writer = BulkWriter(db[staging_coll], label="readiness clean staging")
     files = {
         "IN": 'ASN/ipv6_readiness_IN.json',
         "MY": 'ASN/ipv6_readiness_MY.json'
@@ -42,20 +44,18 @@ def ingest_clean_data():
                     record['asn'] = int(record['asn'])
                     record['country'] = country
                     record['timestamp'] = datetime.now().isoformat()
-                    all_docs.append(record)
+                    writer.insert(record)
             logging.info(f"✓ Loaded {len(data)} records for {country}")
         except FileNotFoundError:
             logging.warning(f"File not found: {path}. Skipping.")
         except Exception as e:
             logging.error(f"Error processing {path}: {e}")
     
-    if not all_docs:
+    stats = writer.close()
+    if not stats['ops']:
         logging.error("No data loaded. Aborting swap.")
         return
-
-    # Step 4: Insert into STAGING
-    logging.info(f"Step 2: Inserting {len(all_docs)} records into STAGING...")
-    db[staging_coll].insert_many(all_docs)
+    logging.info(f"Step 2: Inserted {stats['inserted']} records into STAGING")
     
     # Step 5: Optimization & Atomic Swap
     logging.info("Step 3: Creating indexes and performing Atomic Swap...")
@@ -64,6 +64,7 @@ def ingest_clean_data():
     
     if db_service.swap_collection(staging_coll, "ASN_READINESS"):
         logging.info("✅ SUCCESS: Clean data ingestion complete via Atomic Swap!")
+        asn_directory_service.refresh()
     else:
         logging.error("❌ ERROR: Atomic swap failed.")
 
@@ -94,6 +94,7 @@ def ingest_all_lab_data():
                 
                 # Create Index
                 target_coll.create_index(unique_key, unique=True)
+                db_service.bump_data_version(item["collection"])
                 
                 # Record in Ledger
                 ledger_service.record_operation(
@@ -104,6 +104,7 @@ def ingest_policy_data():
         logging.info(f"💾 Saved {len(final_list)} unique policy mandates to MongoDB.")
     else:
         logging.warning("⚠️ No mandates found.")
+    db_service.bump_data_version(db_service.COLLECTION_REGISTRY["POLICY_MANDATES"])
 
 if __name__ == "__main__":
     ingest_policy_data()
@@ -8,6 +8,8 @@ from datetime import datetime
 sys.path.append(os.getcwd())
 
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+from services.asn_directory_service import asn_directory_service
 
 # Configure logging
 logging.basicConfig(
@@ -41,13 +43,17 @@ def rebuild_asn_db():
 
     logging.info("[STEP] STEP 1: Ingesting APNIC Registry (IN, MY & ID) into STAGING...")
     
-    asn_docs = []
     asn_set = set() # To track uniqueness
     count_in = 0
     count_my = 0
     count_id = 0
-    
-    with open(apnic_file, 'r', encoding='utf-8') as f:
+
+    db[staging["registry"]].create_index([("asn", 1)], unique=True)
+    db[staging["registry"]].create_index([("country", 1)])
+
+    # Registry documents are streamed to the staging collection as they are parsed
+    with open(apnic_file, 'r', encoding='utf-8') as f, \
+            BulkWriter(db[staging["registry"]], label="asn registry staging") as writer:
         for line in f:
             if line.startswith('#') or not line.strip(): continue
             parts = line.strip().split('|')
@@ -73,7 +79,7 @@ def rebuild_asn_db():
                         "source_file": "delegated-apnic-latest",
                         "ingested_at": datetime.now().isoformat()
                     }
-                    asn_docs.append(asn_doc)
+                    writer.insert(asn_doc)
                     asn_set.add(asn)
                     
                     if cc == 'IN': count_in += 1
@@ -82,11 +88,8 @@ def rebuild_asn_db():
             except ValueError:
                 continue
 
-    if asn_docs:
-        db[staging["registry"]].create_index([("asn", 1)], unique=True)
-        db[staging["registry"]].create_index([("country", 1)])
-        db[staging["registry"]].insert_many(asn_docs)
-        logging.info(f"   - Staged {len(asn_docs)} ASNs (IN: {count_in}, MY: {count_my}, ID: {count_id})")
+    if asn_set:
+        logging.info(f"   - Staged {len(asn_set)} ASNs (IN: {count_in}, MY: {count_my}, ID: {count_id})")
     else:
         logging.error("[ERROR] No ASNs found for IN/MY in APNIC file!")
         return
@@ -95,11 +98,10 @@ def rebuild_asn_db():
     caida_file = os.path.join("ASN", "20260101.as-org2info.jsonl")
     if os.path.exists(caida_file):
         logging.info("[STEP] STEP 2: Mapping Organizations via CAIDA to STAGING...")
-        org_docs = []
-        batch_size = 5000
         matched_count = 0
         
-        with open(caida_file, 'r', encoding='utf-8') as f:
+        with open(caida_file, 'r', encoding='utf-8') as f, \
+                BulkWriter(db[staging["orgs"]], label="asn organizations staging") as writer:
             for line in f:
                 try:
                     entry = json.loads(line)
@@ -117,16 +119,9 @@ def rebuild_asn_db():
                         "mapped_at": datetime.now().isoformat()
                     }
                     
-                    org_docs.append(org_doc)
+                    writer.insert(org_doc)
                     matched_count += 1
-                    
-                    if len(org_docs) >= batch_size:
-                        db[staging["orgs"]].insert_many(org_docs)
-                        org_docs = []
                 except: continue
-        
-        if org_docs:
-            db[staging["orgs"]].insert_many(org_docs)
             
         db[staging["orgs"]].create_index([("asn", 1)], unique=True)
         logging.info(f"   - Staged {matched_count} organizations.")
@@ -136,6 +131,9 @@ def rebuild_asn_db():
     db_service.swap_collection(staging["registry"], "ASN_REGISTRY")
     db_service.swap_collection(staging["orgs"], "ASN_ORGANIZATIONS")
 
+    # Re-derive the denormalized ASN directory from the swapped-in collections
+    asn_directory_service.refresh()
+
     logging.info("[SUCCESS] Database Rebuild Complete (Production Updated Atomically).")
 
 if __name__ == "__main__":
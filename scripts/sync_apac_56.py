@@ -13,6 +13,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -31,26 +32,23 @@ def sync_all():
         with open("datasets/apac_gov_domains.json", 'r') as f:
             gov_domains = json.load(f)
         
-        gov_inserted = 0
-        gov_updated = 0
+        with BulkWriter(db_service._db['gov_domains'], label="gov domains") as writer:
+            for country, domains in gov_domains.items():
+                for domain in domains:
+                    writer.update(
+                        {"domain": domain},
+                        {"$set": {
+                            "domain": domain,
+                            "country": country,
+                            "sector": "government",
+                            "last_sync": datetime.now().isoformat(),
+                            "active": True
+                        }},
+                        upsert=True
+                    )
         
-        for country, domains in gov_domains.items():
-            for domain in domains:
-                result = db_service._db['gov_domains'].update_one(
-                    {"domain": domain},
-                    {"$set": {
-                        "domain": domain,
-                        "country": country,
-                        "sector": "government",
-                        "last_sync": datetime.now().isoformat(),
-                        "active": True
-                    }},
-                    upsert=True
-                )
-                if result.upserted_id: gov_inserted += 1
-                else: gov_updated += 1
-        
-        print(f"✓ Gov Domains: {gov_inserted} inserted, {gov_updated} updated")
+        stats = writer.stats()
+        print(f"✓ Gov Domains: {stats['upserted']} inserted, {stats['matched']} updated")
         
     except Exception as e:
         logging.error(f"Gov sync failed: {e}")
@@ -61,27 +59,24 @@ def sync_all():
         with open("datasets/apac_edu_domains.json", 'r') as f:
             edu_domains = json.load(f)
         
-        edu_inserted = 0
-        edu_updated = 0
-        
-        for country, universities in edu_domains.items():
-            for university in universities:
-                result = db_service._db['edu_domains'].update_one(
-                    {"domain": university["domain"]},
-                    {"$set": {
-                        "domain": university["domain"],
-                        "name": university["name"],
-                        "country": country,
-                        "sector": "education",
-                        "last_sync": datetime.now().isoformat(),
-                        "active": True
-                    }},
-                    upsert=True
-                )
-                if result.upserted_id: edu_inserted += 1
-                else: edu_updated += 1
+        with BulkWriter(db_service._db['edu_domains'], label="edu domains") as writer:
+            for country, universities in edu_domains.items():
+                for university in universities:
+                    writer.update(
+                        {"domain": university["domain"]},
+                        {"$set": {
+                            "domain": university["domain"],
+                            "name": university["name"],
+                            "country": country,
+                            "sector": "education",
+                            "last_sync": datetime.now().isoformat(),
+                            "active": True
+                        }},
+                        upsert=True
+                    )
         
-        print(f"✓ Edu Domains: {edu_inserted} inserted, {edu_updated} updated")
+        stats = writer.stats()
+        print(f"✓ Edu Domains: {stats['upserted']} inserted, {stats['matched']} updated")
         
     except Exception as e:
         logging.error(f"Edu sync failed: {e}")
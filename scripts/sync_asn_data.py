@@ -2,12 +2,12 @@ import os
 import sys
 import json
 import logging
-from pymongo import UpdateOne
 
 # Ensure project root is in path
 sys.path.append(os.getcwd())
 
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -67,26 +67,21 @@ def sync_data():
 
         logging.info(f"Loaded {len(org_id_to_name)} Org identities and {len(asn_to_identity)} ASN mappings.")
 
-        # Prepare bulk operations
-        org_ops = []
-        for asn, identity in asn_to_identity.items():
-            org_ops.append(UpdateOne(
-                {"asn": asn},
-                {"$set": {
-                    "name": identity['name'], 
-                    "org_id": identity['org_id'],
-                    "source": identity['source']
-                }},
-                upsert=True
-            ))
-        
-        if org_ops:
-            logging.info(f"Writing {len(org_ops)} identities in batches...")
-            batch_size = 5000
-            for i in range(0, len(org_ops), batch_size):
-                batch = org_ops[i:i + batch_size]
-                db.asn_organizations.bulk_write(batch)
-            logging.info(f"✓ Organizations synced.")
+        # Stream upserts through the bulk writer instead of materialising every UpdateOne.
+        # ASNs are de-duplicated above, so unordered batches cannot reorder writes to one ASN.
+        logging.info(f"Writing {len(asn_to_identity)} identities in batches...")
+        with BulkWriter(db.asn_organizations, label="asn organizations") as writer:
+            for asn, identity in asn_to_identity.items():
+                writer.update(
+                    {"asn": asn},
+                    {"$set": {
+                        "name": identity['name'], 
+                        "org_id": identity['org_id'],
+                        "source": identity['source']
+                    }},
+                    upsert=True
+                )
+        logging.info(f"✓ Organizations synced.")
 
     # --- 2. Sync IPv6 Readiness (APNIC Labs) ---
     for country in ['IN', 'MY', 'ID']:
@@ -96,22 +91,20 @@ def sync_data():
             with open(v6_file, 'r') as f:
                 v6_data = json.load(f)
             
-            v6_ops = []
-            for item in v6_data:
-                v6_ops.append(UpdateOne(
-                    {"asn": int(item['asn'])},
-                    {"$set": {
-                        "country": item['country'],
-                        "ipv6_capable": float(item['ipv6_capable']),
-                        "ipv6_enabled": float(item['ipv6_capable']) > 5.0,
-                        "last_updated": item.get('last_updated')
-                    }},
-                    upsert=True
-                ))
-            
-            if v6_ops:
-                result = db.asn_ipv6_readiness.bulk_write(v6_ops)
-                logging.info(f"✓ {country} Readiness synced: {result.upserted_count + result.modified_count}")
+            with BulkWriter(db.asn_ipv6_readiness, label=f"asn readiness {country}") as writer:
+                for item in v6_data:
+                    writer.update(
+                        {"asn": int(item['asn'])},
+                        {"$set": {
+                            "country": item['country'],
+                            "ipv6_capable": float(item['ipv6_capable']),
+                            "ipv6_enabled": float(item['ipv6_capable']) > 5.0,
+                            "last_updated": item.get('last_updated')
+                        }},
+                        upsert=True
+                    )
+            stats = writer.stats()
+            logging.info(f"✓ {country} Readiness synced: {stats['upserted'] + stats['modified']}")
 
     logging.info("✨ Data Synchronization Complete!")
 
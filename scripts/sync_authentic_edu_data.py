@@ -7,6 +7,7 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
 
 def sync_authentic_data():
     """Sync real data from apac_edu_domains.json to MongoDB."""
@@ -34,8 +35,10 @@ def sync_authentic_data():
         print(f"Failed to load JSON: {e}")
         return
 
-    all_domains = []
-    all_scans = []
+    domain_writer = BulkWriter(edu_domains_col, label="edu domains")
+    scan_writer = BulkWriter(edu_scans_col, label="edu scans")
+    # Deduplicate domains (Some shared domains like usp.ac.fj exist across campuses)
+    seen_domains = set()
     
     timestamp = datetime.now()
 
@@ -46,6 +49,10 @@ def sync_authentic_data():
         print(f"Processing {name} ({code})...")
         
         for uni in country['universities']:
+            if uni['domain'] in seen_domains:
+                continue
+            seen_domains.add(uni['domain'])
+
             # Domain record
             domain_doc = {
                 "country": code,
@@ -54,7 +61,7 @@ def sync_authentic_data():
                 "name": uni['name'],
                 "sector": "Education"
             }
-            all_domains.append(domain_doc)
+            domain_writer.insert(domain_doc)
             
             # Initial scan record (Pending)
             scan_doc = {
@@ -67,30 +74,15 @@ def sync_authentic_data():
                 "last_success": None,
                 "status": "Authentic Data Initialized"
             }
-            all_scans.append(scan_doc)
-
-    # Deduplicate domains (Some shared domains like usp.ac.fj exist across campuses)
-    seen_domains = set()
-    unique_domains = []
-    unique_scans = []
-    
-    for d, s in zip(all_domains, all_scans):
-        if d['domain'] not in seen_domains:
-            seen_domains.add(d['domain'])
-            unique_domains.append(d)
-            unique_scans.append(s)
+            scan_writer.insert(scan_doc)
 
-    if unique_domains:
-        print(f"Inserting {len(unique_domains)} unique authentic domains...")
-        edu_domains_col.insert_many(unique_domains)
-        
-    if unique_scans:
-        print(f"Initializing {len(unique_scans)} fresh scan results...")
-        edu_scans_col.insert_many(unique_scans)
+    domain_stats = domain_writer.close()
+    scan_stats = scan_writer.close()
+    print(f"Inserted {domain_stats['inserted']} unique authentic domains and {scan_stats['inserted']} fresh scan results.")
 
     print("\n[OK] Synchronization complete!")
     print(f"- {len(data)} Countries synced")
-    print(f"- {len(all_domains)} Authentic institutions loaded")
+    print(f"- {domain_stats['inserted']} Authentic institutions loaded")
     print("\nNext: Users should click 'Refresh Sector Data' on the dashboard to scan these real sites.")
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
 
 def sync_authentic_gov_data():
     """Sync real data from apac_gov_domains.json to MongoDB."""
@@ -37,8 +38,8 @@ def sync_authentic_gov_data():
         print(f"Failed to load JSON: {e}")
         return
 
-    all_domains = []
-    all_scans = []
+    domain_writer = BulkWriter(gov_domains_col, label="gov domains")
+    scan_writer = BulkWriter(gov_scans_col, label="gov scans")
     
     timestamp = datetime.now()
 
@@ -59,7 +60,7 @@ def sync_authentic_gov_data():
                 "sector": "Government",
                 "active": True
             }
-            all_domains.append(domain_doc)
+            domain_writer.insert(domain_doc)
             
             # Initial scan record (Pending)
             scan_doc = {
@@ -72,19 +73,15 @@ def sync_authentic_gov_data():
                 "last_success": None,
                 "status": "Authentic Data Initialized"
             }
-            all_scans.append(scan_doc)
+            scan_writer.insert(scan_doc)
 
-    if all_domains:
-        print(f"Inserting {len(all_domains)} authentic domains...")
-        gov_domains_col.insert_many(all_domains)
-        
-    if all_scans:
-        print(f"Initializing {len(all_scans)} fresh scan results...")
-        gov_scans_col.insert_many(all_scans)
+    domain_stats = domain_writer.close()
+    scan_stats = scan_writer.close()
+    print(f"Inserted {domain_stats['inserted']} authentic domains and {scan_stats['inserted']} fresh scan results.")
 
     print("\n[OK] Synchronization complete!")
     print(f"- {len(data)} Countries synced")
-    print(f"- {len(all_domains)} Authentic government infrastructures loaded")
+    print(f"- {domain_stats['inserted']} Authentic government infrastructures loaded")
     print("\nNext: Execute a force scan to populate live IPv6 status.")
 
 if __name__ == "__main__":
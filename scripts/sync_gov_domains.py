@@ -62,6 +62,10 @@ def sync_domains():
                 except Exception as e:
                     logging.error(f"Error syncing {domain}: {e}")
         
+        # Derived views (country profiles, compliance) rebuild on the domain registry's data version
+        if total_processed:
+            db_service.bump_data_version(db_service.COLLECTION_REGISTRY["GOV_DOMAINS"])
+        
         print("\n" + "="*60)
         print("SYNC COMPLETE")
         print("="*60)
@@ -4,6 +4,7 @@ import logging
 from datetime import datetime
 sys.path.append(os.getcwd())
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -17,40 +18,30 @@ def sync_regional_history():
         db = db_service._db
         history_col = db['history_logs']
         
-        # 1. Get all unique dates in the history_logs
-        unique_dates = history_col.distinct("date", {"sector": "government", "country": {"$exists": True}})
-        logging.info(f"Found {len(unique_dates)} unique historical dates to aggregate.")
+        # 1. Average every date's country snapshots in a single aggregation
+        daily = history_col.aggregate([
+            {"$match": {"sector": "government", "country": {"$exists": True}}},
+            {"$group": {"_id": "$date", "avg_rate": {"$avg": "$rate"}, "snapshots": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ])
         
-        synced_count = 0
-        for date_str in sorted(unique_dates):
-            # 2. For each date, find all country snapshots
-            country_snapshots = list(history_col.find({
-                "date": date_str,
-                "sector": "government",
-                "country": {"$exists": True}
-            }))
-            
-            if not country_snapshots:
-                continue
-                
-            # 3. Calculate the average adoption rate for the region on this date
-            avg_rate = sum(s['rate'] for s in country_snapshots) / len(country_snapshots)
-            
-            # 4. Upsert the regional snapshot (where country is missing)
-            # We use an upsert to avoid duplicates if the script is run multiple times
-            history_col.update_one(
-                {"date": date_str, "sector": "government", "country": {"$exists": False}},
-                {"$set": {
-                    "date": date_str,
-                    "sector": "government",
-                    "rate": round(avg_rate, 2),
-                    "snapshot_count": len(country_snapshots),
-                    "type": "regional_aggregate",
-                    "timestamp": datetime.now().isoformat()
-                }},
-                upsert=True
-            )
-            synced_count += 1
+        # 2. Upsert the regional snapshot (where country is missing)
+        # We use an upsert to avoid duplicates if the script is run multiple times
+        with BulkWriter(history_col, label="regional history") as writer:
+            for day in daily:
+                writer.update(
+                    {"date": day["_id"], "sector": "government", "country": {"$exists": False}},
+                    {"$set": {
+                        "date": day["_id"],
+                        "sector": "government",
+                        "rate": round(day["avg_rate"], 2),
+                        "snapshot_count": day["snapshots"],
+                        "type": "regional_aggregate",
+                        "timestamp": datetime.now().isoformat()
+                    }},
+                    upsert=True
+                )
+        synced_count = writer.stats()["ops"]
             
         logging.info(f"Success: Synced {synced_count} regional aggregate snapshots to history_logs.")
         
@@ -1,9 +1,15 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+import hashlib
+from datetime import datetime, timezone
 import pandas as pd
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.ensemble import RandomForestRegressor
 import joblib
-import os
 import numpy as np
+from services.model_artifact_service import LinearModelArtifact, is_linear_estimator
+from services.model_registry_service import model_registry, ADOPTION_MODEL
 
 # Load dataset
 DATA_PATH = "data/ipv6_training_dataset.csv"
@@ -63,4 +69,30 @@ os.makedirs("models", exist_ok=True)
 # Save model
 MODEL_PATH = "models/ipv6_adoption_model.pkl"
 joblib.dump(model, MODEL_PATH)
-print(f"Real AI Model saved -> {MODEL_PATH}")
\ No newline at end of file
+print(f"Real AI Model saved -> {MODEL_PATH}")
+
+# Export the dependency-free coefficient artifact served by IPv6InferenceService
+if is_linear_estimator(model):
+    with open(DATA_PATH, 'rb') as f:
+        dataset_sha256 = hashlib.sha256(f.read()).hexdigest()
+    artifact = LinearModelArtifact.from_estimator(model, FEATURES, metadata={
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "params": grid_search.best_params_,
+        "r2": round(float(score), 6),
+        "rows": int(len(df)),
+        "dataset_sha256": dataset_sha256,
+        "countries": sorted(df["country"].unique().tolist())
+    })
+    ARTIFACT_PATH = "models/ipv6_adoption_model.json"
+    artifact.save(ARTIFACT_PATH)
+    print(f"Coefficient artifact {artifact.version} saved -> {ARTIFACT_PATH}")
+    published_path, published_version, published_metadata = ARTIFACT_PATH, artifact.version, artifact.metadata
+else:
+    print("Model is not linear; serving will fall back to the joblib pickle.")
+    published_path, published_version = MODEL_PATH, None
+    published_metadata = {"params": grid_search.best_params_, "r2": round(float(score), 6), "rows": int(len(df))}
+
+# Publish a new registry version; running workers hot-swap to it (pass --no-activate to stage only)
+version = model_registry.publish(ADOPTION_MODEL, published_path, metadata=published_metadata,
+                                 version=published_version, activate="--no-activate" not in sys.argv)
+print(f"Registry version {version} published for {ADOPTION_MODEL}")
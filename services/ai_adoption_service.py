@@ -0,0 +1,205 @@
+"""
+AI Adoption Service — materialized AI-adjusted adoption for every economy.
+
+`apac_ipv6_ai` holds one document per economy (prediction, confidence,
+explanation, display benchmarks, model version) plus the population-weighted
+regional aggregate under `_id: "APAC"`. It is rebuilt in one batched pass
+whenever the normalized stats, the external benchmarks or the active adoption
+model change; the recorded input versions live in system_metadata. A rebuild
+is written to a staging collection and swapped in atomically, so readers
+never see a half-written set.
+
+The lab, map and dashboard APIs read it through the per-worker read cache, so
+serving a country or the whole region is a memory lookup with no inference.
+"""
+
+import os
+import logging
+from datetime import datetime
+from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+from services.single_flight_service import DistributedLock
+from services.model_registry_service import model_registry, model_data_version_key, ADOPTION_MODEL
+
+logger = logging.getLogger(__name__)
+
+AI_STATS = db_service.COLLECTION_REGISTRY["APAC_AI_STATS"]
+AI_STATS_STAGING = f"{AI_STATS}_staging"
+APAC_STATS = db_service.COLLECTION_REGISTRY["APAC_STATS"]
+EXTERNAL_STATS = db_service.COLLECTION_REGISTRY["EXTERNAL_STATS"]
+EXTERNAL_LATEST = db_service.COLLECTION_REGISTRY["EXTERNAL_LATEST"]
+
+# data_versions keys the materialized view is derived from
+INPUTS = [APAC_STATS, EXTERNAL_STATS, EXTERNAL_LATEST, model_data_version_key(ADOPTION_MODEL)]
+INPUTS_KEY = f"materialized:{AI_STATS}"
+REGIONAL_ID = "APAC"
+REBUILD_LOCK = "apac_ai_rebuild"
+REBUILD_LOCK_TTL = int(os.getenv("AI_STATS_REBUILD_LOCK_TTL", "300"))
+
+# Fields served per country by the all-stats (map) API
+SUMMARY_FIELDS = ("country", "ipv6_adoption", "ai_confidence", "ai_explanation", "benchmarks", "source",
+                  "model_version")
+
+
+class AIAdoptionService:
+    """Builds and serves the `apac_ipv6_ai` materialized view."""
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    def _recorded_inputs(self):
+        meta = db_service._db['system_metadata'].find_one({"key": INPUTS_KEY})
+        return (meta or {}).get("inputs")
+
+    def refresh(self, force=False):
+        """
+        Rebuilds the view when its inputs changed since the last build. Returns
+        True when a new version was swapped in, False when current or when
+        another worker holds the rebuild lease.
+        """
+        if not db_service.connect():
+            return False
+        versions = db_service.get_data_versions(INPUTS)
+        if not force and self._recorded_inputs() == versions:
+            return False
+
+        with DistributedLock(REBUILD_LOCK, ttl=REBUILD_LOCK_TTL) as acquired:
+            if not acquired:
+                return False
+            # Another worker may have finished the same rebuild while we waited
+            versions = db_service.get_data_versions(INPUTS)
+            if not force and self._recorded_inputs() == versions:
+                return False
+            return self._rebuild(versions)
+
+    def _rebuild(self, versions):
+        from services.inference_service import inference_service
+        from services.external_data_service import external_data_service
+        from services.stats_service import StatsService
+
+        started = datetime.now()
+        # This worker's watcher may not have loaded the model behind the new stamp yet
+        if not model_registry.ensure_current(ADOPTION_MODEL):
+            logger.warning("[AI STATS] Active adoption model not loadable here; view not rebuilt")
+            return False
+        inference_service.expire_version()
+        records = db_service._db[APAC_STATS].find({}, {"_id": 0})
+        records = [r for r in records if r.get("country_code")]
+        if not records:
+            logger.warning("[AI STATS] No normalized APAC stats; view not built")
+            return False
+
+        benchmarks = external_data_service.get_benchmarks('ALL')
+        predictions = inference_service.predict_batch(
+            [r["country_code"] for r in records], [r.get("ipv6_adoption", 0) for r in records], include_metrics=True
+        )
+        built_at = started.isoformat()
+        docs = [self._country_doc(r, predictions[r["country_code"]], benchmarks, built_at) for r in records]
+        regional = self._regional_doc(records, predictions, benchmarks, StatsService.POPULATIONS, started)
+        if regional:
+            docs.append(regional)
+
+        db = db_service._db
+        db[AI_STATS_STAGING].drop()
+        with BulkWriter(db[AI_STATS_STAGING], label="apac ai staging") as writer:
+            writer.extend(docs)
+        if not db_service.swap_collection(AI_STATS_STAGING, "APAC_AI_STATS"):
+            return False
+
+        db['system_metadata'].update_one(
+            {"key": INPUTS_KEY},
+            {"$set": {"inputs": versions, "countries": len(records), "built_at": built_at}},
+            upsert=True
+        )
+        logger.info(f"[AI STATS] Materialized {len(records)} economies + regional aggregate in "
+                    f"{(datetime.now() - started).total_seconds():.2f}s")
+        return True
+
+    @staticmethod
+    def _country_doc(record, ai_data, benchmarks, built_at):
+        cc = record["country_code"]
+        raw_adoption = record.get("ipv6_adoption", 0)
+        return {
+            "_id": cc,
+            "country": cc,
+            "ipv6_adoption": ai_data["prediction"],
+            "ai_confidence": ai_data["confidence"],
+            "ai_explanation": ai_data["explanation"],
+            "benchmarks": {
+                "APNIC": raw_adoption,
+                "Google": benchmarks.get("Google", {}).get(cc, raw_adoption),
+                "Cloudflare": benchmarks.get("Cloudflare", {}).get(cc, raw_adoption),
+                "Pulse": benchmarks.get("IPv6_Pulse", {}).get(cc, 0)
+            },
+            "source": "AI Aggregate Model",
+            "raw_source_fallback": record.get("source", "APNIC Labs"),
+            "last_updated": record.get("last_updated"),
+            "model_version": ai_data.get("model_version"),
+            "built_at": built_at
+        }
+
+    @staticmethod
+    def _regional_doc(records, predictions, benchmarks, populations, started):
+        """Population-weighted regional aggregate (simple average per benchmark source)."""
+        total_pop = 0
+        weighted_ai = 0
+        source_totals = {"APNIC": 0, "Google": 0, "Cloudflare": 0, "Pulse": 0}
+        source_counts = {"APNIC": 0, "Google": 0, "Cloudflare": 0, "Pulse": 0}
+
+        for record in records:
+            cc = record["country_code"]
+            pop = populations.get(cc, 1)
+            weighted_ai += predictions[cc]["prediction"] * pop
+            total_pop += pop
+            b = {
+                "APNIC": record.get("ipv6_adoption", 0),
+                "Google": benchmarks.get("Google", {}).get(cc),
+                "Cloudflare": benchmarks.get("Cloudflare", {}).get(cc),
+                "Pulse": benchmarks.get("IPv6_Pulse", {}).get(cc)
+            }
+            for key, val in b.items():
+                if val is not None and val > 0:
+                    source_totals[key] += val
+                    source_counts[key] += 1
+
+        if total_pop == 0:
+            return None
+        return {
+            "_id": REGIONAL_ID,
+            "type": "regional_aggregate",
+            "country": REGIONAL_ID,
+            "ipv6_adoption": round(weighted_ai / total_pop, 2),
+            "ai_confidence": "High",
+            "ai_explanation": "Population-weighted consensus across 56 APAC regions.",
+            "benchmarks": {
+                k: round(source_totals[k] / source_counts[k], 2) if source_counts[k] > 0 else 0
+                for k in source_totals
+            },
+            "source": "AI Aggregate Model (Regional)",
+            "last_updated": started.strftime("%Y-%m-%d %H:%M:%S"),
+            "model_version": next(iter(predictions.values()), {}).get("model_version"),
+            "built_at": started.isoformat()
+        }
+
+    # ------------------------------------------------------------------
+    # Serve
+    # ------------------------------------------------------------------
+    def get(self, country_code):
+        """Materialized stats for one economy (or "APAC"), or None when not built."""
+        if not db_service.connect():
+            return None
+        doc = db_service.cached_find_one(AI_STATS, {"_id": country_code.upper()}, {"_id": 0, "built_at": 0})
+        if doc:
+            doc.pop("type", None)
+        return doc
+
+    def get_all(self):
+        """{country: summary} for every economy (regional aggregate excluded); {} when not built."""
+        if not db_service.connect():
+            return {}
+        docs = db_service.cached_find(AI_STATS, {"type": {"$exists": False}},
+                                      {"_id": 0, **{field: 1 for field in SUMMARY_FIELDS}})
+        return {doc["country"]: doc for doc in docs}
+
+
+ai_adoption_service = AIAdoptionService()
@@ -0,0 +1,233 @@
+"""
+ASN Directory Service — denormalized, keyset-paginated ASN directory.
+
+The /api/asn directory used to join the registry with organizations,
+readiness and BGP topology ($lookup x3), sort, and $skip into a $facet on
+every page. `asn_directory` holds the joined row per ASN instead:
+
+    {_id: asn, asn, country, org_name, ipv6_percentage, ipv6_enabled,
+     bgp_resilience: {upstream_count, score, status}, registry_source, data_source}
+
+plus one `counts:<CC>` document per country with the row count per filter.
+Pages are served from the (country, ipv6_percentage desc, asn) index:
+filters are ranges on ipv6_percentage and the cursor is the last row's
+(ipv6_percentage, asn), so any page of any country is an index seek.
+
+The directory is rebuilt after the ASN ingestion swaps (and by the
+scheduler whenever an input's data version moved), written to a staging
+collection with its indexes and swapped in atomically.
+"""
+
+import os
+import re
+import logging
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING
+from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+from services.single_flight_service import DistributedLock
+from services.asn_org_service import asn_org_service
+from services.bgp_graph_service import bgp_graph_service
+
+logger = logging.getLogger(__name__)
+
+ASN_DIRECTORY = db_service.COLLECTION_REGISTRY["ASN_DIRECTORY"]
+DIRECTORY_STAGING = f"{ASN_DIRECTORY}_staging"
+
+# data_versions keys the directory is derived from
+INPUTS = [db_service.COLLECTION_REGISTRY[key] for key in (
+    "ASN_REGISTRY", "ASN_ORGANIZATIONS", "ASN_READINESS", "BGP_TOPOLOGY"
+)]
+INPUTS_KEY = f"materialized:{ASN_DIRECTORY}"
+REBUILD_LOCK = "asn_directory_rebuild"
+REBUILD_LOCK_TTL = int(os.getenv("ASN_DIRECTORY_REBUILD_LOCK_TTL", "600"))
+
+DATA_SOURCE = "Local Registry + CAIDA + BGP Analysis"
+# ipv6_percentage range per directory filter
+FILTERS = {
+    "all": {},
+    "top_performers": {"$gte": 50},
+    "unready": {"$lt": 10},
+}
+# Directory order (and the index serving it)
+SORT = [("ipv6_percentage", DESCENDING), ("asn", ASCENDING)]
+# Beyond this many search matches the page query falls back to $regex
+MAX_SEARCH_ASNS = 5000
+
+
+def bgp_resilience(upstream_count):
+    """Resilience score and status from the number of upstream providers."""
+    if upstream_count == 0:
+        return {"upstream_count": 0, "score": 0, "status": "Disconnected"}
+    if upstream_count == 1:
+        return {"upstream_count": 1, "score": 10, "status": "Critical (SPOF)"}
+    if upstream_count == 2:
+        return {"upstream_count": 2, "score": 60, "status": "Redundant"}
+    return {"upstream_count": upstream_count, "score": 100, "status": "Highly Resilient"}
+
+
+def encode_cursor(row):
+    return f"{row['ipv6_percentage']}:{row['asn']}"
+
+
+def decode_cursor(cursor):
+    """(ipv6_percentage, asn) from a cursor; ValueError when malformed."""
+    pct, _, asn = cursor.rpartition(":")
+    return float(pct), int(asn)
+
+
+class ASNDirectoryService:
+    """Builds and pages the `asn_directory` collection."""
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    def _recorded_inputs(self):
+        meta = db_service._db['system_metadata'].find_one({"key": INPUTS_KEY})
+        return (meta or {}).get("inputs")
+
+    def is_built(self):
+        return bool(db_service.connect() and self._recorded_inputs() is not None)
+
+    def refresh(self, force=False):
+        """Rebuilds the directory when an input changed; True when a new one was swapped in."""
+        if not db_service.connect():
+            return False
+        versions = db_service.get_data_versions(INPUTS)
+        if not force and self._recorded_inputs() == versions:
+            return False
+
+        with DistributedLock(REBUILD_LOCK, ttl=REBUILD_LOCK_TTL) as acquired:
+            if not acquired:
+                return False
+            versions = db_service.get_data_versions(INPUTS)
+            if not force and self._recorded_inputs() == versions:
+                return False
+            return self._rebuild(versions)
+
+    def _rebuild(self, versions):
+        started = datetime.now()
+        db = db_service._db
+        registry = db[db_service.COLLECTION_REGISTRY["ASN_REGISTRY"]]
+
+        # One projected read per input instead of three $lookups per registry row;
+        # org names and upstream counts come from freshly loaded in-memory tables
+        # (shared with the other services)
+        orgs = asn_org_service.reload()
+        readiness = {}
+        for doc in db[db_service.COLLECTION_REGISTRY["ASN_READINESS"]].find(
+                {}, {"_id": 0, "asn": 1, "ipv6_capable": 1, "ipv6_enabled": 1}):
+            readiness.setdefault(doc.get("asn"), doc)
+        graph = bgp_graph_service.reload()
+        upstreams = graph.degree_map() if graph is not None else {}
+
+        counts = {}
+        db[DIRECTORY_STAGING].drop()
+        with BulkWriter(db[DIRECTORY_STAGING], label="asn directory staging") as writer:
+            for reg in registry.find({}, {"_id": 0, "asn": 1, "country": 1, "source": 1}):
+                asn = reg.get("asn")
+                if asn is None:
+                    continue
+                v6 = readiness.get(asn, {})
+                pct = v6.get("ipv6_capable")
+                pct = pct if pct is not None else 0
+                row = {
+                    "_id": asn,
+                    "asn": asn,
+                    "country": reg.get("country"),
+                    "org_name": orgs.get(asn) or "Unknown Organization",
+                    "ipv6_percentage": pct,
+                    "ipv6_enabled": v6.get("ipv6_enabled") if v6.get("ipv6_enabled") is not None else False,
+                    "bgp_resilience": bgp_resilience(upstreams.get(asn, 0)),
+                    "registry_source": reg.get("source") or "Global Registry",
+                    "data_source": DATA_SOURCE
+                }
+                writer.insert(row)
+                country_counts = counts.setdefault(row["country"], dict.fromkeys(FILTERS, 0))
+                country_counts["all"] += 1
+                country_counts["top_performers"] += pct >= 50
+                country_counts["unready"] += pct < 10
+            writer.extend({"_id": f"counts:{cc}", "counts_for": cc, "counts": c}
+                          for cc, c in counts.items() if cc)
+
+        rows = sum(c["all"] for c in counts.values())
+        if not rows:
+            logger.warning("[ASN DIRECTORY] Registry is empty; directory not built")
+            db[DIRECTORY_STAGING].drop()
+            return False
+
+        # Indexes travel with the collection through the rename
+        db[DIRECTORY_STAGING].create_index([("country", ASCENDING)] + SORT)
+        if not db_service.swap_collection(DIRECTORY_STAGING, "ASN_DIRECTORY"):
+            return False
+        db['system_metadata'].update_one(
+            {"key": INPUTS_KEY},
+            {"$set": {"inputs": versions, "asns": rows, "built_at": started.isoformat()}},
+            upsert=True
+        )
+        logger.info(f"[ASN DIRECTORY] Built {rows} ASNs across {len(counts)} countries in "
+                    f"{(datetime.now() - started).total_seconds():.2f}s")
+        return True
+
+    # ------------------------------------------------------------------
+    # Serve
+    # ------------------------------------------------------------------
+    def get_page(self, country_code, filter_type='all', page=1, per_page=25, search=None, cursor=None):
+        """
+        One directory page. With `cursor` (the previous page's next_cursor) the
+        page is an index seek; without it the first rows of `page` are skipped
+        on the index. Raises ValueError for a malformed cursor.
+        """
+        cc = country_code.upper()
+        coll = db_service._db[ASN_DIRECTORY]
+        query = {"country": cc}
+        pct_range = FILTERS.get(filter_type, {})
+        if pct_range:
+            query["ipv6_percentage"] = dict(pct_range)
+
+        search_term = search.strip() if search else ""
+        if search_term:
+            # The in-memory trigram index resolves the matches; $regex only without it
+            from services.asn_search_service import asn_search_service
+            asns = asn_search_service.matching_asns(search_term, cc)
+            if asns is not None and len(asns) <= MAX_SEARCH_ASNS:
+                query["_id"] = {"$in": asns}
+            else:
+                search_filter = [{"org_name": {"$regex": re.escape(search_term), "$options": "i"}}]
+                if search_term.isdigit():
+                    search_filter.append({"asn": int(search_term)})
+                query["$or"] = search_filter
+
+        page_query = query
+        if cursor:
+            last_pct, last_asn = decode_cursor(cursor)
+            page_query = {"$and": [query, {"$or": [
+                {"ipv6_percentage": {"$lt": last_pct}},
+                {"ipv6_percentage": last_pct, "asn": {"$gt": last_asn}}
+            ]}]}
+
+        find = coll.find(page_query, {"_id": 0}).sort(SORT)
+        if not cursor and page > 1:
+            find = find.skip((page - 1) * per_page)
+        # One extra row tells whether another page exists
+        data = list(find.limit(per_page + 1))
+        has_more = len(data) > per_page
+        data = data[:per_page]
+
+        if search_term:
+            total = coll.count_documents(query)
+        else:
+            summary = coll.find_one({"_id": f"counts:{cc}"}) or {}
+            total = summary.get("counts", {}).get(filter_type if pct_range else "all", 0)
+
+        return {
+            "data": data,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": -(-total // per_page),  # ceiling division
+            "next_cursor": encode_cursor(data[-1]) if has_more and data else None
+        }
+
+
+asn_directory_service = ASNDirectoryService()
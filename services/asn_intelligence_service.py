@@ -5,20 +5,38 @@ import socket
 import time
 from datetime import datetime
 from services.database_service import db_service
+from services.single_flight_service import coalesce, run_in_background
 
 class ASNIntelligenceService:
-    def __init__(self):
-        self.db_connected = db_service.connect()
+    @property
+    def db_connected(self):
+        return db_service.connect()
 
-    def get_country_directory(self, country_code, filter_type='all', page=1, per_page=25, search=None):
+    @coalesce("asn_country_directory")
+    def get_country_directory(self, country_code, filter_type='all', page=1, per_page=25, search=None, cursor=None):
         """
         Returns a verified list of ASNs for a given country,
         joining Registry data with CAIDA Organization names.
-        Supports advanced filtering and server-side pagination.
+        Supports advanced filtering and server-side pagination; pages come from
+        the denormalized asn_directory (keyset via `cursor`) once it is built.
         """
+        per_page = max(1, min(per_page, 100))
+        page = max(page, 1)
         if not self.db_connected:
             return {"data": [], "total": 0, "page": page, "per_page": per_page}
 
+        from services.asn_directory_service import asn_directory_service
+        try:
+            if asn_directory_service.is_built():
+                return asn_directory_service.get_page(country_code, filter_type, page, per_page, search, cursor)
+        except ValueError:
+            raise  # malformed cursor, reported to the client
+        except Exception as e:
+            logging.error(f"ASN directory read failed: {e}")
+            return {"data": [], "total": 0, "page": page, "per_page": per_page, "total_pages": 0,
+                    "next_cursor": None}
+        run_in_background("asn_directory_build", asn_directory_service.refresh)
+
         # 1. Base Match
         match_query = {"country": country_code.upper()}
         
@@ -174,20 +192,20 @@ class ASNIntelligenceService:
         """
         if not self.db_connected:
             return {}
+        return self.get_peer_benchmarks_all([country_code.upper()])[country_code.upper()]
 
-        results = {
-            "country": country_code.upper(),
-            "national_isp_avg": 0,
-            "academic_avg": 0,
-            "government_avg": 0,
-            "gap_index": 0
-        }
-        
+    def get_peer_benchmarks_all(self, countries=None):
+        """
+        Peer benchmarks for many countries at once: each sector average is one
+        aggregation grouped by country instead of one per country.
+        Returns {country: results}; `countries=None` covers every country seen.
+        """
         db = db_service._db
-        
+        match = {"country": {"$in": list(countries)}} if countries else {}
+
         # 1. National ISP Average (Top 500)
         isp_pipeline = [
-            {"$match": {"country": country_code.upper()}},
+            {"$match": match},
             {"$lookup": {
                 "from": db_service.COLLECTION_REGISTRY["ASN_READINESS"],
                 "localField": "asn",
@@ -195,33 +213,39 @@ class ASNIntelligenceService:
                 "as": "v6"
             }},
             {"$unwind": "$v6"},
-            {"$group": {"_id": None, "avg": {"$avg": "$v6.ipv6_capable"}}}
+            {"$group": {"_id": "$country", "avg": {"$avg": "$v6.ipv6_capable"}, "measured": {"$sum": 1}}}
         ]
-        isp_res = list(db[db_service.COLLECTION_REGISTRY["ASN_REGISTRY"]].aggregate(isp_pipeline))
-        if isp_res:
-            results['national_isp_avg'] = round(isp_res[0]['avg'], 1)
-            
-        # 2. Academic Sector Average
-        edu_pipeline = [
-            {"$match": {"country": country_code.upper()}},
-            {"$group": {"_id": None, "avg": {"$avg": {"$cond": [{"$eq": ["$ipv6_web", True]}, 100, 0]}}}}
-        ]
-        edu_res = list(db[db_service.COLLECTION_REGISTRY["EDU_SCANS"]].aggregate(edu_pipeline))
-        if edu_res:
-            results['academic_avg'] = round(edu_res[0]['avg'], 1)
+        isp_res = {r["_id"]: r for r in db[db_service.COLLECTION_REGISTRY["ASN_REGISTRY"]].aggregate(isp_pipeline)}
 
-        # 3. Government Sector Average
-        gov_pipeline = [
-            {"$match": {"country": country_code.upper()}},
-            {"$group": {"_id": None, "avg": {"$avg": {"$cond": [{"$eq": ["$ipv6_web", True]}, 100, 0]}}}}
+        # 2./3. Academic and Government Sector Averages
+        sector_pipeline = [
+            {"$match": match},
+            {"$group": {"_id": "$country", "avg": {"$avg": {"$cond": [{"$eq": ["$ipv6_web", True]}, 100, 0]}}}}
         ]
-        gov_res = list(db[db_service.COLLECTION_REGISTRY["GOV_SCANS"]].aggregate(gov_pipeline))
-        if gov_res:
-            results['government_avg'] = round(gov_res[0]['avg'], 1)
-            
-        # Calculate Gap (Academic vs National)
-        results['gap_index'] = round(results['national_isp_avg'] - results['academic_avg'], 1)
-        
-        return results
+        edu_res = {r["_id"]: r["avg"] for r in db[db_service.COLLECTION_REGISTRY["EDU_SCANS"]].aggregate(sector_pipeline)}
+        gov_res = {r["_id"]: r["avg"] for r in db[db_service.COLLECTION_REGISTRY["GOV_SCANS"]].aggregate(sector_pipeline)}
+
+        codes = list(countries) if countries else sorted({c for c in (*isp_res, *edu_res, *gov_res) if c})
+        benchmarks = {}
+        for cc in codes:
+            isp = isp_res.get(cc)
+            results = {
+                "country": cc,
+                "national_isp_avg": round(isp["avg"], 1) if isp and isp.get("avg") is not None else 0,
+                "isp_asns_measured": isp["measured"] if isp else 0,
+                "academic_avg": round(edu_res[cc], 1) if edu_res.get(cc) is not None else 0,
+                "government_avg": round(gov_res[cc], 1) if gov_res.get(cc) is not None else 0,
+            }
+            # Calculate Gap (Academic vs National)
+            results['gap_index'] = round(results['national_isp_avg'] - results['academic_avg'], 1)
+            benchmarks[cc] = results
+        return benchmarks
+
+    def get_country_asn_counts(self, countries=None):
+        """Registered ASNs per country (one grouped count)."""
+        match = {"country": {"$in": list(countries)}} if countries else {}
+        pipeline = [{"$match": match}, {"$group": {"_id": "$country", "total": {"$sum": 1}}}]
+        return {r["_id"]: r["total"]
+                for r in db_service._db[db_service.COLLECTION_REGISTRY["ASN_REGISTRY"]].aggregate(pipeline)}
 
 asn_intel_service = ASNIntelligenceService()
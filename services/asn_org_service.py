@@ -0,0 +1,132 @@
+"""
+ASN Org Service — process-wide ASN → organization name table.
+
+`asn_organizations` is loaded once per data version into array-backed
+storage: a sorted uint32 ASN array, a parallel int32 array of name ids and
+an interned table of distinct names (many ASNs share an organization). A
+lookup is a binary search; get_many() resolves a whole batch with one
+np.searchsorted, so org-name joins ($lookup, find_one per ASN) become
+memory lookups.
+
+The table is swapped in as a single reference; a newer collection version
+is loaded in the background while the previous table keeps serving.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+import numpy as np
+from services.database_service import db_service
+from services.single_flight_service import run_in_background
+
+logger = logging.getLogger(__name__)
+
+ASN_ORGANIZATIONS = db_service.COLLECTION_REGISTRY["ASN_ORGANIZATIONS"]
+# How often a worker checks whether asn_organizations changed
+RELOAD_CHECK_SECONDS = float(os.getenv("ASN_ORG_RELOAD_CHECK_SECONDS", "30"))
+
+
+class ASNOrgTable:
+    """Immutable sorted-array ASN → name table; ASNs without a name map to ""."""
+
+    def __init__(self, pairs):
+        names = {}
+        asns, name_ids = [], []
+        for asn, name in pairs:
+            if asn is None:
+                continue
+            asns.append(int(asn))
+            name_ids.append(names.setdefault(sys.intern(name or ""), len(names)))
+        self.names = list(names)
+        order = np.argsort(np.array(asns, dtype=np.uint32), kind="stable")
+        asns = np.array(asns, dtype=np.uint32)[order]
+        name_ids = np.array(name_ids, dtype=np.int32)[order]
+        # First entry wins for duplicate ASNs
+        keep = np.ones(len(asns), dtype=bool)
+        keep[1:] = asns[1:] != asns[:-1]
+        self.asns = asns[keep]
+        self.name_ids = name_ids[keep]
+
+    def __len__(self):
+        return len(self.asns)
+
+    def get(self, asn, default=None):
+        try:
+            asn = int(asn)
+        except (TypeError, ValueError):
+            return default
+        if asn < 0:
+            return default
+        i = int(np.searchsorted(self.asns, asn))
+        if i < len(self.asns) and self.asns[i] == asn:
+            return self.names[self.name_ids[i]]
+        return default
+
+    def get_many(self, asns):
+        """{asn: name} for the named ASNs in the table."""
+        asns = [int(a) for a in asns if a is not None and int(a) >= 0]
+        if not asns or not len(self.asns):
+            return {}
+        keys = np.array(asns, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.asns, keys), len(self.asns) - 1)
+        found = self.asns[pos] == keys
+        hits = ((asn, self.names[self.name_ids[p]]) for asn, p, hit in zip(asns, pos.tolist(), found.tolist()) if hit)
+        return {asn: name for asn, name in hits if name}
+
+    def stats(self):
+        return {"asns": len(self.asns), "distinct_names": len(self.names),
+                "array_bytes": int(self.asns.nbytes + self.name_ids.nbytes)}
+
+
+class ASNOrgService:
+    """Holds the current table and reloads it when asn_organizations changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._table = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def reload(self):
+        """Loads the current collection and swaps the table in; returns it (None without a database)."""
+        if not db_service.connect():
+            return self._table
+        started = time.time()
+        version = db_service.get_data_versions([ASN_ORGANIZATIONS]).get(ASN_ORGANIZATIONS)
+        cursor = db_service._db[ASN_ORGANIZATIONS].find({}, {"_id": 0, "asn": 1, "org_name": 1, "asn_name": 1})
+        table = ASNOrgTable((doc.get("asn"), doc.get("org_name") or doc.get("asn_name")) for doc in cursor)
+        # One reference swap: readers see the old table or the new one, never a mix
+        self._table, self._version = table, version
+        self._checked_at = time.time()
+        logger.info(f"[ASN ORGS] Loaded {len(table)} ASNs ({len(table.names)} organizations) in "
+                    f"{(time.time() - started) * 1000:.0f}ms")
+        return table
+
+    def table(self):
+        """The current table; an empty one when the database is unavailable."""
+        now = time.time()
+        if self._table is not None and now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return self._table
+        if not db_service.connect():
+            return self._table or ASNOrgTable([])
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    return self.reload()
+            return self._table
+        self._checked_at = now
+        version = db_service.get_data_versions([ASN_ORGANIZATIONS]).get(ASN_ORGANIZATIONS)
+        if version != self._version:
+            run_in_background("asn_org_reload", self.reload)
+        return self._table
+
+    def get(self, asn, default=None):
+        return self.table().get(asn, default)
+
+    def get_many(self, asns):
+        return self.table().get_many(asns)
+
+
+asn_org_service = ASNOrgService()
@@ -0,0 +1,294 @@
+"""
+ASN Search Service — in-memory typeahead over ASN numbers and organization names.
+
+The index is built from the denormalized `asn_directory` once per directory
+version and swapped in as a single reference, so readers never see a
+half-built index; a newer directory is loaded in the background while the
+previous index keeps serving.
+
+    prefix index    sorted (token, entry) arrays over org-name words and ASN
+                    numbers; a prefix is one bisect range
+    trigram index   posting arrays per trigram of the lower-cased org name;
+                    substring matches intersect them, fuzzy matches count
+                    shared trigrams with one np.bincount
+
+search() ranks exact ASN > name prefix > ASN prefix > word prefix >
+substring > fuzzy (trigram similarity); matching_asns() gives the exact
+substring semantics the directory's `search=` filter always had.
+"""
+
+import os
+import re
+import time
+import heapq
+import bisect
+import logging
+import threading
+import numpy as np
+from services.database_service import db_service
+from services.single_flight_service import run_in_background
+
+logger = logging.getLogger(__name__)
+
+ASN_DIRECTORY = db_service.COLLECTION_REGISTRY["ASN_DIRECTORY"]
+# How often a worker checks whether the directory (and so the index) changed
+RELOAD_CHECK_SECONDS = float(os.getenv("ASN_SEARCH_RELOAD_CHECK_SECONDS", "5"))
+# Minimum share of the query's trigrams a fuzzy match must contain
+FUZZY_THRESHOLD = 0.3
+
+# Ranking tiers (fuzzy matches score up to FUZZY_SCORE by trigram overlap)
+ASN_SCORE = 100
+PREFIX_SCORE = 90
+ASN_PREFIX_SCORE = 80
+WORD_PREFIX_SCORE = 70
+SUBSTRING_SCORE = 50
+FUZZY_SCORE = 40
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _match_kind(score):
+    if score >= ASN_SCORE:
+        return "asn"
+    if score >= PREFIX_SCORE:
+        return "prefix"
+    if score >= ASN_PREFIX_SCORE:
+        return "asn_prefix"
+    if score > SUBSTRING_SCORE:
+        return "word_prefix"
+    if score == SUBSTRING_SCORE:
+        return "substring"
+    return "fuzzy"
+
+
+class ASNSearchIndex:
+    """Immutable prefix + trigram index over one snapshot of the directory."""
+
+    def __init__(self, rows):
+        self.asns = []
+        self.names = []
+        self.countries = []
+        self.readiness = []
+        for row in rows:
+            if row.get("asn") is None:
+                continue
+            self.asns.append(int(row["asn"]))
+            self.names.append(row.get("org_name") or "")
+            self.countries.append(row.get("country"))
+            self.readiness.append(row.get("ipv6_percentage", 0))
+        n = len(self.asns)
+        self.lower = [name.lower() for name in self.names]
+        self.asn_ids = {asn: i for i, asn in enumerate(self.asns)}
+        self.country_index = {cc: code for code, cc in enumerate(sorted({c or "" for c in self.countries}))}
+        self.country_ids = np.array([self.country_index[c or ""] for c in self.countries], dtype=np.int16)
+        # Tie-break between equal scores: shorter names first, then lower ASNs
+        self.tie_rank = np.empty(n, dtype=np.float64)
+        self.tie_rank[sorted(range(n), key=lambda i: (len(self.names[i]), self.asns[i]))] = np.arange(n)
+
+        # Prefix index: (token, word position, entry) sorted by token; ASN numbers have position -1
+        prefix = []
+        for i, name in enumerate(self.lower):
+            prefix.append((str(self.asns[i]), -1, i))
+            for pos, token in enumerate(_TOKEN_RE.findall(name)):
+                prefix.append((token, pos, i))
+        prefix.sort()
+        self.tokens = [t for t, _, _ in prefix]
+        self.token_pos = np.array([p for _, p, _ in prefix], dtype=np.int32)
+        self.token_ids = np.array([i for _, _, i in prefix], dtype=np.int32)
+
+        # Trigram postings, each a sorted int32 array of entries; the leading
+        # space adds a word-start trigram so fuzzy matches favour the same start
+        postings = {}
+        for i, name in enumerate(self.lower):
+            for gram in trigrams(" " + name):
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.asns)
+
+    def _prefix_range(self, prefix):
+        lo = bisect.bisect_left(self.tokens, prefix)
+        hi = bisect.bisect_left(self.tokens, prefix + "\uffff")
+        return lo, hi
+
+    def _in_country(self, ids, country):
+        if not country:
+            return ids
+        code = self.country_index.get(country)
+        if code is None:
+            return ids[:0]
+        return ids[self.country_ids[ids] == code]
+
+    def matching_asns(self, term, country=None):
+        """ASNs whose org name contains `term` (case-insensitive) or whose number equals it."""
+        term = term.strip().lower()
+        if not term:
+            return []
+        grams = trigrams(term)
+        if grams:
+            lists = [self.postings.get(gram) for gram in grams]
+            if any(ids is None for ids in lists):
+                candidates = np.array([], dtype=np.int32)
+            else:
+                lists.sort(key=len)
+                candidates = lists[0]
+                for ids in lists[1:]:
+                    candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            ids = [i for i in self._in_country(candidates, country).tolist() if term in self.lower[i]]
+        else:
+            # Too short for a trigram: scan the (country's) names
+            ids = [i for i in self._in_country(np.arange(len(self.asns)), country).tolist()
+                   if term in self.lower[i]]
+        asns = [self.asns[i] for i in ids]
+        if term.isdigit() and int(term) in self.asn_ids:
+            i = self.asn_ids[int(term)]
+            if not country or self.countries[i] == country:
+                asns.append(int(term))
+        return list(dict.fromkeys(asns))
+
+    def _scores(self, q):
+        """Provisional score per entry (0 = no match) and the fuzzy fallback scores."""
+        n = len(self.asns)
+        scores = None
+        fuzzy = np.zeros(n, dtype=np.float64)
+        grams = trigrams(q)
+        lead = (" " + q)[:3]
+        lists = [self.postings[g] for g in grams | {lead} if g in self.postings]
+        if lists:
+            shared = np.bincount(np.concatenate(lists), minlength=n)
+            total = len(grams | {lead})
+            fuzzy = np.where(shared >= max(1, int(total * FUZZY_THRESHOLD)),
+                             np.round(FUZZY_SCORE * shared / total, 1), 0)
+            if grams:
+                core = shared
+                if lead not in grams and lead in self.postings:
+                    core = shared.copy()
+                    core[self.postings[lead]] -= 1
+                # Every trigram of the query present: very likely a substring (verified when ranked)
+                scores = np.where(core == len(grams), SUBSTRING_SCORE, fuzzy)
+        if scores is None:
+            # A separate array: the prefix pass below must not leak into the fuzzy fallback
+            scores = fuzzy.copy()
+
+        digits = q[2:] if q.startswith("as") and q[2:].isdigit() else q
+        lo, hi = self._prefix_range(digits if digits.isdigit() else q.split()[0])
+        if hi > lo:
+            pos = self.token_pos[lo:hi]
+            prefix_scores = np.where(pos == -1, ASN_PREFIX_SCORE,
+                                     np.where(pos == 0, PREFIX_SCORE, WORD_PREFIX_SCORE - np.minimum(pos, 10)))
+            # Ascending order, so an entry matching on several words keeps its best score
+            order = np.argsort(prefix_scores, kind="stable")
+            ids = self.token_ids[lo:hi][order]
+            scores[ids] = np.maximum(scores[ids], prefix_scores[order])
+        if digits.isdigit() and int(digits) in self.asn_ids:
+            scores[self.asn_ids[int(digits)]] = ASN_SCORE
+        return scores, fuzzy
+
+    def search(self, query, country=None, limit=10):
+        """Ranked typeahead matches: [{asn, org_name, country, ipv6_percentage, score, match}]."""
+        q = " ".join(query.strip().lower().split())
+        if not q or limit <= 0:
+            return []
+        scores, fuzzy = self._scores(q)
+        candidates = self._in_country(np.flatnonzero(scores), country)
+        if not len(candidates):
+            return []
+
+        # Best first: score, then the tie rank; only the head is sorted
+        order_key = self.tie_rank[candidates] - scores[candidates] * (len(self.asns) + 1)
+        multi_word = " " in q
+        results, deferred = [], []
+        take = min(len(candidates), limit * 4)
+        while True:
+            head = np.argpartition(order_key, take - 1)[:take] if take < len(candidates) else np.arange(len(candidates))
+            head = candidates[head[np.argsort(order_key[head])]]
+            results, deferred = [], []
+            for i in head.tolist():
+                score = float(scores[i])
+                # Provisional tiers that need the whole query in the name
+                if score == SUBSTRING_SCORE or (multi_word and ASN_SCORE > score > SUBSTRING_SCORE):
+                    if q not in self.lower[i]:
+                        if fuzzy[i] > 0:
+                            heapq.heappush(deferred, (-float(fuzzy[i]), self.tie_rank[i], i))
+                        continue
+                while deferred and -deferred[0][0] > score:
+                    fallback, _, j = heapq.heappop(deferred)
+                    results.append((j, -fallback))
+                results.append((i, score))
+                if len(results) >= limit:
+                    break
+            while deferred and len(results) < limit:
+                fallback, _, j = heapq.heappop(deferred)
+                results.append((j, -fallback))
+            if len(results) >= limit or take >= len(candidates):
+                break
+            take = min(len(candidates), take * 4)
+
+        return [{
+            "asn": self.asns[i],
+            "org_name": self.names[i],
+            "country": self.countries[i],
+            "ipv6_percentage": self.readiness[i],
+            "score": score,
+            "match": _match_kind(score)
+        } for i, score in results[:limit]]
+
+
+class ASNSearchService:
+    """Holds the current index and reloads it when the directory is rebuilt."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _directory_version(self):
+        return db_service.get_data_versions([ASN_DIRECTORY]).get(ASN_DIRECTORY)
+
+    def _load(self, version):
+        started = time.time()
+        rows = db_service._db[ASN_DIRECTORY].find(
+            {"country": {"$exists": True}}, {"_id": 0, "asn": 1, "org_name": 1, "country": 1, "ipv6_percentage": 1}
+        )
+        index = ASNSearchIndex(rows)
+        if not len(index):
+            return None
+        # One reference swap: readers see the old index or the new one, never a mix
+        self._index, self._version = index, version
+        logger.info(f"[ASN SEARCH] Indexed {len(index)} ASNs in {(time.time() - started) * 1000:.0f}ms")
+        return index
+
+    def index(self):
+        """The current index, or None when there is no directory to index yet."""
+        now = time.time()
+        if now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return self._index
+        if not db_service.connect():
+            return self._index
+        self._checked_at = now
+        version = self._directory_version()
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    return self._load(version)
+        elif version != self._version:
+            run_in_background("asn_search_reload", lambda: self._load(version))
+        return self._index
+
+    def search(self, query, country=None, limit=10):
+        index = self.index()
+        return index.search(query, country.upper() if country else None, limit) if index else []
+
+    def matching_asns(self, term, country=None):
+        """Substring matches from the index; None when it is unavailable (callers fall back to $regex)."""
+        index = self.index()
+        return index.matching_asns(term, country.upper() if country else None) if index else None
+
+
+asn_search_service = ASNSearchService()
@@ -1,5 +1,6 @@
 import logging
 import os
+import functools
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from services.database_service import db_service
@@ -12,6 +13,13 @@ from scripts.sync_authentic_gov_data import sync_authentic_gov_data
 from services.domain_monitor_service import APACDomainMonitorService
 from services.edu_monitor_service import APACEduMonitorService
 from services.dashboard_cache_service import dashboard_cache_service
+from services.external_data_service import external_data_service
+from services.map_payload_service import map_payload_service
+from services.ai_adoption_service import ai_adoption_service
+from services.country_profile_service import country_profile_service
+from services.asn_directory_service import asn_directory_service
+from services.single_flight_service import run_single_flight
+from services.query_monitor_service import query_monitor
 
 class AutomationService:
     def __init__(self):
@@ -26,7 +34,7 @@ class AutomationService:
 
         # 1. Daily Job: IPv6 Readiness scores (Most volatile)
         self.scheduler.add_job(
-            self.sync_ipv6_scores,
+            self._tracked('daily_ipv6_sync', self.sync_ipv6_scores),
             'cron',
             hour=2, # Run at 2 AM
             minute=0,
@@ -39,7 +47,7 @@ class AutomationService:
         # 2. Weekly Job: APNIC Registry & CAIDA Organizations
         # Run every Monday at 3 AM
         self.scheduler.add_job(
-            self.sync_registry_and_orgs,
+            self._tracked('weekly_asn_sync', self.sync_registry_and_orgs),
             'cron',
             day_of_week='mon',
             hour=3,
@@ -53,7 +61,7 @@ class AutomationService:
         # 3. Weekly Job: Education & Government Sector Refresh
         # Run every Sunday at 4 AM
         self.scheduler.add_job(
-            self.sync_sector_data,
+            self._tracked('weekly_sector_sync', self.sync_sector_data),
             'cron',
             day_of_week='sun',
             hour=4,
@@ -67,7 +75,7 @@ class AutomationService:
         # 4. Daily Job: Record Adoption Snapshots (for AI Prediction)
         # Run at Midnight
         self.scheduler.add_job(
-            self.record_daily_snapshots,
+            self._tracked('daily_prediction_snapshot', self.record_daily_snapshots),
             'cron',
             hour=0,
             minute=5,
@@ -77,25 +85,105 @@ class AutomationService:
             replace_existing=True
         )
 
-        # 5. Hourly Job: Dashboard Cache Rebuild (pre-compute heavy metrics)
+        # 5. Dashboard Cache: recompute only the sections whose inputs changed.
+        # Checking is one data_versions read, so it runs every few seconds.
         self.scheduler.add_job(
-            self.rebuild_dashboard_cache,
+            self._tracked('dashboard_cache_refresh', self.refresh_dashboard_cache),
             'interval',
-            hours=1,
-            id='hourly_dashboard_cache',
+            seconds=int(os.getenv('DASHBOARD_REFRESH_SECONDS', '5')),
+            id='dashboard_cache_refresh',
             max_instances=1,
             coalesce=True,
             replace_existing=True
         )
 
+        # 6. Benchmark ingestion (APNIC/Google/Cloudflare); unchanged sources are skipped by hash
+        self.scheduler.add_job(
+            self._tracked('benchmark_refresh', self.refresh_benchmarks),
+            'interval',
+            minutes=int(os.getenv('BENCHMARK_REFRESH_MINUTES', '60')),
+            next_run_time=datetime.now(),
+            id='benchmark_refresh',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+
+        # 7. Materialized AI adoption stats: rebuilt when stats, benchmarks or the model change
+        self.scheduler.add_job(
+            self._tracked('ai_stats_refresh', self.refresh_ai_stats),
+            'interval',
+            seconds=int(os.getenv('AI_STATS_REFRESH_SECONDS', '10')),
+            next_run_time=datetime.now(),
+            id='ai_stats_refresh',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+
+        # 8. Country profiles: one document per economy, rebuilt when any input changes
+        self.scheduler.add_job(
+            self._tracked('country_profiles_refresh', self.refresh_country_profiles),
+            'interval',
+            seconds=int(os.getenv('COUNTRY_PROFILES_REFRESH_SECONDS', '60')),
+            next_run_time=datetime.now(),
+            id='country_profiles_refresh',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+
+        # 9. ASN directory: re-derived when the registry, orgs, readiness or BGP data change
+        self.scheduler.add_job(
+            self._tracked('asn_directory_refresh', self.refresh_asn_directory),
+            'interval',
+            seconds=int(os.getenv('ASN_DIRECTORY_REFRESH_SECONDS', '60')),
+            next_run_time=datetime.now(),
+            id='asn_directory_refresh',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+
+        # 10. Map payload: rebuilt offline when the GeoJSON, stats or model change
+        self.scheduler.add_job(
+            self._tracked('map_payload_refresh', self.refresh_map_payload),
+            'interval',
+            seconds=int(os.getenv('MAP_PAYLOAD_REFRESH_SECONDS', '30')),
+            next_run_time=datetime.now(),
+            id='map_payload_refresh',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+
+        # 11. Startup: Build dashboard cache immediately so first visitor gets instant load
+        # 12. Startup Check: Record snapshot if missing for today
+        # Both run on the scheduler thread so they never block worker boot.
+        self.scheduler.add_job(
+            self._tracked('startup_dashboard_cache', self.refresh_dashboard_cache),
+            'date',
+            id='startup_dashboard_cache',
+            replace_existing=True
+        )
+        self.scheduler.add_job(
+            self._tracked('startup_snapshot_check', self.record_daily_snapshots),
+            'date',
+            kwargs={"startup_check": True},
+            id='startup_snapshot_check',
+            replace_existing=True
+        )
+
         self.scheduler.start()
         self.logger.info("[START] Automation Service Started (Pulse Engine Active)")
 
-        # 6. Startup: Build dashboard cache immediately so first visitor gets instant load
-        self.rebuild_dashboard_cache()
-
-        # 7. Startup Check: Record snapshot if missing for today
-        self.record_daily_snapshots(startup_check=True)
+    def _tracked(self, job_id, func):
+        """Wraps a job so its MongoDB queries are attributed to it in the query monitor."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_monitor.track(f"job:{job_id}"):
+                return func(*args, **kwargs)
+        return wrapper
 
     def rebuild_dashboard_cache(self):
         """Pre-computes all heavy dashboard metrics and stores in MongoDB cache."""
@@ -105,6 +193,55 @@ class AutomationService:
         except Exception as e:
             self.logger.error(f"[ERROR] Dashboard cache rebuild failed: {e}")
 
+    def refresh_dashboard_cache(self):
+        """Recomputes stale dashboard sections (no-op when nothing changed)."""
+        try:
+            dashboard_cache_service.refresh_stale_sections()
+        except Exception as e:
+            self.logger.error(f"[ERROR] Dashboard cache refresh failed: {e}")
+
+    def refresh_benchmarks(self):
+        """Ingests external benchmarks; one worker at a time across the deployment."""
+        try:
+            ran, summary = run_single_flight('benchmark_refresh', external_data_service.refresh_benchmarks, ttl=600)
+            if ran:
+                self.logger.info(f"[INFO] Benchmark refresh complete: {summary}")
+        except Exception as e:
+            self.logger.error(f"[ERROR] Benchmark refresh failed: {e}")
+
+    def refresh_ai_stats(self):
+        """Re-materializes the AI adoption view when its inputs changed (no-op otherwise)."""
+        try:
+            if ai_adoption_service.refresh():
+                self.logger.info("[INFO] AI adoption stats re-materialized")
+        except Exception as e:
+            self.logger.error(f"[ERROR] AI adoption stats refresh failed: {e}")
+
+    def refresh_country_profiles(self):
+        """Rebuilds the country profiles when one of their inputs changed (no-op otherwise)."""
+        try:
+            if country_profile_service.refresh():
+                self.logger.info("[INFO] Country profiles rebuilt")
+        except Exception as e:
+            self.logger.error(f"[ERROR] Country profile refresh failed: {e}")
+
+    def refresh_asn_directory(self):
+        """Rebuilds the ASN directory when one of its inputs changed (no-op otherwise)."""
+        try:
+            if asn_directory_service.refresh():
+                self.logger.info("[INFO] ASN directory rebuilt")
+        except Exception as e:
+            self.logger.error(f"[ERROR] ASN directory refresh failed: {e}")
+
+    def refresh_map_payload(self):
+        """Rebuilds the pre-compressed map payloads whose inputs changed."""
+        try:
+            ran, written = run_single_flight('map_payload_build', map_payload_service.build, ttl=600)
+            if ran and written:
+                self.logger.info(f"[INFO] Map payloads rebuilt: {written}")
+        except Exception as e:
+            self.logger.error(f"[ERROR] Map payload build failed: {e}")
+
     def sync_ipv6_scores(self):
         """Wrapper for fetch_ipv6_realtime logic."""
         self.logger.info("[INFO] Starting Daily IPv6 Score Sync...")
@@ -0,0 +1,249 @@
+"""
+BGP Graph Service — in-memory BGP topology in compressed sparse row form.
+
+`bgp_topology` (one downstream → upstream edge per document) is loaded once
+per data version into NumPy arrays:
+
+    asns                 sorted uint32 node table (ASN -> node id by binary search)
+    up_ptr / up_idx      forward CSR: node -> its upstream providers
+    down_ptr / down_idx  reverse CSR: node -> its downstream customers
+    up_src               per forward edge, an id into the interned source labels
+
+Neighbours are one slice, neighbour counts for any batch of ASNs one
+np.diff gather, and the transitive closure / shortest dependency path a
+frontier-at-a-time BFS over the CSR arrays, with no database round trips.
+A new topology (e.g. after ingest_bgp_topology swaps) is loaded in the
+background and swapped in as a single reference.
+"""
+
+import os
+import time
+import logging
+import threading
+import numpy as np
+from services.database_service import db_service
+from services.single_flight_service import run_in_background
+
+logger = logging.getLogger(__name__)
+
+BGP_TOPOLOGY = db_service.COLLECTION_REGISTRY["BGP_TOPOLOGY"]
+# How often a worker checks whether bgp_topology changed
+RELOAD_CHECK_SECONDS = float(os.getenv("BGP_GRAPH_RELOAD_CHECK_SECONDS", "30"))
+
+UP = "up"
+DOWN = "down"
+
+
+def _csr(src, dst, n):
+    """(indptr, indices, order) of the edges src -> dst, grouped by src and sorted by dst."""
+    order = np.lexsort((dst, src))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32), order
+
+
+class BGPGraph:
+    """Immutable CSR graph of one topology snapshot."""
+
+    def __init__(self, edges):
+        downs, ups, sources = [], [], []
+        labels = {}
+        for down, up, source in edges:
+            if down is None or up is None:
+                continue
+            downs.append(int(down))
+            ups.append(int(up))
+            sources.append(labels.setdefault(source, len(labels)))
+        self.sources = list(labels)
+
+        downs = np.array(downs, dtype=np.uint32)
+        ups = np.array(ups, dtype=np.uint32)
+        self.asns = np.unique(np.concatenate([downs, ups]))
+        n = len(self.asns)
+        down_ids = np.searchsorted(self.asns, downs)
+        up_ids = np.searchsorted(self.asns, ups)
+
+        self.up_ptr, self.up_idx, order = _csr(down_ids, up_ids, n)
+        self.up_src = np.array(sources, dtype=np.int16)[order]
+        self.down_ptr, self.down_idx, _ = _csr(up_ids, down_ids, n)
+        self.edges = len(downs)
+
+    def __len__(self):
+        return len(self.asns)
+
+    # ------------------------------------------------------------------
+    # Node ids
+    # ------------------------------------------------------------------
+    def node(self, asn):
+        """Node id of `asn`, or -1 when it is not in the topology."""
+        try:
+            asn = int(str(asn).upper().replace("AS", ""))
+        except ValueError:
+            return -1
+        if asn < 0 or not len(self.asns):
+            return -1
+        i = int(np.searchsorted(self.asns, asn))
+        return i if i < len(self.asns) and self.asns[i] == asn else -1
+
+    def nodes(self, asns):
+        """Node ids for a batch of ASNs (-1 where absent)."""
+        keys = np.array([int(a) for a in asns], dtype=np.int64)
+        if not len(keys) or not len(self.asns):
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.asns, keys), len(self.asns) - 1)
+        return np.where(self.asns[pos] == keys, pos, -1)
+
+    def _adjacency(self, direction):
+        return (self.up_ptr, self.up_idx) if direction == UP else (self.down_ptr, self.down_idx)
+
+    # ------------------------------------------------------------------
+    # Neighbours
+    # ------------------------------------------------------------------
+    def neighbours(self, asn, direction=UP):
+        """Direct upstream providers (UP) or downstream customers (DOWN) of `asn`."""
+        i = self.node(asn)
+        if i < 0:
+            return []
+        ptr, idx = self._adjacency(direction)
+        return self.asns[idx[ptr[i]:ptr[i + 1]]].tolist()
+
+    def upstream_edges(self, asn):
+        """[(upstream asn, source label)] for `asn`."""
+        i = self.node(asn)
+        if i < 0:
+            return []
+        lo, hi = self.up_ptr[i], self.up_ptr[i + 1]
+        return list(zip(self.asns[self.up_idx[lo:hi]].tolist(),
+                        (self.sources[s] for s in self.up_src[lo:hi].tolist())))
+
+    def degrees(self, asns, direction=UP):
+        """{asn: number of direct upstreams (UP) or customers (DOWN)} for a batch; 0 when unknown."""
+        asns = list(asns)
+        ids = self.nodes(asns)
+        ptr, _ = self._adjacency(direction)
+        known = ids >= 0
+        counts = np.zeros(len(asns), dtype=np.int64)
+        counts[known] = ptr[ids[known] + 1] - ptr[ids[known]]
+        return dict(zip((int(a) for a in asns), counts.tolist()))
+
+    def degree_map(self, direction=UP):
+        """{asn: direct upstream (UP) or customer (DOWN) count} for every ASN in the topology."""
+        ptr, _ = self._adjacency(direction)
+        return dict(zip(self.asns.tolist(), np.diff(ptr).tolist()))
+
+    def neighbours_many(self, asns, direction=UP):
+        """{asn: [neighbours]} for a batch."""
+        ptr, idx = self._adjacency(direction)
+        result = {}
+        for asn, i in zip(asns, self.nodes(asns).tolist()):
+            result[int(asn)] = self.asns[idx[ptr[i]:ptr[i + 1]]].tolist() if i >= 0 else []
+        return result
+
+    # ------------------------------------------------------------------
+    # Traversals
+    # ------------------------------------------------------------------
+    def _expand(self, frontier, ptr, idx):
+        """All neighbours of the frontier nodes, with the frontier node each came from."""
+        starts, ends = ptr[frontier], ptr[frontier + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        # Edge positions of every frontier node's slice, without a Python loop
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        return idx[offsets], np.repeat(frontier, lengths)
+
+    def closure(self, asn, direction=UP, max_depth=None):
+        """{asn: hops} of every ASN reachable from `asn` (transitive upstreams by default)."""
+        start = self.node(asn)
+        if start < 0:
+            return {}
+        ptr, idx = self._adjacency(direction)
+        depth = np.full(len(self.asns), -1, dtype=np.int32)
+        depth[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+        hops = 0
+        while len(frontier) and (max_depth is None or hops < max_depth):
+            hops += 1
+            reached, _ = self._expand(frontier, ptr, idx)
+            reached = np.unique(reached[depth[reached] < 0])
+            depth[reached] = hops
+            frontier = reached.astype(np.int64)
+        found = np.flatnonzero(depth > 0)
+        return dict(zip(self.asns[found].tolist(), depth[found].tolist()))
+
+    def shortest_path(self, source, target, direction=UP):
+        """ASN path from `source` to `target` along upstream (or downstream) edges, or None."""
+        start, goal = self.node(source), self.node(target)
+        if start < 0 or goal < 0:
+            return None
+        if start == goal:
+            return [int(self.asns[start])]
+        ptr, idx = self._adjacency(direction)
+        parent = np.full(len(self.asns), -1, dtype=np.int64)
+        parent[start] = start
+        frontier = np.array([start], dtype=np.int64)
+        while len(frontier) and parent[goal] < 0:
+            reached, came_from = self._expand(frontier, ptr, idx)
+            new = parent[reached] < 0
+            reached, came_from = reached[new], came_from[new]
+            # First discovery wins when several frontier nodes reach the same ASN
+            reached, first = np.unique(reached, return_index=True)
+            parent[reached] = came_from[first]
+            frontier = reached.astype(np.int64)
+        if parent[goal] < 0:
+            return None
+        path = [goal]
+        while path[-1] != start:
+            path.append(int(parent[path[-1]]))
+        return self.asns[path[::-1]].tolist()
+
+    def stats(self):
+        arrays = (self.asns, self.up_ptr, self.up_idx, self.up_src, self.down_ptr, self.down_idx)
+        return {"asns": len(self.asns), "edges": self.edges, "array_bytes": int(sum(a.nbytes for a in arrays))}
+
+
+class BGPGraphService:
+    """Holds the current graph and reloads it when bgp_topology changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._graph = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def reload(self):
+        """Loads the current topology and swaps the graph in; returns it."""
+        if not db_service.connect():
+            return self._graph
+        started = time.time()
+        version = db_service.get_data_versions([BGP_TOPOLOGY]).get(BGP_TOPOLOGY)
+        cursor = db_service._db[BGP_TOPOLOGY].find({}, {"_id": 0, "downstream_asn": 1, "upstream_asn": 1, "source": 1})
+        graph = BGPGraph((doc.get("downstream_asn"), doc.get("upstream_asn"), doc.get("source")) for doc in cursor)
+        # One reference swap: readers see the old graph or the new one, never a mix
+        self._graph, self._version = graph, version
+        self._checked_at = time.time()
+        logger.info(f"[BGP GRAPH] Loaded {graph.edges} edges over {len(graph)} ASNs in "
+                    f"{(time.time() - started) * 1000:.0f}ms")
+        return graph
+
+    def graph(self):
+        """The current graph, or None when the database is unavailable before the first load."""
+        now = time.time()
+        if self._graph is not None and now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return self._graph
+        if not db_service.connect():
+            return self._graph
+        if self._graph is None:
+            with self._lock:
+                if self._graph is None:
+                    return self.reload()
+            return self._graph
+        self._checked_at = now
+        version = db_service.get_data_versions([BGP_TOPOLOGY]).get(BGP_TOPOLOGY)
+        if version != self._version:
+            run_in_background("bgp_graph_reload", self.reload)
+        return self._graph
+
+
+bgp_graph_service = BGPGraphService()
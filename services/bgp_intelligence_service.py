@@ -1,35 +1,31 @@
 import logging
 from services.database_service import db_service
+from services.asn_org_service import asn_org_service
+from services.bgp_graph_service import bgp_graph_service, UP, DOWN
 
 class BGPIntelligenceService:
-    def __init__(self):
-        self.db_connected = db_service.connect()
-        
+    @property
+    def db_connected(self):
+        return db_service.connect()
+
     def get_upstream_providers(self, asn):
         """
         Returns a list of direct upstream providers (ASNs that traverse traffic TO this ASN).
-        Query: downstream_asn = THIS_ASN
+        Served from the in-memory topology graph and ASN org table.
         """
-        if not self.db_connected: return []
-        
         try:
-            pipeline = [
-                {"$match": {"downstream_asn": int(asn)}},
-                {"$lookup": {
-                    "from": db_service.COLLECTION_REGISTRY["ASN_ORGANIZATIONS"],
-                    "localField": "upstream_asn",
-                    "foreignField": "asn",
-                    "as": "org_info"
-                }},
-                {"$project": {
-                    "_id": 0,
-                    "asn": "$upstream_asn",
-                    "org_name": {"$arrayElemAt": ["$org_info.org_name", 0]},
-                    "source": 1
-                }}
-            ]
+            graph = bgp_graph_service.graph()
+            if graph is None: return []
             
-            return list(db_service.bgp_topology.aggregate(pipeline))
+            edges = graph.upstream_edges(asn)
+            names = asn_org_service.get_many(up for up, _ in edges)
+            providers = []
+            for up, source in edges:
+                provider = {"asn": up, "source": source}
+                if up in names:
+                    provider["org_name"] = names[up]
+                providers.append(provider)
+            return providers
         except Exception as e:
             logging.error(f"BGP Upstream lookup failed: {e}")
             return []
@@ -39,16 +35,53 @@ class BGPIntelligenceService:
         Returns a list of direct customers (ASNs that this ASN provides transit FOR).
         Query: upstream_asn = THIS_ASN
         """
-        if not self.db_connected: return []
-        
         try:
-            # Simple list for customers, maybe count is enough for UI
-            cursor = db_service.bgp_topology.find({"upstream_asn": int(asn)}, {"downstream_asn": 1})
-            return [doc['downstream_asn'] for doc in cursor]
+            graph = bgp_graph_service.graph()
+            if graph is None: return []
+            
+            return graph.neighbours(asn, DOWN)
         except Exception as e:
             logging.error(f"BGP Downstream lookup failed: {e}")
             return []
 
+    def get_transitive_upstreams(self, asn, max_depth=None):
+        """Every ASN this ASN depends on for transit, with its distance in hops."""
+        try:
+            graph = bgp_graph_service.graph()
+            if graph is None: return []
+            hops = graph.closure(asn, UP, max_depth)
+            names = asn_org_service.get_many(hops)
+            return [{"asn": up, "hops": depth, "org_name": names.get(up)}
+                    for up, depth in sorted(hops.items(), key=lambda item: (item[1], item[0]))]
+        except Exception as e:
+            logging.error(f"BGP Transitive upstream lookup failed: {e}")
+            return []
+
+    def get_dependency_path(self, asn, target):
+        """Shortest upstream chain from `asn` to `target` (e.g. a tier-1), or None."""
+        try:
+            graph = bgp_graph_service.graph()
+            if graph is None: return None
+            path = graph.shortest_path(asn, target, UP)
+            if path is None:
+                return None
+            names = asn_org_service.get_many(path)
+            return [{"asn": hop, "org_name": names.get(hop)} for hop in path]
+        except Exception as e:
+            logging.error(f"BGP Dependency path lookup failed: {e}")
+            return None
+
+    def get_upstream_counts(self, asns):
+        """{asn: direct upstream count} for a batch of ASNs."""
+        asns = [int(a) for a in asns]
+        try:
+            graph = bgp_graph_service.graph()
+            if graph is None: return {a: 0 for a in asns}
+            return graph.degrees(asns, UP)
+        except Exception as e:
+            logging.error(f"BGP Upstream count lookup failed: {e}")
+            return {a: 0 for a in asns}
+
     def analyze_resilience(self, asn):
         """
         Calculates a Resilience Score based on path diversity.
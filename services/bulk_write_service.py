@@ -0,0 +1,243 @@
+"""
+Bulk Write Service — shared streaming writer for every ingestion path.
+
+Callers add operations one at a time; the writer keeps a bounded buffer,
+cuts unordered `bulk_write` batches by encoded size, keeps a few batches in
+flight on a small thread pool and retries batches that fail transiently.
+Memory stays flat no matter how large the source file is.
+
+    with BulkWriter(db["asn_registry_staging"], label="asn registry") as writer:
+        for doc in parse():
+            writer.insert(doc)
+    writer.stats()  # ops, batches, retries, docs/sec ...
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bson
+from pymongo import InsertOne, UpdateOne, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import AutoReconnect, BulkWriteError, NetworkTimeout, ExecutionTimeout
+from services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying a whole batch for (primary step-down, network blips)
+TRANSIENT_ERRORS = (AutoReconnect, NetworkTimeout, ExecutionTimeout)
+# Write errors inside a BulkWriteError that are safe to retry individually
+RETRYABLE_WRITE_CODES = {6, 7, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+DUPLICATE_KEY = 11000
+
+
+def _op_size(op):
+    """Encoded size of a write model (document/update plus filter), used to cut batches."""
+    try:
+        size = 0
+        for attr in ("_doc", "_filter"):
+            part = getattr(op, attr, None)
+            if part:
+                size += len(bson.encode(part)) if isinstance(part, dict) else 1024
+        return size or 64
+    except Exception:
+        return 1024
+
+
+class BulkWriter:
+    """Buffered, batched, parallel writer for a single collection."""
+
+    def __init__(self, collection, label=None, batch_bytes=None, max_batch_ops=None,
+                 max_in_flight=None, max_retries=3, ordered=False, bump_version=None):
+        self.collection = collection
+        # Stamp data_versions on close so caches keyed on it see the new data;
+        # staging collections are stamped by swap_collection() instead.
+        name = getattr(collection, "name", "")
+        self.bump_version = bump_version if bump_version is not None else not name.endswith("_staging")
+        self.label = label or getattr(collection, "name", "bulk")
+        self.batch_bytes = batch_bytes or int(os.getenv("BULK_BATCH_BYTES", str(4 * 1024 * 1024)))
+        self.max_batch_ops = max_batch_ops or int(os.getenv("BULK_BATCH_OPS", "5000"))
+        self.max_in_flight = max_in_flight or int(os.getenv("BULK_MAX_IN_FLIGHT", "3"))
+        self.max_retries = max_retries
+        self.ordered = ordered
+
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                            thread_name_prefix=f"bulk-{self.label}")
+        self._futures = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._started = time.time()
+        self._finished = None
+        self._stats = {
+            "ops": 0, "bytes": 0, "batches": 0, "retries": 0,
+            "inserted": 0, "matched": 0, "modified": 0, "upserted": 0, "deleted": 0,
+            "duplicates": 0, "failed_ops": 0, "failed_batches": 0
+        }
+
+    # ------------------------------------------------------------------
+    # Producer API
+    # ------------------------------------------------------------------
+    def add(self, op):
+        """Queues a pymongo write model (a plain dict is treated as InsertOne)."""
+        if self._closed:
+            raise RuntimeError(f"BulkWriter '{self.label}' is closed")
+        if isinstance(op, dict):
+            op = InsertOne(op)
+        size = _op_size(op)
+        if self._buffer and (self._buffer_bytes + size > self.batch_bytes
+                             or len(self._buffer) >= self.max_batch_ops):
+            self._dispatch()
+        self._buffer.append(op)
+        self._buffer_bytes += size
+
+    def insert(self, doc):
+        self.add(InsertOne(doc))
+
+    def update(self, filter, update, upsert=False):
+        self.add(UpdateOne(filter, update, upsert=upsert))
+
+    def replace(self, filter, doc, upsert=False):
+        self.add(ReplaceOne(filter, doc, upsert=upsert))
+
+    def delete(self, filter):
+        self.add(DeleteOne(filter))
+
+    def delete_many(self, filter):
+        self.add(DeleteMany(filter))
+
+    def extend(self, ops):
+        for op in ops:
+            self.add(op)
+
+    def flush(self):
+        """Sends the buffered batch and waits for every in-flight batch."""
+        if self._buffer:
+            self._dispatch()
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        if self._closed:
+            return self.stats()
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+            self._finished = time.time()
+        stats = self.stats()
+        if self.bump_version and stats["ops"]:
+            db_service.bump_data_version(self.collection.name)
+        logger.info(
+            f"[BULK] {self.label}: {stats['ops']} ops in {stats['batches']} batches, "
+            f"{stats['elapsed_sec']}s ({stats['ops_per_sec']} ops/s, {stats['mb_per_sec']} MB/s), "
+            f"retries={stats['retries']} failed={stats['failed_ops']}"
+        )
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return False
+        # The body failed: still close, but never let a flush error replace the original exception
+        try:
+            self.close()
+        except Exception as e:
+            logger.error(f"[BULK] {self.label}: flush after {exc_type.__name__} also failed: {e}")
+        return False
+
+    # ------------------------------------------------------------------
+    # Batch execution
+    # ------------------------------------------------------------------
+    def _dispatch(self):
+        batch, size = self._buffer, self._buffer_bytes
+        self._buffer, self._buffer_bytes = [], 0
+        # Backpressure: block the producer while max_in_flight batches are outstanding
+        self._slots.acquire()
+        self._futures = [f for f in self._futures if not f.done() or f.exception()]
+        self._futures.append(self._executor.submit(self._run_batch, batch, size))
+
+    def _run_batch(self, batch, size):
+        attempt = 0
+        pending = batch
+        upsert_retried = set()   # ids of upserts already retried after a duplicate-key race
+        try:
+            while pending:
+                backoff = True
+                try:
+                    result = self.collection.bulk_write(pending, ordered=self.ordered)
+                    self._record(result.bulk_api_result, len(pending))
+                    pending = []
+                except BulkWriteError as e:
+                    details = e.details or {}
+                    errors = details.get("writeErrors", [])
+                    # Ordered batches stop at the first error; the ops after it were never attempted
+                    unattempted = pending[errors[-1]["index"] + 1:] if self.ordered and errors else []
+                    self._record(details, len(pending) - len(errors) - len(unattempted))
+                    retry = []
+                    for err in errors:
+                        op = pending[err["index"]]
+                        if (err.get("code") == DUPLICATE_KEY and getattr(op, "_upsert", False)
+                                and id(op) not in upsert_retried):
+                            # Two concurrent upserts of one key: the loser succeeds as an update on retry
+                            upsert_retried.add(id(op))
+                            retry.append(op)
+                        elif err.get("code") == DUPLICATE_KEY:
+                            with self._lock:
+                                self._stats["duplicates"] += 1
+                        elif err.get("code") in RETRYABLE_WRITE_CODES and attempt < self.max_retries:
+                            retry.append(op)
+                        else:
+                            with self._lock:
+                                self._stats["failed_ops"] += 1
+                            logger.warning(f"[BULK] {self.label}: write error {err.get('code')}: {err.get('errmsg')}")
+                    backoff = bool(retry)
+                    pending = retry + unattempted
+                except TRANSIENT_ERRORS as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    logger.warning(f"[BULK] {self.label}: transient error, retrying batch ({e})")
+                if pending and backoff:
+                    attempt += 1
+                    with self._lock:
+                        self._stats["retries"] += 1
+                    time.sleep(min(0.5 * (2 ** (attempt - 1)), 8))
+            with self._lock:
+                self._stats["bytes"] += size
+        except Exception as e:
+            with self._lock:
+                self._stats["failed_batches"] += 1
+                self._stats["failed_ops"] += len(pending)
+            logger.error(f"[BULK] {self.label}: batch of {len(pending)} ops failed: {e}")
+            raise
+        finally:
+            self._slots.release()
+
+    def _record(self, result, ops):
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["ops"] += max(ops, 0)
+            self._stats["inserted"] += result.get("nInserted", 0)
+            self._stats["matched"] += result.get("nMatched", 0)
+            self._stats["modified"] += result.get("nModified", 0)
+            self._stats["upserted"] += result.get("nUpserted", 0)
+            self._stats["deleted"] += result.get("nRemoved", 0)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        elapsed = (self._finished or time.time()) - self._started
+        stats["elapsed_sec"] = round(elapsed, 2)
+        stats["ops_per_sec"] = round(stats["ops"] / elapsed, 1) if elapsed > 0 else 0
+        stats["mb_per_sec"] = round(stats["bytes"] / 1048576 / elapsed, 2) if elapsed > 0 else 0
+        return stats
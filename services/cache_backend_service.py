@@ -0,0 +1,388 @@
+"""
+Cache Backend Service — one cache interface for the services, three tiers.
+
+    LocalCache    in-process LRU with TTL (always the first tier)
+    DiskCache     SQLite file shared by every worker on the host (WAL mode)
+    RedisCache    networked tier for multi-host deployments (optional `redis`)
+
+CACHE_BACKEND selects the shared tier: "local" (default, per-process only),
+"disk" or "redis". With a shared tier the caches are TieredCache(local,
+shared): reads hit process memory first and fill it from the shared tier, so
+workers stop warming their own copies and converge after a refresh.
+
+Every backend has the same semantics:
+- get(key, version=None): an entry written with a different version is a miss
+  (and is dropped), so callers invalidate by bumping the version they pass,
+  typically a data_versions stamp, which is identical across workers.
+- set(key, value, ttl=None, version=None); TTL in seconds, None = default.
+- Bounded size with LRU eviction (entries for LocalCache, bytes for DiskCache,
+  Redis maxmemory for RedisCache).
+- stats(): hits, misses, stale (version mismatch), sets, evictions, expired.
+"""
+
+import os
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local").lower()
+CACHE_DISK_PATH = os.getenv("CACHE_DISK_PATH", os.path.join(os.getcwd(), '.cache', 'shared_cache.sqlite'))
+CACHE_DISK_MAX_BYTES = int(os.getenv("CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+# A disk hit only rewrites its LRU timestamp when it is older than this, so reads stay reads
+CACHE_DISK_TOUCH_SECONDS = float(os.getenv("CACHE_DISK_TOUCH_SECONDS", "60"))
+# The namespace size is summed at most this often (or after max_bytes / 20 written here)
+CACHE_DISK_EVICT_SECONDS = float(os.getenv("CACHE_DISK_EVICT_SECONDS", "30"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Bound on how long the process tier may serve an entry a shared tier has since replaced
+CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", "5"))
+
+
+class CacheBackend:
+    """Shared bookkeeping; subclasses implement _get/_set/_delete/_clear."""
+
+    def __init__(self, name, default_ttl=None):
+        self.name = name
+        self.default_ttl = default_ttl
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "sets": 0, "evictions": 0, "expired": 0}
+
+    def _count(self, stat, n=1):
+        with self._stats_lock:
+            self._stats[stat] += n
+
+    def _expiry(self, ttl):
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    def get(self, key, default=None, version=None):
+        found = self._get(key)
+        if found is _MISSING:
+            self._count("misses")
+            return default
+        stored_version, value = found
+        if version is not None and stored_version != version:
+            self._count("stale")
+            self._count("misses")
+            self._delete(key)
+            return default
+        self._count("hits")
+        return value
+
+    def get_many(self, keys, version=None):
+        """{key: value} for the keys present (and current for `version`)."""
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING, version)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None, version=None):
+        self._set(key, value, self._expiry(ttl), version)
+        self._count("sets")
+
+    def set_many(self, items, ttl=None, version=None):
+        for key, value in items.items():
+            self.set(key, value, ttl, version)
+
+    def delete(self, key):
+        self._delete(key)
+
+    def clear(self):
+        self._clear()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0
+        stats["backend"] = type(self).__name__
+        stats["name"] = self.name
+        return stats
+
+
+class LocalCache(CacheBackend):
+    """In-process LRU with per-entry TTL."""
+
+    def __init__(self, name, max_entries=1024, default_ttl=None):
+        super().__init__(name, default_ttl)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, version, value)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] is not None and entry[0] <= time.time():
+                del self._entries[key]
+                expired = True
+            else:
+                self._entries.move_to_end(key)
+                expired = False
+        if expired:
+            self._count("expired")
+            return _MISSING
+        return entry[1], entry[2]
+
+    def _set(self, key, value, expires_at, version):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires_at, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+    def _delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        stats = super().stats()
+        stats["entries"] = len(self._entries)
+        return stats
+
+
+class DiskCache(CacheBackend):
+    """
+    SQLite-backed cache shared by the workers of one host. Values are pickled;
+    the least recently used entries are evicted once the namespace exceeds
+    max_bytes. LRU order is coarse (a hit refreshes accessed_at at most every
+    CACHE_DISK_TOUCH_SECONDS) and the size check is sampled, so hits do not
+    take the SQLite write lock and writes do not scan the namespace.
+    """
+
+    def __init__(self, name, path=CACHE_DISK_PATH, max_bytes=CACHE_DISK_MAX_BYTES, default_ttl=None):
+        super().__init__(name, default_ttl)
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._evict_lock = threading.Lock()
+        self._evict_checked_at = 0.0
+        self._written = 0    # bytes this process wrote since the last size check
+        self._execute(
+            'CREATE TABLE IF NOT EXISTS cache (namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, '
+            'version TEXT, expires_at REAL, accessed_at REAL NOT NULL, size INTEGER NOT NULL, '
+            'PRIMARY KEY (namespace, key))'
+        )
+        self._execute('CREATE INDEX IF NOT EXISTS ix_cache_lru ON cache (namespace, accessed_at)')
+
+    def _conn(self):
+        # Connections are per thread and per process (a forked worker must not reuse the parent's)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _execute(self, sql, params=()):
+        return self._conn().execute(sql, params)
+
+    @staticmethod
+    def _key(key):
+        return repr(key)
+
+    def _get(self, key):
+        row = self._execute('SELECT value, version, expires_at, accessed_at FROM cache '
+                            'WHERE namespace = ? AND key = ?', (self.name, self._key(key))).fetchone()
+        if row is None:
+            return _MISSING
+        now = time.time()
+        if row[2] is not None and row[2] <= now:
+            self._delete(key)
+            self._count("expired")
+            return _MISSING
+        if now - row[3] >= CACHE_DISK_TOUCH_SECONDS:
+            self._execute('UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?',
+                          (now, self.name, self._key(key)))
+        return (pickle.loads(row[1]) if row[1] is not None else None), pickle.loads(row[0])
+
+    def _set(self, key, value, expires_at, version):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        stored_version = pickle.dumps(version, protocol=pickle.HIGHEST_PROTOCOL) if version is not None else None
+        self._execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?)',
+                      (self.name, self._key(key), blob, stored_version, expires_at, time.time(), len(blob)))
+        with self._evict_lock:
+            self._written += len(blob)
+            due = (self._written >= self.max_bytes / 20
+                   or time.time() - self._evict_checked_at >= CACHE_DISK_EVICT_SECONDS)
+            if due:
+                self._written = 0
+                self._evict_checked_at = time.time()
+        if due:
+            self._evict()
+
+    def _evict(self):
+        total = self._execute('SELECT COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?',
+                              (self.name,)).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self._execute('SELECT key, size FROM cache WHERE namespace = ? ORDER BY accessed_at',
+                             (self.name,)).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes * 0.9:
+                break
+            self._execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (self.name, key))
+            total -= size
+            evicted += 1
+        self._count("evictions", evicted)
+
+    def _delete(self, key):
+        self._execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (self.name, self._key(key)))
+
+    def _clear(self):
+        self._execute('DELETE FROM cache WHERE namespace = ?', (self.name,))
+
+    def stats(self):
+        stats = super().stats()
+        try:
+            row = self._execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?',
+                                (self.name,)).fetchone()
+            stats["entries"], stats["bytes"] = row
+        except sqlite3.Error:
+            pass
+        return stats
+
+
+class RedisCache(CacheBackend):
+    """Networked tier; eviction is Redis' own maxmemory policy (allkeys-lru recommended)."""
+
+    def __init__(self, name, url=CACHE_REDIS_URL, default_ttl=None):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis needs the `redis` package")
+        super().__init__(name, default_ttl)
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, key):
+        return f"apac:{self.name}:{key!r}"
+
+    def _get(self, key):
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            return _MISSING
+        return pickle.loads(raw)
+
+    def _set(self, key, value, expires_at, version):
+        raw = pickle.dumps((version, value), protocol=pickle.HIGHEST_PROTOCOL)
+        ttl = max(1, int(expires_at - time.time())) if expires_at else None
+        self._client.set(self._key(key), raw, ex=ttl)
+
+    def _delete(self, key):
+        self._client.delete(self._key(key))
+
+    def _clear(self):
+        for key in self._client.scan_iter(match=f"apac:{self.name}:*"):
+            self._client.delete(key)
+
+
+class TieredCache(CacheBackend):
+    """Process-local LRU in front of a shared tier; shared hits are copied into the local tier."""
+
+    def __init__(self, name, local, shared, local_ttl=CACHE_LOCAL_TTL):
+        super().__init__(name, shared.default_ttl)
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+
+    def get(self, key, default=None, version=None):
+        value = self.local.get(key, _MISSING, version)
+        if value is _MISSING:
+            try:
+                value = self.shared.get(key, _MISSING, version)
+            except Exception as e:
+                logger.warning(f"[CACHE] Shared tier read failed for {self.name}: {e}")
+                value = _MISSING
+            if value is not _MISSING:
+                self.local.set(key, value, ttl=self.local_ttl, version=version)
+        self._count("hits" if value is not _MISSING else "misses")
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None, version=None):
+        local_ttl = min(ttl, self.local_ttl) if ttl else self.local_ttl
+        self.local.set(key, value, ttl=local_ttl, version=version)
+        try:
+            self.shared.set(key, value, ttl=ttl, version=version)
+        except Exception as e:
+            logger.warning(f"[CACHE] Shared tier write failed for {self.name}: {e}")
+        self._count("sets")
+
+    def delete(self, key):
+        self.local.delete(key)
+        try:
+            self.shared.delete(key)
+        except Exception as e:
+            logger.warning(f"[CACHE] Shared tier delete failed for {self.name}: {e}")
+
+    def clear(self):
+        self.local.clear()
+        try:
+            self.shared.clear()
+        except Exception as e:
+            logger.warning(f"[CACHE] Shared tier clear failed for {self.name}: {e}")
+
+    def stats(self):
+        stats = super().stats()
+        stats["tiers"] = {"local": self.local.stats(), "shared": self.shared.stats()}
+        return stats
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(name, max_entries=1024, default_ttl=None, max_bytes=None):
+    """
+    The cache for namespace `name`, built once per process for the configured
+    CACHE_BACKEND. An unavailable shared tier degrades to the local cache.
+    """
+    with _registry_lock:
+        cache = _registry.get(name)
+        if cache is not None:
+            return cache
+        local = LocalCache(name, max_entries=max_entries, default_ttl=default_ttl)
+        cache = local
+        try:
+            if CACHE_BACKEND == "disk":
+                cache = TieredCache(name, local, DiskCache(
+                    name, max_bytes=max_bytes or CACHE_DISK_MAX_BYTES, default_ttl=default_ttl))
+            elif CACHE_BACKEND == "redis":
+                cache = TieredCache(name, local, RedisCache(name, default_ttl=default_ttl))
+        except Exception as e:
+            logger.error(f"[CACHE] {CACHE_BACKEND} backend unavailable for {name}, using local only: {e}")
+        _registry[name] = cache
+        return cache
+
+
+def cache_stats():
+    """Metrics for every cache namespace created in this process."""
+    with _registry_lock:
+        caches = dict(_registry)
+    return {name: cache.stats() for name, cache in caches.items()}
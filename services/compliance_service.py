@@ -3,9 +3,10 @@ from services.database_service import db_service
 import logging
 
 class ComplianceService:
-    def __init__(self):
-        self.db_connected = db_service.connect()
-        
+    @property
+    def db_connected(self):
+        return db_service.connect()
+
     def get_compliance_report(self):
         """
         Generates a report comparing Mandated Targets vs Real-World Adoption.
@@ -14,7 +15,7 @@ class ComplianceService:
         
         try:
             # 1. Get all mandates
-            mandates = list(db_service.policy_mandates.find({}))
+            mandates = db_service.cached_find(db_service.COLLECTION_REGISTRY["POLICY_MANDATES"])
             report = []
             
             for m in mandates:
@@ -53,6 +54,7 @@ class ComplianceService:
                 
                 report.append({
                     "country": m.get('country_name', country),
+                    "country_code": country,
                     "deadline": target_year,
                     "target_pct": target_pct,
                     "current_pct": round(real_pct, 1),
@@ -0,0 +1,191 @@
+"""
+Country Profile Service — one precomputed document per economy.
+
+A country drill-down used to fan out to the lab stats, sector rankings, peer
+benchmarks (three aggregations), forecasts, the ASN directory and the
+compliance report, each recomputing from raw collections. The profile job
+assembles all of it for every economy in one batched pass:
+
+    national      materialized AI adoption (apac_ipv6_ai)
+    government    readiness score/rank/breakdown  (ranking engine)
+    education     readiness score/rank/breakdown
+    peer_gaps     ISP vs academic vs government averages and the gap index
+    forecast      completion forecast per sector (one history read for all)
+    asn_summary   registered / measured ASNs and the average capability
+    compliance    mandate target vs current status
+
+Profiles are rebuilt when any input's data version moves, written to a
+staging collection and swapped in, so a drill-down is one indexed read of a
+consistent, versioned document (`profile_version` = the inputs it was built from).
+"""
+
+import os
+import hashlib
+import logging
+from datetime import datetime
+from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+from services.single_flight_service import DistributedLock, run_in_background
+
+logger = logging.getLogger(__name__)
+
+COUNTRY_PROFILES = db_service.COLLECTION_REGISTRY["COUNTRY_PROFILES"]
+PROFILES_STAGING = f"{COUNTRY_PROFILES}_staging"
+
+# data_versions keys the profiles are derived from
+INPUTS = [db_service.COLLECTION_REGISTRY[key] for key in (
+    "APAC_AI_STATS", "COUNTRY_CODES", "GOV_SCANS", "EDU_SCANS", "GOV_DOMAINS", "HISTORY_LOGS",
+    "ASN_REGISTRY", "ASN_READINESS", "POLICY_MANDATES"
+)]
+INPUTS_KEY = f"materialized:{COUNTRY_PROFILES}"
+REBUILD_LOCK = "country_profiles_rebuild"
+REBUILD_LOCK_TTL = int(os.getenv("COUNTRY_PROFILES_REBUILD_LOCK_TTL", "600"))
+SECTORS = ("government", "education")
+
+
+def profile_version(versions):
+    """Short, stable identifier of the input versions a profile was built from."""
+    key = ",".join(f"{name}={versions.get(name, 0)}" for name in sorted(versions))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class CountryProfileService:
+    """Builds and serves the per-country profile documents."""
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    def _recorded_inputs(self):
+        meta = db_service._db['system_metadata'].find_one({"key": INPUTS_KEY})
+        return (meta or {}).get("inputs")
+
+    def is_built(self):
+        return bool(db_service.connect() and self._recorded_inputs() is not None)
+
+    def refresh(self, force=False):
+        """Rebuilds all profiles when an input changed; True when a new set was swapped in."""
+        if not db_service.connect():
+            return False
+        versions = db_service.get_data_versions(INPUTS)
+        if not force and self._recorded_inputs() == versions:
+            return False
+
+        with DistributedLock(REBUILD_LOCK, ttl=REBUILD_LOCK_TTL) as acquired:
+            if not acquired:
+                return False
+            versions = db_service.get_data_versions(INPUTS)
+            if not force and self._recorded_inputs() == versions:
+                return False
+
+            started = datetime.now()
+            profiles = self.build_profiles(versions=versions)
+            if not profiles:
+                logger.warning("[PROFILES] No economies to profile; nothing written")
+                return False
+
+            db = db_service._db
+            db[PROFILES_STAGING].drop()
+            with BulkWriter(db[PROFILES_STAGING], label="country profiles staging") as writer:
+                writer.extend(profiles)
+            if not db_service.swap_collection(PROFILES_STAGING, "COUNTRY_PROFILES"):
+                return False
+            db['system_metadata'].update_one(
+                {"key": INPUTS_KEY},
+                {"$set": {"inputs": versions, "countries": len(profiles), "built_at": started.isoformat()}},
+                upsert=True
+            )
+            logger.info(f"[PROFILES] Built {len(profiles)} country profiles in "
+                        f"{(datetime.now() - started).total_seconds():.2f}s")
+            return True
+
+    def build_profiles(self, countries=None, versions=None):
+        """
+        Assembles profile documents for `countries` (default: every economy in
+        the country codes). Every section is one batched read for all of them.
+        """
+        from services.ai_adoption_service import ai_adoption_service
+        from services.asn_intelligence_service import asn_intel_service
+        from services.compliance_service import compliance_service
+        from services.forecasting_service import forecasting_service
+        from services.domain_monitor_service import APACDomainMonitorService
+        from services.edu_monitor_service import APACEduMonitorService
+
+        names = {c["code"]: c.get("name", c["code"]) for c in db_service.cached_find(
+            db_service.COLLECTION_REGISTRY["COUNTRY_CODES"], {}, {"_id": 0, "code": 1, "name": 1},
+            copy_result=False) if c.get("code")}
+        codes = [c.upper() for c in countries if not names or c.upper() in names] if countries else sorted(names)
+        if not codes:
+            return []
+
+        versions = versions or db_service.get_data_versions(INPUTS)
+        version = profile_version(versions)
+        built_at = datetime.now().isoformat()
+
+        national = ai_adoption_service.get_all()
+        gov_ranking = {r["country"]: r for r in APACDomainMonitorService().get_detailed_stats().get("ranking", [])}
+        edu_ranking = {r["country"]: r for r in APACEduMonitorService().get_detailed_stats().get("ranking", [])}
+        peers = asn_intel_service.get_peer_benchmarks_all(codes)
+        asn_counts = asn_intel_service.get_country_asn_counts(codes)
+        compliance = {row.get("country_code"): row for row in compliance_service.get_compliance_report()}
+        forecasts = self._forecasts(codes, forecasting_service)
+
+        profiles = []
+        for cc in codes:
+            peer = peers.get(cc, {})
+            profiles.append({
+                "_id": cc,
+                "country": cc,
+                "name": names.get(cc, cc),
+                "national": national.get(cc),
+                "government": gov_ranking.get(cc),
+                "education": edu_ranking.get(cc),
+                "peer_gaps": peer,
+                "forecast": forecasts.get(cc, {}),
+                "asn_summary": {
+                    "registered_asns": asn_counts.get(cc, 0),
+                    "measured_asns": peer.get("isp_asns_measured", 0),
+                    "avg_ipv6_capable": peer.get("national_isp_avg", 0)
+                },
+                "compliance": compliance.get(cc),
+                "profile_version": version,
+                "inputs": versions,
+                "built_at": built_at
+            })
+        return profiles
+
+    @staticmethod
+    def _forecasts(codes, forecasting_service):
+        """Completion forecast per country and sector from one read of the country history."""
+        history = {}
+        cursor = db_service._db[db_service.COLLECTION_REGISTRY["HISTORY_LOGS"]].find(
+            {"country": {"$in": codes}, "sector": {"$in": list(SECTORS)}},
+            {"_id": 0, "country": 1, "sector": 1, "date": 1, "rate": 1}
+        ).sort("date", 1)
+        for record in cursor:
+            history.setdefault((record["country"], record["sector"]), []).append(record)
+        return {
+            cc: {sector: forecasting_service.forecast_from_history(history.get((cc, sector), []))
+                 for sector in SECTORS}
+            for cc in codes
+        }
+
+    # ------------------------------------------------------------------
+    # Serve
+    # ------------------------------------------------------------------
+    def get(self, country_code):
+        """
+        The profile for one economy, or None when there is none yet. A miss
+        starts a background refresh (a no-op when the inputs are unchanged)
+        instead of assembling the profile on the request path.
+        """
+        if not db_service.connect():
+            return None
+        cc = country_code.upper()
+        doc = db_service.cached_find_one(COUNTRY_PROFILES, {"_id": cc}, {"_id": 0, "inputs": 0})
+        if doc:
+            return doc
+        run_in_background("country_profiles_build", self.refresh)
+        return None
+
+
+country_profile_service = CountryProfileService()
@@ -3,15 +3,26 @@ Dashboard Cache Service — Pre-computes all heavy dashboard metrics in the back
 
 Instead of computing Health Index, Momentum Leaderboard, Forecast, and Strategic Horizon
 on every user request (which causes 50+ DB queries and AI inference loops), this service
-runs periodically and stores the final result in a single MongoDB document.
+stores the final result in a single MongoDB document.
+
+The document is split into sections with declared input collections. A background
+job compares each section's recorded input versions with the current data_versions
+stamps every few seconds and recomputes only the sections whose inputs changed.
 
 The dashboard route then simply reads this one document = instant page load.
+Rebuilds are single-flight across workers (a lease in `distributed_locks`), and
+get_dashboard() serves the last-good snapshot while a missing document is rebuilt.
 """
 
+import os
+import time
 import logging
 from datetime import datetime, timedelta
 from services.database_service import db_service
+from services.single_flight_service import DistributedLock, run_in_background
+from services.asn_org_service import asn_org_service
 from services.inference_service import inference_service
+from services.model_registry_service import model_registry, model_data_version_key, ADOPTION_MODEL
 
 logger = logging.getLogger(__name__)
 
@@ -43,238 +54,383 @@ COUNTRY_NAMES = {
 }
 
 CACHE_KEY = "dashboard_snapshot"
+REBUILD_LOCK = "dashboard_cache_rebuild"
+# Lease length for a rebuild and how long a cold request waits for another worker's rebuild
+REBUILD_LOCK_TTL = int(os.getenv("DASHBOARD_REBUILD_LOCK_TTL", "300"))
+COLD_WAIT_SECONDS = float(os.getenv("DASHBOARD_COLD_WAIT_SECONDS", "15"))
+
+# Collections the dashboard is derived from. Writers stamp them in data_versions
+# (db_service.bump_data_version), which is how stale sections are detected.
+APAC_STATS = "apac_ipv6_normalized"
+HISTORY_LOGS = "history_logs"
+EXTERNAL_STATS = "external_ipv6_stats"
+ASN_READINESS = "asn_ipv6_readiness"
+ASN_ORGANIZATIONS = "asn_organizations"
+# Stamped when a new adoption model version is activated
+ADOPTION_MODEL_VERSION = model_data_version_key(ADOPTION_MODEL)
+
+# Dashboard sections, the cache fields each one owns and the inputs it reads.
+# A change to an input recomputes only the sections that declare it.
+# Every section reads the AI-adjusted stats_list, i.e. the model and the
+# external benchmarks it predicts from.
+_AI_ADJUSTED = [APAC_STATS, EXTERNAL_STATS, ADOPTION_MODEL_VERSION]
+SECTIONS = {
+    "health": {"fields": ["health", "avg_adoption"], "deps": _AI_ADJUSTED + [HISTORY_LOGS]},
+    "momentum": {"fields": ["momentum"], "deps": _AI_ADJUSTED + [HISTORY_LOGS, ASN_READINESS, ASN_ORGANIZATIONS]},
+    "forecast": {"fields": ["forecast"], "deps": _AI_ADJUSTED + [HISTORY_LOGS]},
+    "horizon": {"fields": ["horizon"], "deps": _AI_ADJUSTED + [HISTORY_LOGS]},
+}
+
+
+class _SectionInputs:
+    """
+    Lazily fetched inputs shared by the sections computed in one pass, so a
+    momentum-only refresh never loads benchmarks and every input is read once.
+    """
+
+    def __init__(self, db):
+        self._db = db
+        self._memo = {}
+        self.target_date = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
+
+    def _get(self, name, loader):
+        if name not in self._memo:
+            self._memo[name] = loader()
+        return self._memo[name]
+
+    @property
+    def stats_list(self):
+        """APAC stats with AI-optimized adoption (one batched prediction for all countries)."""
+        def load():
+            stats = db_service.cached_find(APAC_STATS)
+            predictions = inference_service.predict_batch(
+                [s.get('country_code', 'UNKNOWN') for s in stats], [s.get('ipv6_adoption', 0) for s in stats]
+            )
+            for s in stats:
+                s['ipv6_adoption'] = predictions[s.get('country_code', 'UNKNOWN')]
+            return stats
+        return self._get("stats_list", load)
+
+    @property
+    def country_current(self):
+        return self._get("country_current", lambda: {
+            s.get('country_code', 'UNKNOWN'): s['ipv6_adoption'] for s in self.stats_list
+        })
+
+    @property
+    def all_benchmarks(self):
+        def load():
+            from services.external_data_service import external_data_service
+            return external_data_service.get_benchmarks('ALL')
+        return self._get("all_benchmarks", load)
+
+    @property
+    def reg_logs(self):
+        """Regional aggregate history, newest first."""
+        return self._get("reg_logs", lambda: list(self._db[HISTORY_LOGS].find(
+            {"sector": "government", "type": "regional_aggregate"}
+        ).sort("date", -1)))
+
+    @property
+    def historical_stats(self):
+        """Latest rate per country at least a year old (one aggregation)."""
+        def load():
+            hist_pipeline = [
+                {"$match": {"date": {"$lte": self.target_date}, "sector": "government"}},
+                {"$sort": {"date": -1}},
+                {"$group": {
+                    "_id": "$country",
+                    "historical_rate": {"$first": "$rate"}
+                }}
+            ]
+            return {h['_id']: h['historical_rate'] for h in self._db[HISTORY_LOGS].aggregate(hist_pipeline)}
+        return self._get("historical_stats", load)
+
+    @property
+    def avg_adoption(self):
+        """Population-weighted average of the optimized adoption rates."""
+        def load():
+            total_population = 0
+            weighted_sum = 0
+            for s in self.stats_list:
+                pop = POPULATIONS.get(s.get('country_code', 'UNKNOWN'), 1)
+                weighted_sum += (s.get('ipv6_adoption', 0) * pop)
+                total_population += pop
+            return weighted_sum / total_population if total_population > 0 else 0
+        return self._get("avg_adoption", load)
+
+    @property
+    def yoy_growth(self):
+        """YoY growth from regional aggregate history logs."""
+        def load():
+            reg_logs = self.reg_logs
+            if reg_logs:
+                old_val = next((log for log in reg_logs if log['date'] <= self.target_date), None)
+                if old_val:
+                    return reg_logs[0].get('rate', 0) - old_val.get('rate', 0)
+            return 3.4  # fallback
+        return self._get("yoy_growth", load)
 
 
 class DashboardCacheService:
     """Singleton service that pre-computes and caches all dashboard metrics."""
 
+    def __init__(self):
+        # Last snapshot this worker served; returned while a wiped cache is rebuilt
+        self._last_good = None
+
     def rebuild_cache(self):
         """
-        Performs all the heavy computation that was previously done in
-        visualizations.py index() on every request. Stores the result
-        in a single MongoDB document for instant retrieval.
+        Recomputes every dashboard section and stores the result in the single
+        cache document for instant retrieval.
+        """
+        return self.refresh_sections(force=True)
+
+    def refresh_stale_sections(self):
+        """Recomputes only the sections whose inputs changed since they were cached."""
+        return self.refresh_sections(force=False)
+
+    def refresh_sections(self, sections=None, force=False):
+        """
+        Recomputes `sections` (default: all) when forced, missing, or when any
+        declared input's data version differs from the one recorded with the
+        section. Returns True when the cache is up to date afterwards, False on
+        failure or when another worker holds the rebuild lease.
         """
         if not db_service.connect():
             logger.error("Cannot rebuild dashboard cache: DB not connected")
             return False
 
-        logger.info("[CACHE] Starting dashboard cache rebuild...")
-        start_time = datetime.now()
+        db = db_service._db
+        names = list(sections or SECTIONS)
 
         try:
-            db = db_service._db
-
-            # ============================================================
-            # 1. FETCH ALL DATA UPFRONT (batch queries, not per-country)
-            # ============================================================
+            stale, versions = self._stale_sections(db, names, force)
+            if not stale:
+                return True
+
+            with DistributedLock(REBUILD_LOCK, ttl=REBUILD_LOCK_TTL) as acquired:
+                if not acquired:
+                    logger.debug("[CACHE] Dashboard rebuild already running in another worker")
+                    return False
+                if not force:
+                    # The previous lease holder may have just rebuilt these sections
+                    stale, versions = self._stale_sections(db, stale, force)
+                    if not stale:
+                        return True
+                self._rebuild_sections(db, stale, versions)
+                return True
 
-            # 1a. All APAC stats (one query)
-            all_stats_raw = list(db['apac_ipv6_normalized'].find({}))
-
-            # 1b. All benchmarks (one query)
-            from services.external_data_service import external_data_service
-            all_benchmarks = external_data_service.get_benchmarks('ALL')
-
-            # 1c. All history logs for regional aggregate (one query)
-            all_reg_logs = list(db['history_logs'].find(
-                {"sector": "government", "type": "regional_aggregate"}
-            ).sort("date", -1))
+        except Exception as e:
+            logger.error(f"[CACHE] Dashboard cache rebuild failed: {e}")
+            return False
 
-            # 1d. Historical data for momentum/growth (one aggregation)
-            target_date = (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d")
-            hist_pipeline = [
-                {"$match": {"date": {"$lte": target_date}, "sector": "government"}},
-                {"$sort": {"date": -1}},
-                {"$group": {
-                    "_id": "$country",
-                    "historical_rate": {"$first": "$rate"}
-                }}
-            ]
-            historical_stats = {
-                h['_id']: h['historical_rate']
-                for h in db['history_logs'].aggregate(hist_pipeline)
+    def _stale_sections(self, db, names, force):
+        """Returns (stale section names, current input versions)."""
+        deps = sorted({dep for name in names for dep in SECTIONS[name]["deps"]})
+        # Stamps are read before computing: a write that lands mid-computation
+        # leaves the section stale, so the next pass picks it up.
+        versions = db_service.get_data_versions(deps)
+        current = db['dashboard_cache'].find_one({"key": CACHE_KEY}, {"sections": 1}) or {}
+        recorded = current.get("sections", {})
+
+        stale = [
+            name for name in names
+            if force or name not in recorded
+            or recorded[name].get("inputs") != {dep: versions.get(dep, 0) for dep in SECTIONS[name]["deps"]}
+        ]
+        return stale, versions
+
+    def _rebuild_sections(self, db, stale, versions):
+        # Model-backed sections must be computed with the model behind the stamp
+        # being recorded, not whatever this worker's watcher has loaded so far
+        if not model_registry.ensure_current(ADOPTION_MODEL):
+            stale = [name for name in stale if ADOPTION_MODEL_VERSION not in SECTIONS[name]["deps"]]
+            logger.warning("[CACHE] Active adoption model not loadable here; model sections left stale")
+            if not stale:
+                return
+        inference_service.expire_version()
+        logger.info(f"[CACHE] Recomputing dashboard sections: {', '.join(stale)}")
+        inputs = _SectionInputs(db)
+        update = {"key": CACHE_KEY}
+        for name in stale:
+            section_start = datetime.now()
+            values = getattr(self, f"_compute_{name}")(inputs)
+            update.update(values)
+            update[f"sections.{name}"] = {
+                "inputs": {dep: versions.get(dep, 0) for dep in SECTIONS[name]["deps"]},
+                "computed_at": datetime.now().isoformat(),
+                "computation_time_seconds": round((datetime.now() - section_start).total_seconds(), 2)
             }
 
-            # ============================================================
-            # 2. AI INFERENCE — run once per country, cache results
-            # ============================================================
-            inference_service.clear_cache()
-
-            stats_list = []
-            country_current = {}
-            for s in all_stats_raw:
-                cc = s.get('country_code', 'UNKNOWN')
-                raw_v6 = s.get('ipv6_adoption', 0)
-                optimized = inference_service.get_optimized_adoption(cc, raw_v6)
-                s['ipv6_adoption'] = optimized
-                stats_list.append(s)
-                country_current[cc] = optimized
-
-            # ============================================================
-            # 3. HEALTH INDEX (population-weighted average)
-            # ============================================================
-            total_population = 0
-            weighted_sum = 0
-            for s in stats_list:
-                cc = s.get('country_code', 'UNKNOWN')
-                adoption = s.get('ipv6_adoption', 0)
-                pop = POPULATIONS.get(cc, 1)
-                weighted_sum += (adoption * pop)
-                total_population += pop
-
-            avg_adoption = weighted_sum / total_population if total_population > 0 else 0
-
-            # YoY growth from regional aggregate history logs
-            yoy_growth = 3.4  # fallback
-            if all_reg_logs:
-                latest_log = all_reg_logs[0]
-                old_val = next((log for log in all_reg_logs if log['date'] <= target_date), None)
-                if old_val:
-                    yoy_growth = latest_log.get('rate', 0) - old_val.get('rate', 0)
-
-            health_data = {
+        update["computed_at"] = datetime.now().isoformat()
+        update["computation_time_seconds"] = round(
+            sum(update[f"sections.{name}"]["computation_time_seconds"] for name in stale), 2
+        )
+        db['dashboard_cache'].update_one({"key": CACHE_KEY}, {"$set": update}, upsert=True)
+        db_service.bump_data_version('dashboard_cache')
+
+        logger.info(f"[CACHE] Dashboard sections {stale} rebuilt in {update['computation_time_seconds']:.2f}s")
+
+    # ------------------------------------------------------------------
+    # Section computations (each returns the cache fields it owns)
+    # ------------------------------------------------------------------
+    def _compute_health(self, inputs):
+        avg_adoption = inputs.avg_adoption
+        return {
+            "health": {
                 "score": int(avg_adoption),
                 "status": "Moderate Acceleration" if avg_adoption > 30 else "Steady Progress",
-                "yoy_growth": round(yoy_growth, 1)
-            }
+                "yoy_growth": round(inputs.yoy_growth, 1)
+            },
+            "avg_adoption": round(avg_adoption, 2)
+        }
+
+    def _compute_momentum(self, inputs):
+        stats_list = inputs.stats_list
+        country_current = inputs.country_current
+        historical_stats = inputs.historical_stats
+
+        fastest_country = "India"
+        fastest_rate = 0.8
+        current_adoption_fastest = inference_service.get_optimized_adoption("IN", 78.18)
+
+        if country_current and historical_stats:
+            growth_list = []
+            for country_code, hist_rate in historical_stats.items():
+                if country_code in country_current:
+                    growth = country_current[country_code] - hist_rate
+                    growth_list.append({
+                        "country": country_code,
+                        "rate": round(growth, 1),
+                        "current": country_current[country_code]
+                    })
+
+            if growth_list:
+                top_growth = max(growth_list, key=lambda x: x['rate'])
+                country_name_map = {
+                    s.get('country_code'): s.get('country_name')
+                    for s in stats_list if s.get('country_name')
+                }
+                # Fallback to internal mapping if DB name is missing
+                code = top_growth['country']
+                fastest_country = country_name_map.get(code) or COUNTRY_NAMES.get(code, code)
+                fastest_rate = top_growth['rate']
+                current_adoption_fastest = top_growth['current']
+
+        # Most Resilient ASN
+        resilient_asn = "AS55836 (Reliance Jio)"
+        try:
+            db = db_service._db
+            all_readiness = list(db[ASN_READINESS].find().sort("sample_count", -1).limit(50))
+            valid_resilience = [r for r in all_readiness
+                               if isinstance(r.get('ipv6_capable'), (int, float))
+                               and r.get('ipv6_capable') <= 100.0]
+            if valid_resilience:
+                top_asn_doc = valid_resilience[0]
+                asn_id = top_asn_doc['asn']
+                org_name = asn_org_service.get(asn_id)
+                if org_name is None:
+                    org_name = 'Global Infrastructure'
+                elif not org_name:
+                    org_name = 'Global Provider'
+                resilient_asn = f"AS{asn_id} ({org_name})"
+        except Exception as e:
+            logger.error(f"Error fetching resilient ASN: {e}")
+
+        # At Risk (lowest adoption)
+        at_risk = "Afghanistan"
+        if stats_list:
+            lowest = min(stats_list, key=lambda x: x.get('ipv6_adoption', 100))
+            risk_code = lowest.get('country_code', 'AF')
+            at_risk = COUNTRY_NAMES.get(risk_code, risk_code)
 
-            # ============================================================
-            # 4. MOMENTUM LEADERBOARD
-            # ============================================================
-            fastest_country = "India"
-            fastest_rate = 0.8
-            current_adoption_fastest = inference_service.get_optimized_adoption("IN", 78.18)
-
-            if country_current and historical_stats:
-                growth_list = []
-                for country_code, hist_rate in historical_stats.items():
-                    if country_code in country_current:
-                        growth = country_current[country_code] - hist_rate
-                        growth_list.append({
-                            "country": country_code,
-                            "rate": round(growth, 1),
-                            "current": country_current[country_code]
-                        })
-
-                if growth_list:
-                    top_growth = max(growth_list, key=lambda x: x['rate'])
-                    country_name_map = {
-                        s.get('country_code'): s.get('country_name')
-                        for s in stats_list if s.get('country_name')
-                    }
-                    # Fallback to internal mapping if DB name is missing
-                    code = top_growth['country']
-                    fastest_country = country_name_map.get(code) or COUNTRY_NAMES.get(code, code)
-                    fastest_rate = top_growth['rate']
-                    current_adoption_fastest = top_growth['current']
-
-            # Most Resilient ASN
-            resilient_asn = "AS55836 (Reliance Jio)"
-            try:
-                all_readiness = list(db['asn_ipv6_readiness'].find().sort("sample_count", -1).limit(50))
-                valid_resilience = [r for r in all_readiness
-                                   if isinstance(r.get('ipv6_capable'), (int, float))
-                                   and r.get('ipv6_capable') <= 100.0]
-                if valid_resilience:
-                    top_asn_doc = valid_resilience[0]
-                    asn_id = top_asn_doc['asn']
-                    org_info = db['asn_organizations'].find_one({"asn": asn_id})
-                    org_name = org_info.get('org_name', 'Global Provider') if org_info else 'Global Infrastructure'
-                    resilient_asn = f"AS{asn_id} ({org_name})"
-            except Exception as e:
-                logger.error(f"Error fetching resilient ASN: {e}")
-
-            # At Risk (lowest adoption)
-            at_risk = "Afghanistan"
-            if stats_list:
-                lowest = min(stats_list, key=lambda x: x.get('ipv6_adoption', 100))
-                risk_code = lowest.get('country_code', 'AF')
-                at_risk = COUNTRY_NAMES.get(risk_code, risk_code)
-
-            momentum_data = {
+        return {
+            "momentum": {
                 "fastest_growth_country": fastest_country,
                 "fastest_growth_rate": fastest_rate,
                 "current_adoption": current_adoption_fastest,
                 "most_resilient_asn": resilient_asn,
                 "at_risk_country": at_risk
             }
+        }
+
+    def _compute_forecast(self, inputs):
+        reg_logs = inputs.reg_logs
+        real_growth_rate_annual = 0
+        if reg_logs:
+            old_forecast_val = next(
+                (log for log in reg_logs if log['date'] <= inputs.target_date), None
+            )
+            if old_forecast_val:
+                reg_curr = reg_logs[0].get('rate', 0)
+                reg_prev = old_forecast_val.get('rate', 0)
+                real_growth_rate_annual = round(reg_curr - reg_prev, 2)
 
-            # ============================================================
-            # 5. TRAJECTORY FORECAST
-            # ============================================================
-            real_growth_rate_annual = 0
-            if all_reg_logs:
-                reg_latest = all_reg_logs[0]
-                old_forecast_val = next(
-                    (log for log in all_reg_logs if log['date'] <= target_date), None
-                )
-                if old_forecast_val:
-                    reg_curr = reg_latest.get('rate', 0)
-                    reg_prev = old_forecast_val.get('rate', 0)
-                    real_growth_rate_annual = round(reg_curr - reg_prev, 2)
-
-            if real_growth_rate_annual <= 0:
-                real_growth_rate_annual = max(yoy_growth, 1.0)
-
-            growth_rate = real_growth_rate_annual / 365  # daily
-
-            current_rate = avg_adoption
-            days_to_80 = (80 - current_rate) / growth_rate if current_rate < 80 and growth_rate > 0 else 0
-            days_to_95 = (95 - current_rate) / growth_rate if current_rate < 95 and growth_rate > 0 else 0
-
-            target_80 = (datetime.now() + timedelta(days=days_to_80)).year
-            target_95 = (datetime.now() + timedelta(days=days_to_95)).year
-
-            forecast_data = {
-                "current_pace": round(growth_rate * 365, 1),
-                "target_80_date": target_80,
-                "target_95_date": target_95
-            }
+        if real_growth_rate_annual <= 0:
+            real_growth_rate_annual = max(inputs.yoy_growth, 1.0)
 
-            # ============================================================
-            # 6. STRATEGIC HORIZON DATA
-            # ============================================================
-            horizon_data = self._compute_horizon_data(
-                stats_list, country_current, historical_stats, all_benchmarks
-            )
+        growth_rate = real_growth_rate_annual / 365  # daily
 
-            # ============================================================
-            # 7. WRITE CACHE DOCUMENT (upsert = atomic replace)
-            # ============================================================
-            elapsed = (datetime.now() - start_time).total_seconds()
-
-            cache_doc = {
-                "key": CACHE_KEY,
-                "health": health_data,
-                "momentum": momentum_data,
-                "forecast": forecast_data,
-                "horizon": horizon_data,
-                "avg_adoption": round(avg_adoption, 2),
-                "computed_at": datetime.now().isoformat(),
-                "computation_time_seconds": round(elapsed, 2)
+        current_rate = inputs.avg_adoption
+        days_to_80 = (80 - current_rate) / growth_rate if current_rate < 80 and growth_rate > 0 else 0
+        days_to_95 = (95 - current_rate) / growth_rate if current_rate < 95 and growth_rate > 0 else 0
+
+        return {
+            "forecast": {
+                "current_pace": round(growth_rate * 365, 1),
+                "target_80_date": (datetime.now() + timedelta(days=days_to_80)).year,
+                "target_95_date": (datetime.now() + timedelta(days=days_to_95)).year
             }
+        }
 
-            db['dashboard_cache'].update_one(
-                {"key": CACHE_KEY},
-                {"$set": cache_doc},
-                upsert=True
+    def _compute_horizon(self, inputs):
+        return {
+            "horizon": self._compute_horizon_data(
+                inputs.stats_list, inputs.country_current, inputs.historical_stats, inputs.all_benchmarks
             )
+        }
 
-            logger.info(f"[CACHE] Dashboard cache rebuilt in {elapsed:.2f}s")
-            return True
+    def get_dashboard(self):
+        """
+        Stale-while-revalidate read for the dashboard route. Never rebuilds more
+        than once across workers:
+        - cached document present: returned (and remembered as last-good)
+        - missing but this worker has a last-good snapshot: that snapshot is
+          returned immediately and the rebuild runs on a background thread
+        - cold start: one worker rebuilds, the others wait up to
+          COLD_WAIT_SECONDS for its result. Returns None if nothing is available.
+        """
+        doc = self.get_cached_dashboard()
+        if doc:
+            self._last_good = doc
+            return doc
 
-        except Exception as e:
-            logger.error(f"[CACHE] Dashboard cache rebuild failed: {e}")
-            return False
+        if not db_service.connect():
+            return self._last_good
+        if self._last_good is not None:
+            run_in_background(REBUILD_LOCK, self.rebuild_cache)
+            return self._last_good
+
+        if not self.rebuild_cache():
+            # Another worker holds the lease; wait for its snapshot to land
+            deadline = time.time() + COLD_WAIT_SECONDS
+            while time.time() < deadline:
+                time.sleep(0.5)
+                doc = self.get_cached_dashboard()
+                if doc:
+                    break
+        doc = doc or self.get_cached_dashboard()
+        if doc:
+            self._last_good = doc
+        return doc
 
     def get_cached_dashboard(self):
         """Read the pre-computed dashboard snapshot. Returns None if not available."""
         if not db_service.connect():
             return None
         try:
-            doc = db_service._db['dashboard_cache'].find_one({"key": CACHE_KEY})
-            if doc:
-                doc.pop('_id', None)
+            doc = db_service.cached_find_one('dashboard_cache', {"key": CACHE_KEY}, {"_id": 0})
             return doc
         except Exception as e:
             logger.error(f"[CACHE] Failed to read dashboard cache: {e}")
@@ -2,18 +2,25 @@
 MongoDB Database Service for APAC IPv6 Intelligence Platform
 
 This service provides a singleton-style MongoDB connection manager with:
-- Lazy initialization to prevent startup delays
+- Lazy, fork-safe initialization: each (gunicorn) worker opens its own client
+  on first use after fork, never at import time
 - Connection pooling for concurrent requests
-- Fallback to JSON if MongoDB is unavailable (temporary safety)
+- Fallback to an embedded SQLite store if MongoDB is unavailable (see local_store_service)
 - Collection definitions and indexing
+- A per-worker read-through cache for hot reference collections (see read_cache_service)
 """
 
 import os
+import time
 import logging
+import threading
 from pymongo import MongoClient, ASCENDING, DESCENDING
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from dotenv import load_dotenv
 from datetime import datetime
+from services.query_monitor_service import query_monitor
+from services.local_store_service import LocalDocumentStore
+from services.read_cache_service import ReadThroughCache
 
 # Load environment variables
 load_dotenv()
@@ -25,6 +32,10 @@ class MongoDBService:
     _client = None
     _db = None
 
+    # Bump whenever _create_indexes() changes; indexes are (re)built once per
+    # deployment when the stamp stored in system_metadata is older.
+    INDEX_SPEC_VERSION = 6
+
     # Centralized Registry for Logical -> Physical Collection Mapping
     # Standardizes access across Service and Ingestion layers
     COLLECTION_REGISTRY = {
@@ -41,14 +52,28 @@ class MongoDBService:
         "ASN_READINESS": "asn_ipv6_readiness",
         "ASN_MASTER": "asn_organizations", # Fallback for legacy code
         "BGP_TOPOLOGY": "bgp_topology",
+        "ASN_DIRECTORY": "asn_directory",
         "POLICY_MANDATES": "compliance_mandates",
         "GLOBAL_STATS": "global_ipv6_stats",
         "APAC_STATS": "apac_ipv6_normalized",
+        "APAC_AI_STATS": "apac_ipv6_ai",
+        "COUNTRY_PROFILES": "country_profiles",
         "COUNTRY_CODES": "apac_country_codes",
         "GEOJSON_MAP": "geojson_map_data",
-        "TRANSPARENCY_LEDGER": "transparency_ledger"
+        "TRANSPARENCY_LEDGER": "transparency_ledger",
+        "EXTERNAL_STATS": "external_ipv6_stats",
+        "EXTERNAL_LATEST": "external_ipv6_latest",
+        "MAP_PAYLOADS": "map_payloads",
+        "DASHBOARD_CACHE": "dashboard_cache",
+        "DATA_VERSIONS": "data_versions",
+        "DISTRIBUTED_LOCKS": "distributed_locks"
     }
 
+    # Slowly changing collections served from the per-worker read cache
+    CACHED_COLLECTIONS = ["APAC_STATS", "COUNTRY_CODES", "POLICY_MANDATES", "GEOJSON_MAP",
+                          "EXTERNAL_STATS", "EXTERNAL_LATEST", "DASHBOARD_CACHE", "MAP_PAYLOADS",
+                          "APAC_AI_STATS", "COUNTRY_PROFILES"]
+
     # Data Validation Schemas
     JSON_SCHEMAS = {
         "asn_ipv6_readiness": {
@@ -145,20 +170,45 @@ class MongoDBService:
         self.mongo_uri = os.getenv('MONGO_URI')
         self.db_name = os.getenv('DB_NAME', 'apac_ipv6_hub')
         self.is_connected = False
+        # After a failed connect, further attempts short-circuit for this many seconds
+        # instead of blocking every caller on the 5s server selection timeout.
+        self.reconnect_interval = float(os.getenv('MONGO_RECONNECT_INTERVAL', '30'))
+        self._last_failure = None
+        self.local_store_path = os.getenv('LOCAL_STORE_PATH', os.path.join('data', 'local_store.db'))
+        self._local_store = None
+        self.auto_index = os.getenv('MONGO_AUTO_INDEX', 'true').lower() != 'false'
+        # PID that owns the current client; a mismatch means we are in a forked child
+        self._pid = None
+        self._connect_lock = threading.Lock()
+        self.read_cache = ReadThroughCache(
+            self, [self.COLLECTION_REGISTRY[key] for key in self.CACHED_COLLECTIONS]
+        )
         self._initialized = True
         
         # Don't connect immediately - wait for first use
         logging.info("MongoDB service initialized (connection pending)")
     
     def connect(self):
-        """Establish connection to MongoDB Atlas."""
+        """Establish connection to MongoDB Atlas (lazily, once per process)."""
+        if self._pid is not None and self._pid != os.getpid():
+            self.reset_after_fork()
+
         if self.is_connected and self._client is not None:
             return True
             
         if not self.mongo_uri:
             logging.error("MONGO_URI not found in environment variables")
             return False
-        
+
+        if self._last_failure and (time.time() - self._last_failure) < self.reconnect_interval:
+            return False
+
+        with self._connect_lock:
+            if self.is_connected and self._client is not None:
+                return True
+            return self._open_client()
+
+    def _open_client(self):
         try:
             # Create client with connection pooling
             self._client = MongoClient(
@@ -166,7 +216,8 @@ class MongoDBService:
                 serverSelectionTimeoutMS=5000,  # 5 second timeout
                 maxPoolSize=50,  # Support up to 50 concurrent connections
                 minPoolSize=10,  # Keep 10 connections ready
-                retryWrites=True
+                retryWrites=True,
+                event_listeners=[query_monitor]  # Per-route query timing (see query_monitor_service)
             )
             
             # Test connection
@@ -174,74 +225,204 @@ class MongoDBService:
             
             # Get database reference
             self._db = self._client[self.db_name]
+            self._pid = os.getpid()
             
-            # Create indexes
-            self._create_indexes()
+            # Create indexes (no-op unless the index spec changed since the last deployment)
+            if self.auto_index:
+                self.ensure_indexes()
             
             self.is_connected = True
-            logging.info(f"[OK] MongoDB Atlas connected: {self.db_name}")
+            self._last_failure = None
+            logging.info(f"[OK] MongoDB Atlas connected: {self.db_name} (pid {self._pid})")
             return True
             
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             logging.error(f"[ERROR] MongoDB connection failed: {e}")
             self.is_connected = False
+            self._last_failure = time.time()
             return False
         except Exception as e:
             logging.error(f"[ERROR] Unexpected MongoDB error: {e}")
             self.is_connected = False
+            self._last_failure = time.time()
             return False
+
+    def reset_after_fork(self):
+        """
+        Drops connection state inherited from the parent process. MongoClient and
+        SQLite connections are not fork-safe, so the child reconnects on first use.
+        """
+        self._client = None
+        self._db = None
+        self.is_connected = False
+        self._last_failure = None
+        self._local_store = None
+        self._pid = None
+        self._connect_lock = threading.Lock()
+        self.read_cache.invalidate()
+
+    @property
+    def local_store(self):
+        """Embedded SQLite document store used for no-DB mode and as the scan backup."""
+        if self._local_store is None:
+            self._local_store = LocalDocumentStore(self.local_store_path)
+            self._create_local_indexes()
+        return self._local_store
+
+    def _create_local_indexes(self):
+        """Mirror of the Mongo indexes the fallback query shapes need."""
+        try:
+            store = self._local_store
+            for key in ("GOV_SCANS", "EDU_SCANS"):
+                coll = store[self.COLLECTION_REGISTRY[key]]
+                coll.create_index([("domain", ASCENDING), ("checked_at", DESCENDING)])
+                coll.create_index([("country", ASCENDING), ("checked_at", DESCENDING)])
+                coll.create_index([("status", ASCENDING)])
+            history = store[self.COLLECTION_REGISTRY["HISTORY_LOGS"]]
+            history.create_index([("sector", ASCENDING), ("country", ASCENDING), ("date", DESCENDING)])
+            history.create_index([("sector", ASCENDING), ("date", DESCENDING)])
+        except Exception as e:
+            logging.warning(f"Local store index creation warning: {e}")
     
-    def _create_indexes(self):
-        """Create indexes for optimal query performance."""
+    def ensure_indexes(self, force=False):
+        """
+        Builds the indexes once per deployment: the applied INDEX_SPEC_VERSION is
+        stamped in system_metadata, so later workers and restarts skip the rebuild.
+        The stamp is only written when every index was created, so a failed build
+        is retried on the next connect.
+
+        Returns None when the spec was already applied, otherwise the list of
+        indexes that failed (empty on success).
+        """
+        meta = self._db['system_metadata']
         try:
-            # Government Domains Collection
-            self._db.gov_domains.create_index([("domain", ASCENDING)], unique=True)
-            self._db.gov_domains.create_index([("country", ASCENDING)])
-            
-            # Government Scans Collection
-            self._db.gov_scans.create_index([("domain", ASCENDING)])
-            self._db.gov_scans.create_index([("country", ASCENDING)])
-            self._db.gov_scans.create_index([("timestamp", DESCENDING)])
-            self._db.gov_scans.create_index([("status", ASCENDING)])
-            
-            # Education Domains Collection
-            self._db.edu_domains.create_index([("domain", ASCENDING)], unique=True)
-            self._db.edu_domains.create_index([("country", ASCENDING)])
-            
-            # Education Scans Collection
-            self._db.edu_scans.create_index([("domain", ASCENDING)])
-            self._db.edu_scans.create_index([("country", ASCENDING)])
-            self._db.edu_scans.create_index([("timestamp", DESCENDING)])
-            self._db.edu_scans.create_index([("status", ASCENDING)])
-            
-            # Domain Analysis Collection
-            self._db.domain_analysis.create_index([("domain", ASCENDING)])
-            self._db.domain_analysis.create_index([("analysis_type", ASCENDING)])
-            self._db.domain_analysis.create_index([("timestamp", DESCENDING)])
-            
-            # Diagnostic Results Collection
-            self._db.diagnostic_results.create_index([("timestamp", DESCENDING)])
-            self._db.diagnostic_results.create_index([("ipv4", ASCENDING)])
-            
-            # History Logs Collection
-            self._db.history_logs.create_index([("date", DESCENDING)])
-            self._db.history_logs.create_index([("sector", ASCENDING)])
-            
-            # ASN Intelligence Collections
-            self._db.asn_registry.create_index([("asn", ASCENDING)], unique=True)
-            self._db.asn_registry.create_index([("country", ASCENDING)])
-            self._db.asn_organizations.create_index([("asn", ASCENDING)], unique=True)
-            self._db.asn_ipv6_readiness.create_index([("asn", ASCENDING)], unique=True)
-            
-            # BGP Topology Collection
-            # compound index for uniqueness and fast lookups of dependencies
-            self._db.bgp_topology.create_index([("downstream_asn", ASCENDING), ("upstream_asn", ASCENDING)], unique=True)
-            self._db.bgp_topology.create_index([("upstream_asn", ASCENDING)]) # For finding who relies on this ISP
-            
-            logging.info("[OK] MongoDB indexes created successfully")
-            
+            if not force:
+                applied = meta.find_one({"key": "index_spec"})
+                if applied and applied.get("version", 0) >= self.INDEX_SPEC_VERSION:
+                    return None
         except Exception as e:
-            logging.warning(f"Index creation warning: {e}")
+            logging.warning(f"Index spec check failed, rebuilding indexes: {e}")
+
+        failed = self._create_indexes()
+        if failed:
+            logging.warning(f"Index spec v{self.INDEX_SPEC_VERSION} not recorded; {len(failed)} indexes failed")
+            return failed
+        try:
+            meta.update_one(
+                {"key": "index_spec"},
+                {"$set": {"version": self.INDEX_SPEC_VERSION, "applied_at": datetime.now().isoformat()}},
+                upsert=True
+            )
+        except Exception as e:
+            logging.warning(f"Could not record index spec version: {e}")
+        return failed
+
+    def _create_indexes(self):
+        """
+        Create indexes for optimal query performance.
+
+        Compound indexes follow the real query shapes (equality fields first,
+        then the sort/range field). Run scripts/index_advisor.py to verify that
+        every catalogued query is still served by one of them.
+
+        Each index is built on its own, so one failure (e.g. a unique index over
+        existing duplicates) does not skip the rest; returns the failed ones.
+        """
+        failed = []
+
+        def create(coll, keys, **kwargs):
+            try:
+                coll.create_index(keys, **kwargs)
+            except Exception as e:
+                failed.append(f"{coll.name} {keys}")
+                logging.warning(f"Index creation failed on {coll.name} {keys}: {e}")
+
+        # Government Domains Collection
+        create(self._db.gov_domains, [("domain", ASCENDING)], unique=True)
+        create(self._db.gov_domains, [("country", ASCENDING)])
+        # Keyset paging of a country's domains (scan results API)
+        create(self._db.gov_domains, [("country", ASCENDING), ("domain", ASCENDING)])
+        
+        # Government Scans Collection
+        # Latest-scan-per-domain ($sort checked_at + $group domain) and per-domain history
+        create(self._db.gov_scans, [("domain", ASCENDING), ("checked_at", DESCENDING)])
+        # Country-filtered latest scans, paged by domain (results API)
+        create(self._db.gov_scans, [("country", ASCENDING), ("domain", ASCENDING), ("checked_at", DESCENDING)])
+        create(self._db.gov_scans, [("checked_at", DESCENDING)])
+        # Per-country readiness counts (compliance, delta, peer benchmarks)
+        create(self._db.gov_scans, [("country", ASCENDING), ("ipv6_web", ASCENDING), ("ipv6_dns", ASCENDING)])
+        create(self._db.gov_scans, [("timestamp", DESCENDING)])
+        create(self._db.gov_scans, [("status", ASCENDING)])
+        
+        # Education Domains Collection
+        create(self._db.edu_domains, [("domain", ASCENDING)], unique=True)
+        create(self._db.edu_domains, [("country", ASCENDING)])
+        create(self._db.edu_domains, [("country", ASCENDING), ("domain", ASCENDING)])
+        
+        # Education Scans Collection
+        create(self._db.edu_scans, [("domain", ASCENDING), ("checked_at", DESCENDING)])
+        # Country-filtered latest scans, paged by domain (results API)
+        create(self._db.edu_scans, [("country", ASCENDING), ("domain", ASCENDING), ("checked_at", DESCENDING)])
+        create(self._db.edu_scans, [("checked_at", DESCENDING)])
+        create(self._db.edu_scans, [("country", ASCENDING), ("ipv6_web", ASCENDING), ("ipv6_dns", ASCENDING)])
+        create(self._db.edu_scans, [("timestamp", DESCENDING)])
+        create(self._db.edu_scans, [("status", ASCENDING)])
+        
+        # Domain Analysis Collection
+        create(self._db.domain_analysis, [("domain", ASCENDING)])
+        create(self._db.domain_analysis, [("analysis_type", ASCENDING)])
+        create(self._db.domain_analysis, [("timestamp", DESCENDING)])
+        
+        # Diagnostic Results Collection
+        create(self._db.diagnostic_results, [("timestamp", DESCENDING)])
+        create(self._db.diagnostic_results, [("ipv4", ASCENDING)])
+        
+        # History Logs Collection
+        # Sector/country trend reads sorted by date and the per-day snapshot upserts
+        create(self._db.history_logs, [("sector", ASCENDING), ("country", ASCENDING), ("date", DESCENDING)])
+        # Regional YoY lookups ({sector, date <= target} sorted by date)
+        create(self._db.history_logs, [("sector", ASCENDING), ("date", DESCENDING)])
+        create(self._db.history_logs, [("date", DESCENDING)])
+        
+        # External Benchmarks Collection
+        # Latest value per source/country and the per-day source refresh
+        create(self._db.external_ipv6_stats, [("source", ASCENDING), ("country", ASCENDING), ("timestamp", DESCENDING)])
+        create(self._db.external_ipv6_stats, [("country", ASCENDING), ("timestamp", DESCENDING)])
+        create(self._db.external_ipv6_stats, [("source", ASCENDING), ("date", ASCENDING)])
+        create(self._db.external_ipv6_stats, [("timestamp", DESCENDING)])
+        
+        # Community Submissions Collection
+        # Per-IP daily rate limit and duplicate-domain check
+        create(self._db.community_submissions, [("ip_address", ASCENDING), ("submitted_at", DESCENDING)])
+        create(self._db.community_submissions, [("domain", ASCENDING)])
+        
+        # ASN Intelligence Collections
+        create(self._db.asn_registry, [("asn", ASCENDING)], unique=True)
+        create(self._db.asn_registry, [("country", ASCENDING)])
+        create(self._db.asn_organizations, [("asn", ASCENDING)], unique=True)
+        create(self._db.asn_ipv6_readiness, [("asn", ASCENDING)], unique=True)
+        create(self._db.asn_ipv6_readiness, [("sample_count", DESCENDING)])
+        
+        # BGP Topology Collection
+        # compound index for uniqueness and fast lookups of dependencies
+        create(self._db.bgp_topology, [("downstream_asn", ASCENDING), ("upstream_asn", ASCENDING)], unique=True)
+        create(self._db.bgp_topology, [("upstream_asn", ASCENDING)]) # For finding who relies on this ISP
+        
+        # Denormalized ASN directory: filter ranges, sort and keyset seek per country
+        # (rebuilds create it on the staging collection before the swap)
+        create(self._db.asn_directory, [("country", ASCENDING), ("ipv6_percentage", DESCENDING), ("asn", ASCENDING)])
+        
+        # Singleton documents looked up by key
+        create(self._db.dashboard_cache, [("key", ASCENDING)], unique=True)
+        create(self._db.system_metadata, [("key", ASCENDING)])
+        
+        # Single-flight leases; expired ones are reaped by the TTL monitor
+        create(self._db.distributed_locks, [("expires_at", ASCENDING)], expireAfterSeconds=0)
+        
+        if not failed:
+            logging.info("[OK] MongoDB indexes created successfully")
+        return failed
+        
     
     @property
     def gov_domains(self):
@@ -366,6 +547,62 @@ class MongoDBService:
             except Exception as e:
                 logging.warning(f"Could not apply schema to {coll_name}: {e}")
 
+    def cached_find(self, collection, filter=None, projection=None, sort=None, limit=0, copy_result=True):
+        """
+        find() served from the per-worker read cache for CACHED_COLLECTIONS (other
+        collections pass straight through). Returns a list the caller may mutate,
+        unless copy_result=False is passed for read-only use of large documents.
+        """
+        if not self.connect():
+            return []
+        return self.read_cache.find(collection, filter, projection, sort, limit, copy_result)
+
+    def cached_find_one(self, collection, filter=None, projection=None, sort=None, copy_result=True):
+        if not self.connect():
+            return None
+        return self.read_cache.find_one(collection, filter, projection, sort, copy_result)
+
+    def bump_data_version(self, collection):
+        """
+        Records that `collection` changed. Writers call this after every write to
+        a cached collection; it drives cache polling (when change streams are
+        unavailable) and data-version based ETags.
+        """
+        self.read_cache.invalidate(collection)
+        if not self.connect():
+            return None
+        try:
+            doc = self._db[self.COLLECTION_REGISTRY["DATA_VERSIONS"]].find_one_and_update(
+                {"_id": collection},
+                {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now().isoformat()}},
+                upsert=True,
+                return_document=True
+            )
+            return doc.get("version") if doc else None
+        except Exception as e:
+            logging.warning(f"Could not bump data version for {collection}: {e}")
+            return None
+
+    def data_version_token(self, collection):
+        """
+        Cheap change token for `collection`: this worker's read-cache generation
+        (no round trip), or the data_versions stamp when the read cache is off.
+        Derived caches (e.g. batch inference) key their results on it.
+        """
+        if self.read_cache.enabled and collection in self.read_cache.collections:
+            return ("gen", self.read_cache.generation(collection))
+        return ("stamp", self.get_data_versions([collection]).get(collection))
+
+    def get_data_versions(self, collections):
+        """Current version stamp per collection (0 when never written)."""
+        names = list(collections)
+        if not self.connect():
+            return {}
+        stamps = {name: 0 for name in names}
+        for doc in self._db[self.COLLECTION_REGISTRY["DATA_VERSIONS"]].find({"_id": {"$in": names}}):
+            stamps[doc["_id"]] = doc.get("version", 0)
+        return stamps
+
     def swap_collection(self, staging_name, target_registry_key):
         """
         Atomically swap a staging collection into production.
@@ -381,6 +618,7 @@ class MongoDBService:
         try:
             # Use MongoDB renameCollection with dropTarget=True for atomic swap
             self._db[staging_name].rename(target_name, dropTarget=True)
+            self.bump_data_version(target_name)
             
             # Audit Logging
             logging.info(f"[ATOMIC SWAP] {staging_name} -> {target_name} completed at {datetime.now().isoformat()}")
@@ -418,7 +656,13 @@ class MongoDBService:
             self._client.close()
             self.is_connected = False
             logging.info("MongoDB connection closed")
+        if self._local_store is not None:
+            self._local_store.close()
 
 
 # Global singleton instance
 db_service = MongoDBService()
+
+# gunicorn (and multiprocessing) fork after import; give every child a fresh client
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=db_service.reset_after_fork)
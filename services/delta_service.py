@@ -2,9 +2,10 @@ from services.database_service import db_service
 import logging
 
 class AuthorityDeltaService:
-    def __init__(self):
-        self.db_connected = db_service.connect()
-        
+    @property
+    def db_connected(self):
+        return db_service.connect()
+
     def get_delta_report(self):
         """
         Generates a comparison between Official APNIC Stats and Our Measured Stats.
@@ -1,12 +1,11 @@
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
 import dns.resolver
 import re
 import logging
 
 class DiscoveryService:
     def __init__(self):
-        self.db_connected = db_service.connect()
-        
         # Patterns for government and education domains
         self.gov_patterns = [
             r'\.gov\.',  # .gov.au, .gov.in, etc.
@@ -20,6 +19,10 @@ class DiscoveryService:
             r'\.ac\.',   # .ac.uk, .ac.jp, etc.
         ]
     
+    @property
+    def db_connected(self):
+        return db_service.connect()
+
     def is_government_domain(self, domain):
         """Check if domain matches government patterns."""
         for pattern in self.gov_patterns:
@@ -119,8 +122,9 @@ class DiscoveryService:
                         "validated": True
                     })
                 
-                # Insert
-                db_service._db[domain_coll].insert_many(docs)
+                # Insert (the writer bumps the data version, so country profiles rebuild)
+                with BulkWriter(db_service._db[domain_coll], label=f"{sector} discovered domains") as writer:
+                    writer.extend(docs)
                 added_count = len(docs)
                 logging.info(f"✅ Added {added_count} new {sector} domains via certificate discovery")
             
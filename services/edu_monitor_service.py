@@ -2,11 +2,16 @@ import dns.resolver
 import socket
 import ssl
 import json
-import os
+import time
 import logging
 from datetime import datetime
 import concurrent.futures
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+from services.ranking_service import SectorRankingEngine
+from services.scan_results_service import iter_latest_scans, filter_latest_scans
+from services.single_flight_service import coalesce
+from services.asn_org_service import asn_org_service
 
 class APACEduMonitorService:
     def __init__(self):
@@ -15,59 +20,79 @@ class APACEduMonitorService:
         self.results_file = 'data/apac_edu_ipv6_results.json'
         self.history_file = 'data/apac_edu_history.json'
         
-        # Connect to MongoDB
-        self.use_mongodb = db_service.connect()
-        
-        if not self.use_mongodb:
-            logging.warning("MongoDB unavailable for edu service, falling back to JSON files")
-            os.makedirs(os.path.dirname(self.results_file), exist_ok=True)
+        # MongoDB is connected lazily on first use (see use_mongodb)
+        self._mongo_retry_at = 0
+        # Readiness scores for all countries, cached per scan data version
+        self.ranking_engine = SectorRankingEngine(self, "EDU_SCANS", with_levels=False)
+
+    @property
+    def use_mongodb(self):
+        """MongoDB availability; after a failure it is re-checked once the retry interval passes."""
+        if time.time() < self._mongo_retry_at:
+            return False
+        return db_service.connect()
+
+    @use_mongodb.setter
+    def use_mongodb(self, available):
+        self._mongo_retry_at = 0 if available else time.time() + db_service.reconnect_interval
+
+    def _local(self, registry_key):
+        """Local store collection, seeded once from the legacy JSON fallback files."""
+        store = db_service.local_store
+        name = db_service.COLLECTION_REGISTRY[registry_key]
+        if registry_key == "EDU_SCANS":
+            store.seed_from_json(name, self.results_file,
+                                 lambda data: [scan for scans in data.values() for scan in scans])
+        elif registry_key == "HISTORY_LOGS":
+            store.seed_from_json(name, self.history_file)
+        return store[name]
+
+    @staticmethod
+    def _group_by_country(scans):
+        results = {}
+        for scan in scans:
+            scan.pop('_id', None)
+            results.setdefault(scan.get('country'), []).append(scan)
+        return results
+
+    def get_results(self, country=None):
+        """Latest scan per domain grouped by country (optionally for a single country)."""
+        return self._group_by_country(self.iter_results(country=country))
 
-    def get_results(self):
-        """Retrieve cached scan results from MongoDB or JSON fallback."""
+    def iter_results(self, country=None, status=None, fields=None, after=None, limit=None):
+        """
+        Latest scan per domain ordered by domain, from MongoDB or the local store
+        fallback. Country/status filters, projection and keyset pagination
+        (`after` = last domain seen) run in the queries; documents are yielded
+        straight from the cursors.
+        """
         if self.use_mongodb:
+            yielded = False
             try:
-                # Fetch latest scan results from MongoDB using Aggregation Pipeline
-                # Optimization: $sort + $group ensures atomic "latest record per domain" selection
-                pipeline = [
-                    {"$sort": {"checked_at": -1}},
-                    {"$group": {
-                        "_id": "$domain",
-                        "latest": {"$first": "$$ROOT"}
-                    }}
-                ]
-                
-                scans = list(db_service._db[db_service.COLLECTION_REGISTRY["EDU_SCANS"]].aggregate(pipeline))
-                results = {}
-                
-                for item in scans:
-                    scan = item['latest']
-                    
-                    country = scan.get('country')
-                    if country not in results:
-                        results[country] = []
-                    
-                    # Remove MongoDB _id field for JSON compatibility
-                    scan.pop('_id', None)
-                    results[country].append(scan)
-                
-                return results
-                
+                scans_col = db_service._db[db_service.COLLECTION_REGISTRY["EDU_SCANS"]]
+                registry = db_service._db[db_service.COLLECTION_REGISTRY["EDU_DOMAINS"]]
+                for scan in iter_latest_scans(scans_col, registry, country, status, fields, after, limit):
+                    yielded = True
+                    yield scan
+                return
             except Exception as e:
-                logging.error(f"MongoDB read failed, falling back to JSON: {e}")
+                if yielded:
+                    # Part of the result was already sent; a fallback would duplicate it
+                    logging.error(f"MongoDB read of edu results failed mid-stream: {e}")
+                    return
+                logging.error(f"MongoDB read failed, falling back to local store: {e}")
                 self.use_mongodb = False
-        
-        # Fallback to JSON
-        if not os.path.exists(self.results_file):
-            return {}
+
+        # Fallback to the local store (latest scan per domain via an indexed window query)
         try:
-            with open(self.results_file, 'r') as f:
-                return json.load(f)
+            scans = self._local("EDU_SCANS").latest_by("domain", "checked_at",
+                                                     filter={"country": country} if country else None)
+            yield from filter_latest_scans(scans, status, fields, after, limit)
         except Exception as e:
             logging.error(f"Error reading edu results: {e}")
-            return {}
 
     def get_history(self, country=None):
-        """Retrieve historical adoption trends from MongoDB or JSON fallback."""
+        """Retrieve historical adoption trends from MongoDB or the local store fallback."""
         if self.use_mongodb:
             try:
                 # Fetch history logs for education sector
@@ -90,21 +115,26 @@ class APACEduMonitorService:
                 return history
                 
             except Exception as e:
-                logging.error(f"MongoDB history read failed, falling back to JSON: {e}")
+                logging.error(f"MongoDB history read failed, falling back to local store: {e}")
                 self.use_mongodb = False
         
-        # Fallback to JSON
-        if not os.path.exists(self.history_file):
-            return []
+        # Fallback to the local store
         try:
-            with open(self.history_file, 'r') as f:
-                return json.load(f)
+            query = {"sector": "education"}
+            if country:
+                query["country"] = country.upper()
+            else:
+                query["country"] = {"$exists": False}
+            history = list(self._local("HISTORY_LOGS").find(query).sort("date", 1))
+            for entry in history:
+                entry.pop('_id', None)
+            return history
         except Exception as e:
             logging.error(f"Error reading history: {e}")
             return []
 
     def save_history(self, results):
-        """Append current scan summary to MongoDB or JSON fallback."""
+        """Append current scan summary to MongoDB or the local store fallback."""
         total = 0
         ready = 0
         
@@ -134,28 +164,23 @@ class APACEduMonitorService:
                     {"$set": entry},
                     upsert=True
                 )
+                db_service.bump_data_version(db_service.COLLECTION_REGISTRY["HISTORY_LOGS"])
                 logging.info(f"Education history saved to MongoDB: {entry['date']}")
                 return
                 
             except Exception as e:
-                logging.error(f"MongoDB history save failed, falling back to JSON: {e}")
+                logging.error(f"MongoDB history save failed, falling back to local store: {e}")
                 self.use_mongodb = False
         
-        # Fallback to JSON
-        history = []
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    history = json.load(f)
-            except:
-                pass
-        
-        history = [h for h in history if h['date'] != entry['date']]
-        history.append(entry)
-        history.sort(key=lambda x: x['timestamp'])
-        
-        with open(self.history_file, 'w') as f:
-            json.dump(history, f, indent=2)
+        # Fallback to the local store (same per-day upsert, no full-file rewrite)
+        try:
+            self._local("HISTORY_LOGS").update_one(
+                {"date": entry["date"], "sector": "education", "country": None},
+                {"$set": entry},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Local history save failed: {e}")
 
     def save_country_history(self, country_code, domain_list):
         """Save adoption rate snapshot for a specific country."""
@@ -185,9 +210,20 @@ class APACEduMonitorService:
                     {"$set": entry},
                     upsert=True
                 )
+                db_service.bump_data_version(db_service.COLLECTION_REGISTRY["HISTORY_LOGS"])
+                return
             except Exception as e:
                 logging.error(f"Failed to save country education history for {country_code}: {e}")
 
+        try:
+            self._local("HISTORY_LOGS").update_one(
+                {"date": entry["date"], "sector": "education", "country": entry["country"]},
+                {"$set": entry},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Local country education history save failed for {country_code}: {e}")
+
     def scan_domains(self):
         """Perform full scan of all configured academic domains using high-concurrency threading."""
         # Load domains from MongoDB or JSON
@@ -275,97 +311,55 @@ class APACEduMonitorService:
                         "error": "Scan Failed"
                     })
         
+        # Prepare scan records (not upserts, we want historical records)
+        bulk_operations = []
+        for country, scans in results.items():
+            for scan in scans:
+                # Calculate status
+                if scan.get('ipv6_web') and scan.get('ipv6_dns'):
+                    scan['status'] = 'ready'
+                elif scan.get('ipv6_dns'):
+                    scan['status'] = 'partial'
+                else:
+                    scan['status'] = 'missing'
+                
+                scan['timestamp'] = scan.get('checked_at', datetime.now().isoformat())
+                bulk_operations.append(scan)
+
         # Save results to MongoDB using bulk write for performance
         if self.use_mongodb:
             try:
-                # Prepare bulk operations
-                bulk_operations = []
-                for country, scans in results.items():
-                    for scan in scans:
-                        # Calculate status
-                        if scan.get('ipv6_web') and scan.get('ipv6_dns'):
-                            scan['status'] = 'ready'
-                        elif scan.get('ipv6_dns'):
-                            scan['status'] = 'partial'
-                        else:
-                            scan['status'] = 'missing'
-                        
-                        scan['timestamp'] = scan.get('checked_at', datetime.now().isoformat())
-                        
-                        # Insert scan result (not upsert, we want historical records)
-                        bulk_operations.append(scan)
-                
                 # Bulk insert
                 if bulk_operations:
-                    db_service._db[db_service.COLLECTION_REGISTRY["EDU_SCANS"]].insert_many(bulk_operations)
-                    logging.info(f"Saved {len(bulk_operations)} academic scan results to MongoDB")
+                    scans_col = db_service._db[db_service.COLLECTION_REGISTRY["EDU_SCANS"]]
+                    with BulkWriter(scans_col, label="edu_scans") as writer:
+                        writer.extend(bulk_operations)
+                    logging.info(f"Saved {writer.stats()['inserted']} academic scan results to MongoDB")
                 
             except Exception as e:
-                logging.error(f"MongoDB bulk write failed, falling back to JSON: {e}")
+                logging.error(f"MongoDB bulk write failed, falling back to local store: {e}")
                 self.use_mongodb = False
         
-        # Always save to JSON as backup
-        # Safety: Ensure no datetime or ObjectId objects are in the results for JSON serialization
-        def json_safe(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            # Handle MongoDB ObjectId if it slipped in
-            if hasattr(obj, '__class__') and obj.__class__.__name__ == 'ObjectId':
-                return str(obj)
-            raise TypeError(f"Type {type(obj)} not serializable")
-
-        with open(self.results_file, 'w') as f:
-            json.dump(results, f, indent=2, default=json_safe)
+        # Local backup keeps only the latest scan per domain (the fallback reads
+        # latest-per-domain anyway), so it stays bounded while MongoDB is healthy
+        try:
+            self._local("EDU_SCANS").replace_by("domain", bulk_operations)
+        except Exception as e:
+            logging.error(f"Local store scan backup failed: {e}")
+        for scan in bulk_operations:
+            scan.pop('_id', None)
             
         self.save_history(results)
         return results
 
+    @coalesce("edu_detailed_stats")
     def get_detailed_stats(self):
-        """Calculate detailed statistics, scores, and rankings."""
-        results = self.get_results()
-        if not results:
-            return {}
+        """Scores and rankings per country, cached until the scans change (see ranking_service)."""
+        return self.ranking_engine.ranking()
 
-        country_stats = []
-        for country_code, domains_data in results.items():
-            score, breakdown = self._calculate_country_score(domains_data)
-            country_stats.append({
-                "country": country_code,
-                "score": score,
-                "total_domains": len(domains_data),
-                "breakdown": breakdown
-            })
-        
-        country_stats.sort(key=lambda x: x['score'], reverse=True)
-        for idx, item in enumerate(country_stats):
-            item['rank'] = idx + 1
-            
-        return {
-            "generated_at": datetime.now().isoformat(),
-            "ranking": country_stats
-        }
-
-    def _calculate_country_score(self, domain_list):
-        total = len(domain_list)
-        if total == 0: return 0, {}
-            
-        dns_count = sum(1 for d in domain_list if d.get('ipv6_dns'))
-        web_count = sum(1 for d in domain_list if d.get('ipv6_web'))
-        sec_count = sum(1 for d in domain_list if d.get('dnssec'))
-        
-        p_dns = (dns_count / total) * 100
-        p_web = (web_count / total) * 100
-        p_sec = (sec_count / total) * 100
-        
-        score = (p_dns * 0.4) + (p_web * 0.4) + (p_sec * 0.2)
-        
-        failures = {
-            "missing_dns_pct": round(((total - dns_count) / total) * 100),
-            "web_unreachable_pct": round(((total - web_count) / total) * 100),
-            "missing_dnssec_pct": round(((total - sec_count) / total) * 100)
-        }
-        
-        return round(score, 1), failures
+    def get_country_ranking(self, country_code):
+        """Ranking row (score, rank, breakdown) for a single country, or None."""
+        return self.ranking_engine.country(country_code)
 
     def check_domain(self, domain):
         """Check a single campus domain for IPv6 compliance."""
@@ -453,9 +447,9 @@ class APACEduMonitorService:
                     result['asn'] = f"AS{asn_id}"
                     
                     # Step B: Unified Registry Lookup (OFFLINE-FIRST)
-                    asn_entry = db_service._db[db_service.COLLECTION_REGISTRY["ASN_MASTER"]].find_one({"asn": asn_id})
-                    if asn_entry:
-                        result['isp'] = asn_entry.get('org_name') or asn_entry.get('asn_name') or f"Provider {asn_id}"
+                    org_name = asn_org_service.get(asn_id)
+                    if org_name is not None:
+                        result['isp'] = org_name or f"Provider {asn_id}"
                     else:
                         result['isp'] = "Generic Infrastructure"
         except Exception as e:
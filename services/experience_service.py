@@ -2,9 +2,10 @@ from services.database_service import db_service
 import logging
 
 class ExperienceService:
-    def __init__(self):
-        self.db_connected = db_service.connect()
-        
+    @property
+    def db_connected(self):
+        return db_service.connect()
+
     def calculate_experience_score(self, v4_rtt, v6_rtt, v4_services, v6_services):
         """
         Calculate a composite score (0-100) for dual-stack experience.
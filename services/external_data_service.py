@@ -3,12 +3,19 @@ import json
 import logging
 import os
 import random
+import hashlib
+import threading
 from datetime import datetime
+from pymongo import ReplaceOne
 from services.database_service import db_service
+from services.bulk_write_service import BulkWriter
+
+EXTERNAL_STATS = db_service.COLLECTION_REGISTRY["EXTERNAL_STATS"]
+# Materialized view: one document per source/country holding its latest value
+EXTERNAL_LATEST = db_service.COLLECTION_REGISTRY["EXTERNAL_LATEST"]
 
 class ExternalIPv6DataService:
     def __init__(self):
-        self.db_connected = db_service.connect()
         # Authoritative Sources
         self.sources = {
             "APNIC": "https://stats.labs.apnic.net/ipv6/",
@@ -17,74 +24,81 @@ class ExternalIPv6DataService:
             "IPv6_Pulse": "https://api.v6pulse.com/v1/stats/"
         }
         self.pulse_api_key = os.getenv('Pulse_api')
+        # In-memory copy of the latest-value view: {source: {country: ipv6_percent}}
+        self._latest = None
+        self._latest_version = None
+        self._latest_lock = threading.Lock()
+
+    @property
+    def db_connected(self):
+        return db_service.connect()
 
-    def fetch_apnic_data(self):
+    def fetch_apnic_data(self, force=False):
         """Pull statistics from internal trained benchmarks as a high-fidelity proxy."""
         try:
             # Instead of a static dict, we now pull from the 'apac_ipv6_normalized' collection
             # which contains the most recently "trained" or synced data.
-            stats = list(db_service._db['apac_ipv6_normalized'].find({}, {"country_code": 1, "ipv6_adoption": 1}))
+            stats = db_service.cached_find('apac_ipv6_normalized', {}, {"country_code": 1, "ipv6_adoption": 1}, copy_result=False)
             real_data = {s['country_code']: s['ipv6_adoption'] for s in stats if 'country_code' in s}
             
             if real_data:
-                self.save_external_stats("APNIC", real_data)
+                self._save_if_changed("APNIC", real_data, force)
                 return real_data
             return {}
         except Exception as e:
             logging.error(f"APNIC sync failed: {e}")
             return {}
 
-    def fetch_google_data(self):
+    def _load_merged_csv(self):
+        """Reads the authoritative merged dataset once, with the country-code fixes applied."""
+        import pandas as pd
+        csv_path = 'datasets/merged_ipv6.csv'
+        if not os.path.exists(csv_path):
+            return None
+        df = pd.read_csv(csv_path)
+        # Apply consistent mapping fixes
+        df.loc[(df['country_code'] == 'BD') & (df['country'].str.contains('Brunei', na=False)), 'country_code'] = 'BN'
+        df.loc[(df['country_code'] == 'MA') & (df['country'].str.contains('Macau', na=False)), 'country_code'] = 'MO'
+        return df.drop_duplicates(subset='country_code')
+
+    @staticmethod
+    def _column_values(df, column, positive_only=True):
+        """{country_code: value} for the non-null (and optionally > 0) cells of a column, vectorized."""
+        values = df[column]
+        mask = values.notna() & (values > 0) if positive_only else values.notna()
+        return dict(zip(df.loc[mask, 'country_code'], values[mask].astype(float)))
+
+    def fetch_google_data(self, df=None, force=False):
         """Fetch real Google traffic telemetry from authoritative merged dataset."""
         try:
-            import pandas as pd
-            csv_path = 'datasets/merged_ipv6.csv'
-            if not os.path.exists(csv_path):
+            df = self._load_merged_csv() if df is None else df
+            if df is None:
                 return {}
-            
-            df = pd.read_csv(csv_path)
-            # Apply consistent mapping fixes
-            df.loc[(df['country_code'] == 'BD') & (df['country'].str.contains('Brunei', na=False)), 'country_code'] = 'BN'
-            df.loc[(df['country_code'] == 'MA') & (df['country'].str.contains('Macau', na=False)), 'country_code'] = 'MO'
-            df = df.drop_duplicates(subset='country_code')
-            
-            traffic_data = {row['country_code']: row['google_ipv6_pct'] for _, row in df.iterrows() 
-                            if not pd.isna(row['google_ipv6_pct']) and row['google_ipv6_pct'] > 0}
-            
+            traffic_data = self._column_values(df, 'google_ipv6_pct')
             if traffic_data:
-                self.save_external_stats("Google", traffic_data)
+                self._save_if_changed("Google", traffic_data, force)
                 return traffic_data
             return {}
         except Exception as e:
             logging.error(f"Google CSV sync failed: {e}")
             return {}
 
-    def fetch_cloudflare_data(self):
+    def fetch_cloudflare_data(self, df=None, force=False):
         """Fetch real Cloudflare Radar telemetry from authoritative merged dataset."""
         try:
-            import pandas as pd
-            csv_path = 'datasets/merged_ipv6.csv'
-            if not os.path.exists(csv_path):
+            df = self._load_merged_csv() if df is None else df
+            if df is None:
                 return {}
-            
-            df = pd.read_csv(csv_path)
-            # Apply consistent mapping fixes
-            df.loc[(df['country_code'] == 'BD') & (df['country'].str.contains('Brunei', na=False)), 'country_code'] = 'BN'
-            df.loc[(df['country_code'] == 'MA') & (df['country'].str.contains('Macau', na=False)), 'country_code'] = 'MO'
-            df = df.drop_duplicates(subset='country_code')
-            
-            cdn_data = {row['country_code']: row['cloudflare_ipv6_pct'] for _, row in df.iterrows() 
-                        if not pd.isna(row['cloudflare_ipv6_pct']) and row['cloudflare_ipv6_pct'] > 0}
-            
+            cdn_data = self._column_values(df, 'cloudflare_ipv6_pct')
             if cdn_data:
-                self.save_external_stats("Cloudflare", cdn_data)
+                self._save_if_changed("Cloudflare", cdn_data, force)
                 return cdn_data
             return {}
         except Exception as e:
             logging.error(f"Cloudflare CSV sync failed: {e}")
             return {}
 
-    def fetch_ipv6_pulse_data(self):
+    def fetch_ipv6_pulse_data(self, force=False):
         """Fetch robust Pulse telemetry for all 56 regions from authoritative cached data."""
         try:
             import pandas as pd
@@ -94,20 +108,68 @@ class ExternalIPv6DataService:
                 return {}
             
             df = pd.read_csv(csv_path)
-            pulse_data = {row['country_code']: row['pulse_ipv6_pct'] for _, row in df.iterrows() 
-                          if not pd.isna(row['pulse_ipv6_pct'])}
+            pulse_data = self._column_values(df, 'pulse_ipv6_pct', positive_only=False)
             
             if pulse_data:
-                self.save_external_stats("IPv6_Pulse", pulse_data)
+                self._save_if_changed("IPv6_Pulse", pulse_data, force)
                 return pulse_data
             return {}
         except Exception as e:
             logging.error(f"Pulse CSV sync failed: {e}")
             return {}
 
+    def refresh_benchmarks(self, force=False):
+        """
+        Scheduled benchmark ingestion: APNIC from the normalized stats, Google and
+        Cloudflare from one read of the merged CSV. Sources whose content hash is
+        unchanged are not written. Returns {source: number of countries}.
+        """
+        if not self.db_connected:
+            return {}
+        df = None
+        try:
+            df = self._load_merged_csv()
+        except Exception as e:
+            logging.error(f"Merged benchmark CSV could not be read: {e}")
+        summary = {"APNIC": len(self.fetch_apnic_data(force=force))}
+        if df is not None:
+            summary["Google"] = len(self.fetch_google_data(df, force=force))
+            summary["Cloudflare"] = len(self.fetch_cloudflare_data(df, force=force))
+        return summary
+
+    @staticmethod
+    def _content_hash(data):
+        payload = json.dumps({str(k): round(float(v), 6) for k, v in data.items()}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _save_if_changed(self, source, data, force=False):
+        """save_external_stats() unless the source's content hash matches the last ingested one."""
+        if not self.db_connected: return False
+        digest = self._content_hash(data)
+        key = f"benchmark_hash:{source}"
+        try:
+            meta = db_service._db['system_metadata'].find_one({"key": key})
+            if not force and meta and meta.get("hash") == digest:
+                logging.info(f"[BENCHMARKS] {source} unchanged ({len(data)} countries); skipping write")
+                return False
+        except Exception as e:
+            logging.warning(f"Benchmark hash lookup failed for {source}: {e}")
+
+        if not self.save_external_stats(source, data):
+            return False
+        try:
+            db_service._db['system_metadata'].update_one(
+                {"key": key},
+                {"$set": {"hash": digest, "countries": len(data), "updated_at": datetime.now().isoformat()}},
+                upsert=True
+            )
+        except Exception as e:
+            logging.warning(f"Benchmark hash could not be recorded for {source}: {e}")
+        return True
+
     def save_external_stats(self, source, data):
-        """Store normalized stats in MongoDB."""
-        if not self.db_connected: return
+        """Store normalized stats in MongoDB. Returns True when written."""
+        if not self.db_connected: return False
         
         timestamp = datetime.now()
         records = []
@@ -129,33 +191,92 @@ class ExternalIPv6DataService:
             if records:
                 db_service._db['external_ipv6_stats'].insert_many(records)
                 logging.info(f"Buffered {len(records)} authority records from {source}")
+            db_service.bump_data_version('external_ipv6_stats')
+
+            # Keep the latest-value view in step (the writer stamps it on close)
+            with BulkWriter(db_service._db[EXTERNAL_LATEST], label="benchmark latest view") as writer:
+                for record in records:
+                    key = f"{source}:{record['country']}"
+                    writer.add(ReplaceOne({"_id": key}, {"_id": key, **record}, upsert=True))
+            return True
         except Exception as e:
             logging.error(f"External data buffering failed: {e}")
+            return False
+
+    def rebuild_latest_view(self):
+        """
+        Recomputes the latest-value view from the full history in one server-side
+        aggregation (used once to seed it, or to repair it).
+        """
+        if not self.db_connected: return 0
+        pipeline = [
+            {"$sort": {"timestamp": -1}},
+            {"$group": {
+                "_id": {"source": "$source", "country": "$country"},
+                "ipv6_percent": {"$first": "$ipv6_percent"},
+                "timestamp": {"$first": "$timestamp"},
+                "date": {"$first": "$date"}
+            }},
+            {"$project": {
+                "_id": {"$concat": ["$_id.source", ":", "$_id.country"]},
+                "source": "$_id.source",
+                "country": "$_id.country",
+                "ipv6_percent": 1,
+                "timestamp": 1,
+                "date": 1
+            }},
+            {"$out": EXTERNAL_LATEST}
+        ]
+        db_service._db[EXTERNAL_STATS].aggregate(pipeline, allowDiskUse=True)
+        db_service.bump_data_version(EXTERNAL_LATEST)
+        count = db_service._db[EXTERNAL_LATEST].count_documents({})
+        logging.info(f"Rebuilt benchmark latest view ({count} source/country pairs)")
+        return count
+
+    def _latest_index(self):
+        """The latest-value view as nested dicts, reloaded only when its data version changes."""
+        version = db_service.data_version_token(EXTERNAL_LATEST)
+        with self._latest_lock:
+            if self._latest is not None and version == self._latest_version:
+                return self._latest
+
+        docs = list(db_service._db[EXTERNAL_LATEST].find({}, {"source": 1, "country": 1, "ipv6_percent": 1}))
+        if not docs and db_service._db[EXTERNAL_STATS].find_one({}, {"_id": 1}):
+            # View not seeded yet (data written before it existed)
+            self.rebuild_latest_view()
+            version = db_service.data_version_token(EXTERNAL_LATEST)
+            docs = list(db_service._db[EXTERNAL_LATEST].find({}, {"source": 1, "country": 1, "ipv6_percent": 1}))
+
+        index = {}
+        for doc in docs:
+            index.setdefault(doc['source'], {})[doc['country']] = doc['ipv6_percent']
+        with self._latest_lock:
+            self._latest = index
+            self._latest_version = version
+        return index
+
+    def get_benchmark(self, source, country_code):
+        """Latest value of one source for one country (a dictionary lookup), or None."""
+        if not self.db_connected: return None
+        try:
+            return self._latest_index().get(source, {}).get(country_code)
+        except Exception as e:
+            logging.error(f"Benchmark retrieval failed: {e}")
+            return None
 
     def get_benchmarks(self, country_code='ALL'):
         """Retrieve aggregated benchmarks for comparative analysis."""
         if not self.db_connected: return {}
         
-        query = {}
-        if country_code != 'ALL':
-            query["country"] = country_code
-            
         try:
-            # Get latest for each source/country
-            cursor = db_service._db['external_ipv6_stats'].find(query).sort("timestamp", -1)
-            results = {}
-            
-            seen = set()
-            for doc in cursor:
-                key = f"{doc['source']}_{doc['country']}"
-                if key in seen: continue
-                seen.add(key)
-                
-                source = doc['source']
-                if source not in results: results[source] = {}
-                results[source][doc['country']] = doc['ipv6_percent']
-                
-            return results
+            # Latest value per source/country, served from the in-memory view
+            index = self._latest_index()
+            if country_code == 'ALL':
+                return {source: dict(values) for source, values in index.items()}
+            return {
+                source: {country_code: values[country_code]}
+                for source, values in index.items() if country_code in values
+            }
         except Exception as e:
             logging.error(f"Benchmark retrieval failed: {e}")
             return {}
@@ -24,7 +24,15 @@ class ForecastingService:
                 .find(query)
                 .sort("date", 1)
             )
+            return self.forecast_from_history(history)
 
+        except Exception as e:
+            self.logger.error(f"Forecasting failed: {e}")
+            return {"status": "error", "message": str(e)}
+
+    def forecast_from_history(self, history):
+        """Linear-trend completion estimate from history records sorted by date."""
+        try:
             if len(history) < 2:
                 return {
                     "status": "insufficient_data",
@@ -0,0 +1,302 @@
+"""
+HTTP Cache Service — strong ETags, conditional requests and compression.
+
+Bodies are encoded once into identity/gzip/brotli variants; responses pick a
+variant from Accept-Encoding and answer a matching If-None-Match with an empty
+304, so repeat visits transfer no payload. Brotli is used when the optional
+`brotli` package is installed.
+
+Dynamic JSON endpoints use @conditional(collections): the ETag is derived from
+the data_versions stamps of the collections the view reads, so a polling
+client that is current gets its 304 before the view (and its queries) runs.
+The ETag also carries an ETAG_MAX_AGE time bucket, so writes that skip
+bump_data_version (ad-hoc scripts, direct edits) are picked up within it.
+Rendered bodies are kept per ETag in the "http_responses" cache, so other
+clients asking for the same version are served the stored variants without
+re-running the view either; with a shared CACHE_BACKEND that holds across
+workers, since the ETags derive from cross-worker data versions.
+"""
+
+import os
+import gzip
+import time
+import hashlib
+import logging
+import functools
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from flask import Response, request, make_response
+from services.database_service import db_service
+from services.cache_backend_service import get_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+# Compression level for bodies rendered per request (stored payloads use 9)
+DYNAMIC_LEVEL = int(os.getenv("HTTP_COMPRESS_LEVEL", "6"))
+# How long data_versions stamps are reused before the next round trip
+STAMP_TTL = float(os.getenv("ETAG_STAMP_TTL", "1"))
+# Longest a data-version ETag stays valid; bounds staleness from unstamped writes
+ETAG_MAX_AGE = float(os.getenv("ETAG_MAX_AGE", "300"))
+# Rendered (etag -> variants) bodies kept per worker
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "32"))
+# Larger bodies are compressed per request instead of being kept
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+
+def strong_etag(body):
+    """Content hash of the identity body, quoted as a strong validator."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def encoding_etag(etag, encoding):
+    """
+    Validator for one content coding of a representation: strong ETags get a
+    per-encoding suffix (RFC 9110 requires distinct strong validators per
+    coding), weak ones already cover every coding.
+    """
+    if encoding == "identity" or etag.startswith("W/"):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _etag_base(tag):
+    """Opaque tag without the weak prefix and any per-encoding suffix."""
+    tag = tag.strip()
+    tag = tag[2:] if tag.startswith("W/") else tag
+    for encoding in ("gzip", "br"):
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def versioned_etag(stamps, *parts):
+    """
+    Weak validator for a representation derived from data versions: the same
+    stamps (and request parts) always render the same document, whatever the
+    content coding it is sent with.
+    """
+    key = repr((sorted((name, stamp[0]) for name, stamp in stamps.items()), parts))
+    return f'W/"{hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def _encode(body, encoding, level):
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if level >= 9 else 5)
+    return body
+
+
+def compress_variants(body, level=9):
+    """{encoding: bytes} for the identity body plus gzip and (when available) brotli."""
+    variants = {"identity": body}
+    if len(body) < MIN_COMPRESS_BYTES:
+        return variants
+    variants["gzip"] = _encode(body, "gzip", level)
+    if brotli is not None:
+        variants["br"] = _encode(body, "br", level)
+    return variants
+
+
+def choose_encoding(available, accept_encoding=None):
+    """Best of `available` encodings the client accepts (brotli > gzip > identity)."""
+    accept = (accept_encoding if accept_encoding is not None
+              else request.headers.get("Accept-Encoding", "")).lower()
+    accepted = {}
+    for part in accept.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token] = q
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def compress_response(response, level=DYNAMIC_LEVEL):
+    """Compresses a buffered response in place with the best encoding the client accepts."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+    available = ("gzip", "br") if brotli is not None else ("gzip",)
+    encoding = choose_encoding(available)
+    if encoding != "identity":
+        response.set_data(_encode(body, encoding, level))
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def etag_matches(etag, if_none_match=None):
+    """
+    True when If-None-Match lists `etag` in any of its content codings (or *);
+    weak comparison as RFC 9110 requires.
+    """
+    header = if_none_match if if_none_match is not None else request.headers.get("If-None-Match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _etag_base(etag)
+    return any(_etag_base(tag) == wanted for tag in header.split(","))
+
+
+def modified_since(last_modified):
+    """False when If-Modified-Since (only consulted without If-None-Match) is not older than last_modified."""
+    header = request.headers.get("If-Modified-Since")
+    if not header or not last_modified or request.headers.get("If-None-Match"):
+        return True
+    try:
+        return parsedate_to_datetime(last_modified) > parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+
+
+def not_modified(etag, cache_control="no-cache", last_modified=None):
+    response = Response(status=304)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Vary"] = "Accept-Encoding"
+    if last_modified:
+        response.headers["Last-Modified"] = last_modified
+    return response
+
+
+def variant_response(variants, etag, content_type="application/json", cache_control="no-cache",
+                     last_modified=None, extra_headers=None):
+    """
+    Serves pre-encoded variants: 304 on a matching If-None-Match, else the best
+    encoding, each coding with its own validator derived from `etag`.
+    """
+    encoding = choose_encoding(variants)
+    if etag_matches(etag):
+        return not_modified(encoding_etag(etag, encoding), cache_control, last_modified)
+    response = Response(variants[encoding], status=200, content_type=content_type)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.headers["ETag"] = encoding_etag(etag, encoding)
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Vary"] = "Accept-Encoding"
+    if last_modified:
+        response.headers["Last-Modified"] = last_modified
+    for key, value in (extra_headers or {}).items():
+        response.headers[key] = value
+    return response
+
+
+class _ResponseCache:
+    """Per-worker data_versions stamps (short TTL) and rendered bodies keyed by ETag."""
+
+    def __init__(self, size=RESPONSE_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._stamps = {}   # tuple(collections) -> (fetched_at, {name: (version, updated_at)})
+        # etag -> {"variants", "content_type", "last_modified"}
+        self._bodies = get_cache("http_responses", max_entries=size)
+
+    def stamps(self, collections):
+        """{collection: (version, updated_at)}, or None when the database is unavailable."""
+        key = tuple(sorted(collections))
+        now = time.time()
+        with self._lock:
+            cached = self._stamps.get(key)
+        if cached is not None and now - cached[0] < STAMP_TTL:
+            return cached[1]
+        if not db_service.connect():
+            return None
+        stamps = {name: (0, None) for name in key}
+        for doc in db_service._db[db_service.COLLECTION_REGISTRY["DATA_VERSIONS"]].find({"_id": {"$in": list(key)}}):
+            stamps[doc["_id"]] = (doc.get("version", 0), doc.get("updated_at"))
+        with self._lock:
+            self._stamps[key] = (now, stamps)
+        return stamps
+
+    def get(self, etag):
+        return self._bodies.get(etag)
+
+    def put(self, etag, entry):
+        self._bodies.set(etag, entry)
+
+
+response_cache = _ResponseCache()
+
+
+def _last_modified(stamps, not_before=None):
+    """HTTP date of the newest data_versions update among `stamps` (and `not_before`)."""
+    latest = not_before
+    for _, updated_at in stamps.values():
+        if not updated_at:
+            continue
+        try:
+            when = datetime.fromisoformat(updated_at).astimezone(timezone.utc)
+        except (TypeError, ValueError):
+            continue
+        latest = when if latest is None or when > latest else latest
+    return format_datetime(latest.replace(microsecond=0), usegmt=True) if latest else None
+
+
+def conditional(collections, key_func=None, cache_control="no-cache"):
+    """
+    Decorator for views whose output is a function of the request and the
+    listed collections' data versions. Answers If-None-Match/If-Modified-Since
+    with a 304 before the view runs, serves stored variants for a known ETag
+    and compresses fresh bodies. `key_func()` adds request state beyond the
+    path and query string (e.g. a time bucket). Without a database the view
+    runs as usual and the response is only compressed.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                stamps = response_cache.stamps(collections)
+            except Exception as e:
+                logger.warning(f"[HTTP CACHE] Data versions unavailable for {request.path}: {e}")
+                stamps = None
+            if stamps is None:
+                return compress_response(make_response(view(*args, **kwargs)))
+
+            query = tuple(sorted(request.args.items(multi=True)))
+            bucket = int(time.time() // ETAG_MAX_AGE)
+            etag = versioned_etag(stamps, request.path, query, key_func() if key_func else None, bucket)
+            last_modified = _last_modified(stamps, datetime.fromtimestamp(bucket * ETAG_MAX_AGE, timezone.utc))
+            if etag_matches(etag) or not modified_since(last_modified):
+                return not_modified(etag, cache_control, last_modified)
+
+            entry = response_cache.get(etag)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+                    return response
+                if response.content_length and response.content_length > RESPONSE_CACHE_MAX_BYTES:
+                    response.headers["ETag"] = etag
+                    response.headers["Cache-Control"] = cache_control
+                    if last_modified:
+                        response.headers["Last-Modified"] = last_modified
+                    return compress_response(response)
+                entry = {
+                    "variants": compress_variants(response.get_data(), level=DYNAMIC_LEVEL),
+                    "content_type": response.content_type,
+                    "last_modified": last_modified
+                }
+                response_cache.put(etag, entry)
+            return variant_response(entry["variants"], etag, content_type=entry["content_type"],
+                                    cache_control=cache_control, last_modified=entry["last_modified"])
+        return wrapper
+    return decorator
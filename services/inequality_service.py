@@ -1,10 +1,12 @@
 from services.database_service import db_service
+from services.single_flight_service import coalesce
 import logging
 
 class InequalityService:
-    def __init__(self):
-        self.db_connected = db_service.connect()
-    
+    @property
+    def db_connected(self):
+        return db_service.connect()
+
     def calculate_gini_coefficient(self, values):
         """
         Calculate Gini coefficient for a list of values.
@@ -93,6 +95,7 @@ class InequalityService:
             logging.error(f"Adoption rate calculation failed: {e}")
             return []
     
+    @coalesce("inequality_index")
     def calculate_inequality_index(self, sector="gov"):
         """
         Calculate inequality metrics for IPv6 adoption.
@@ -1,40 +1,83 @@
 import os
-import joblib
+import csv
+import time
 import logging
-import functools
-import pandas as pd
+import threading
+import numpy as np
+from services.database_service import db_service
+from services.model_artifact_service import LinearModelArtifact
+from services.model_registry_service import model_registry, ADOPTION_MODEL
 from services.external_data_service import external_data_service
+from services.cache_backend_service import get_cache
+
+# Feature order the consensus model was trained on
+FEATURES = ['APNIC', 'Google', 'Cloudflare', 'IPv6_Pulse']
+EXTERNAL_STATS = "external_ipv6_stats"
+# Upper bound on how long a cached prediction is trusted without a version change
+CACHE_MAX_AGE = float(os.getenv("INFERENCE_CACHE_MAX_AGE", "600"))
+# How long the benchmarks' data_versions stamp is reused before the next round trip
+STAMP_TTL = float(os.getenv("INFERENCE_STAMP_TTL", "1"))
 
 # Hot-reload trigger for new Ridge Regression model
 class IPv6InferenceService:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.model = None
         self.model_path = os.path.join(os.getcwd(), 'models', 'ipv6_adoption_model.pkl')
+        # Coefficient artifact exported by training; preferred over the pickle when present
+        self.artifact_path = os.path.join(os.getcwd(), 'models', 'ipv6_adoption_model.json')
+        # Predictions keyed by (country, APNIC value), valid for one (benchmark data, model) version;
+        # shared by the workers when a cross-process CACHE_BACKEND is configured
+        self._results = get_cache("inference_predictions", max_entries=4096, default_ttl=CACHE_MAX_AGE)
+        self._cache_lock = threading.Lock()
+        self._benchmarks = None
+        self._benchmarks_version = None
+        self._stamp = (0.0, None)     # (fetched_at, external benchmarks data_versions stamp)
+        self._trained_countries = set()
         self._load_model()
-        # Pre-load trained countries ONCE at startup (was previously loaded on every prediction call)
-        self._trained_countries = self._load_trained_countries()
 
     def _load_model(self):
+        """
+        Registers the consensus model with the model registry, which serves the
+        active published version (or the legacy files under models/) and
+        hot-swaps it when a new version is activated.
+        """
+        model_registry.on_swap(ADOPTION_MODEL, self._on_model_swap)
+        loaded = model_registry.register(
+            ADOPTION_MODEL, legacy_paths=[self.artifact_path, self.model_path], warmup=self._warm_up
+        )
+        if loaded is None:
+            self.logger.warning(f"[WARN] ML Model not found at {self.model_path}. Inference disabled.")
 
-        """Loads the pre-trained RandomForest model from disk."""
-        try:
-            if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
-                self.logger.info(f"[OK] IPv6 Adoption ML Model loaded from {self.model_path}")
-            else:
-                self.logger.warning(f"[WARN] ML Model not found at {self.model_path}. Inference disabled.")
-        except Exception as e:
-            self.logger.error(f"[ERROR] Failed to load ML Model: {e}")
-            self.model = None
+    def _on_model_swap(self, loaded):
+        # Pre-load trained countries ONCE per model (was previously loaded on every prediction call)
+        self._trained_countries = self._load_trained_countries(loaded)
+        self.logger.info(f"[OK] IPv6 Adoption model {loaded.version} active ({loaded.source})")
 
-    def _load_trained_countries(self):
-        """Load the list of countries at startup (one-time CSV read, not per-call)."""
+    def _warm_up(self, model):
+        """One dummy prediction, so the first real batch after a swap runs at full speed."""
+        features = getattr(model, "features", FEATURES)
+        self._predict_matrix(model, np.zeros((1, len(features)), dtype=np.float64), features)
+
+    @property
+    def model(self):
+        loaded = model_registry.get(ADOPTION_MODEL)
+        return loaded.model if loaded else None
+
+    @property
+    def model_version(self):
+        loaded = model_registry.get(ADOPTION_MODEL)
+        return loaded.version if loaded else None
+
+    def _load_trained_countries(self, loaded):
+        """Trained countries from the model metadata, else the training CSV (one-time read)."""
+        countries = loaded.metadata.get("countries")
+        if countries:
+            return set(countries)
         try:
             dataset_path = os.path.join(os.getcwd(), 'data', 'ipv6_training_dataset.csv')
             if os.path.exists(dataset_path):
-                df = pd.read_csv(dataset_path)
-                countries = set(df['country'].unique())
+                with open(dataset_path, newline='') as f:
+                    countries = {row['country'] for row in csv.DictReader(f)}
                 self.logger.info(f"[OK] Loaded {len(countries)} trained countries from CSV")
                 return countries
         except Exception as e:
@@ -45,7 +88,6 @@ class IPv6InferenceService:
         """Returns the pre-loaded trained countries set (no file I/O)."""
         return self._trained_countries
 
-    @functools.lru_cache(maxsize=100)
     def get_optimized_adoption(self, country_code, raw_apnic_fallback, include_metrics=False):
         """
         AI-Optimized Hybrid Scoring Engine v2:
@@ -53,60 +95,143 @@ class IPv6InferenceService:
         2. Fallback Mode: Uses raw APNIC value for remaining regions.
         3. Real-time Overlay: Weighted blend with live ISOC Pulse (0.7:0.3).
         4. Confidence & Explainability: Detailed telemetry diagnostics.
+
+        Single-country form of predict_batch(); prefer the batch call in loops.
+        """
+        return self.predict_batch([country_code], [raw_apnic_fallback], include_metrics)[country_code]
+
+    def predict_batch(self, country_codes, raw_apnic_values, include_metrics=False):
         """
+        Scores many countries at once: benchmarks are fetched once, every trained
+        country becomes a row of one (n, 4) feature matrix and the model runs a
+        single predict(). Results are cached per (country, APNIC value) until the
+        external benchmarks or the active model change, so repeated refreshes cost
+        no inference at all. Every result carries the model_version that produced it.
+        Returns {country_code: prediction (or metrics dict)}.
+        """
+        # One model reference for the whole batch, even if a swap lands mid-call
+        loaded = model_registry.get(ADOPTION_MODEL)
+        version = self._check_cache_version(loaded)
+        keys = [(cc, round(float(raw or 0), 4)) for cc, raw in zip(country_codes, raw_apnic_values)]
+        found = self._results.get_many(dict.fromkeys(keys), version=version)
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            computed = self._score(missing, loaded)
+            found.update(computed)
+            # Stored under the pinned model's version: once it is swapped out they are misses
+            self._results.set_many(computed, version=version)
+        results = {cc: found[key] for cc, key in zip(country_codes, keys)}
+
+        if include_metrics:
+            return {cc: dict(metrics) for cc, metrics in results.items()}
+        return {cc: metrics["prediction"] for cc, metrics in results.items()}
+
+    def _score(self, keys, loaded):
+        """Runs inference for uncached (country, APNIC value) pairs."""
+        model_version = loaded.version if loaded else None
+        results = {}
+        for cc, raw in keys:
+            if raw == 0:
+                # Validation for Low Confidence
+                results[(cc, raw)] = self._metrics(raw, "Low", "Limited data available for this region. Using baseline proxy.", model_version)
+            else:
+                results[(cc, raw)] = self._metrics(raw, "Medium", "Using authoritative APNIC baseline measurements.", model_version)
+
         trained_countries = self._get_trained_countries()
-        score = float(raw_apnic_fallback)
-        confidence = "Medium" # Default (Fallback)
-        explanation = "Using authoritative APNIC baseline measurements."
-        
-        # 1. Validation for Low Confidence
-        if score == 0:
-            confidence = "Low"
-            explanation = "Limited data available for this region. Using baseline proxy."
+        rows = [key for key in keys if key[0] in trained_countries]
+        if loaded is None or not rows:
+            return results
 
         try:
-            # 2. Fetch live telemetry
-            benchmarks = external_data_service.get_benchmarks(country_code)
-            google_val = benchmarks.get("Google", {}).get(country_code)
-            cloudflare_val = benchmarks.get("Cloudflare", {}).get(country_code)
-            pulse_val = benchmarks.get("IPv6_Pulse", {}).get(country_code)
-
-            # 3. Primary Scoring Tier (ML)
-            if self.model and country_code in trained_countries:
-                # Features: [APNIC, Google, Cloudflare, IPv6_Pulse]
-                f_apnic = float(raw_apnic_fallback)
-                f_google = float(google_val) if google_val is not None else 0.0
-                f_cf = float(cloudflare_val) if cloudflare_val is not None else 0.0
-                f_pulse = float(pulse_val) if pulse_val is not None else 0.0
-                
-                # Features must be a DataFrame with names to avoid scikit-learn warnings
-                features_df = pd.DataFrame([[f_apnic, f_google, f_cf, f_pulse]], 
-                                         columns=['APNIC', 'Google', 'Cloudflare', 'IPv6_Pulse'])
-                score = float(self.model.predict(features_df)[0])
-                confidence = "High"
-                explanation = "Optimized 4-source consensus (APNIC 35%, Google 25%, Cloudflare 25%, Pulse 15%)."
-                self.logger.info(f"ML Consensus Prediction for {country_code}: {score:.2f}")
-
-            result = round(float(score), 1)
-            
-            if include_metrics:
-                return {
-                    "prediction": result,
-                    "confidence": confidence,
-                    "explanation": explanation,
-                    "model_version": "v2.0-real-ai"
-                }
-            return result
+            # Features: [APNIC, Google, Cloudflare, IPv6_Pulse], in the order the model declares
+            features = getattr(loaded.model, "features", FEATURES)
+            benchmarks = self._get_benchmarks()
+            matrix = np.zeros((len(rows), len(features)), dtype=np.float64)
+            for col, source in enumerate(features):
+                if source == 'APNIC':
+                    matrix[:, col] = [raw for _, raw in rows]
+                else:
+                    values = benchmarks.get(source, {})
+                    matrix[:, col] = [float(values.get(cc) or 0.0) for cc, _ in rows]
 
+            # One predict() for the whole batch
+            predictions = self._predict_matrix(loaded.model, matrix, features)
+            for key, score in zip(rows, predictions):
+                results[key] = self._metrics(
+                    score, "High",
+                    "Optimized 4-source consensus (APNIC 35%, Google 25%, Cloudflare 25%, Pulse 15%).",
+                    model_version
+                )
+            self.logger.info(f"ML Consensus Prediction for {len(rows)} countries in one batch")
         except Exception as e:
-            self.logger.error(f"Hybrid inference failed for {country_code}: {e}")
-            if include_metrics:
-                return {"prediction": round(float(raw_apnic_fallback), 1), "confidence": "Low", "explanation": "Service interruption. Using fallback."}
-            return round(float(raw_apnic_fallback), 1)
+            self.logger.error(f"Hybrid inference failed for batch of {len(rows)}: {e}")
+            for cc, raw in rows:
+                results[(cc, raw)] = self._metrics(raw, "Low", "Service interruption. Using fallback.", model_version)
+        return results
+
+    @staticmethod
+    def _predict_matrix(model, matrix, features):
+        if isinstance(model, LinearModelArtifact):
+            return model.predict(matrix)
+        # Named columns avoid scikit-learn feature-name warnings
+        import pandas as pd
+        frame = pd.DataFrame(matrix, columns=features) if hasattr(model, "feature_names_in_") else matrix
+        return np.asarray(model.predict(frame), dtype=np.float64)
+
+    @staticmethod
+    def _metrics(score, confidence, explanation, model_version):
+        return {
+            "prediction": round(float(score), 1),
+            "confidence": confidence,
+            "explanation": explanation,
+            "model_version": model_version or "baseline"
+        }
+
+    def _get_benchmarks(self):
+        """Latest benchmark per source/country for every country, fetched once per data version."""
+        with self._cache_lock:
+            if self._benchmarks is not None:
+                return self._benchmarks
+        benchmarks = external_data_service.get_benchmarks('ALL')
+        with self._cache_lock:
+            self._benchmarks = benchmarks
+        return benchmarks
+
+    def _check_cache_version(self, loaded):
+        """
+        Current cache version: the external benchmarks' data_versions stamp and
+        the model version, identical on every worker so shared entries stay
+        valid across processes. The stamp is reused for STAMP_TTL seconds, so
+        single-country predictions do not pay a round trip each. Cached results
+        expire after max age regardless.
+        """
+        now = time.time()
+        fetched_at, data_version = self._stamp
+        if now - fetched_at >= STAMP_TTL:
+            try:
+                data_version = db_service.get_data_versions([EXTERNAL_STATS]).get(EXTERNAL_STATS) \
+                    if db_service.connect() else None
+            except Exception:
+                data_version = None
+            self._stamp = (now, data_version)
+        version = (data_version, loaded.version if loaded else None)
+        with self._cache_lock:
+            if version != self._benchmarks_version:
+                self._benchmarks = None
+                self._benchmarks_version = version
+        return version
+
+    def expire_version(self):
+        """Re-reads the benchmarks stamp on the next call (rebuilds that record the stamp they predicted under)."""
+        self._stamp = (0.0, None)
 
     def clear_cache(self):
-        """Clear the LRU cache (useful when external data is refreshed)."""
-        self.get_optimized_adoption.cache_clear()
+        """Drops cached predictions (useful when external data is refreshed)."""
+        self._results.clear()
+        with self._cache_lock:
+            self._benchmarks = None
+            self._benchmarks_version = None
+            self._stamp = (0.0, None)
 
 # Global Singleton
 inference_service = IPv6InferenceService()
\ No newline at end of file
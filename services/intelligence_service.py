@@ -17,7 +17,7 @@ class IntelligenceService:
         """
         try:
             # Fetch all APAC country stats from MongoDB
-            countries_stats = list(db_service.apac_stats.find({}))
+            countries_stats = db_service.cached_find(db_service.COLLECTION_REGISTRY["APAC_STATS"])
             
             if len(countries_stats) < 2:
                 logger.warning("Insufficient data for Strategic Horizon")
@@ -45,15 +45,18 @@ class IntelligenceService:
             total_adoption = 0
             total_growth = 0
             valid_countries = 0
+
+            # Apply AI Inference for Strategic Accuracy (one batched prediction for all countries)
+            predictions = inference_service.predict_batch(
+                [stat.get('country_code', 'Unknown') for stat in countries_stats],
+                [stat.get('ipv6_adoption', 0) for stat in countries_stats]
+            )
             
             for stat in countries_stats:
                 # Basic validation
                 country_code = stat.get('country_code', 'Unknown')
                 raw_adoption = stat.get('ipv6_adoption', 0)
-                
-                # Apply AI Inference for Strategic Accuracy
-                ai_data = inference_service.get_optimized_adoption(country_code, raw_adoption, include_metrics=True)
-                adoption = ai_data["prediction"]
+                adoption = predictions[country_code]
                 
                 # Use pre-fetched benchmarks (no per-country DB query)
                 benchmarks = {
@@ -5,16 +5,12 @@ from services.database_service import db_service
 import logging
 
 class LedgerService:
-    def __init__(self):
-        self._collection = None
-
     @property
     def collection(self):
-        if self._collection is None:
-            if not db_service.is_connected:
-                db_service.connect()
-            self._collection = db_service._db[db_service.COLLECTION_REGISTRY["TRANSPARENCY_LEDGER"]]
-        return self._collection
+        # Resolved per call: a handle cached before a fork would point at the parent's client
+        if not db_service.connect():
+            return None
+        return db_service._db[db_service.COLLECTION_REGISTRY["TRANSPARENCY_LEDGER"]]
 
     def _generate_checksum(self, data):
         """Generates a SHA-256 hash of the data dictionary."""
@@ -0,0 +1,346 @@
+"""
+Local Document Store — embedded SQLite backend used when MongoDB is unreachable.
+
+Replaces the old whole-file JSON fallbacks with an indexed, incrementally
+written store that survives restarts. Each collection is a table of JSON
+documents; indexes are SQLite expression indexes over json_extract(), so the
+equality/range/sort query shapes the services use are served without scans.
+
+The collection API is a deliberately small pymongo-compatible subset:
+find / find_one / count_documents / insert_one / insert_many / update_one /
+delete_many / create_index, plus latest_by() for the "latest record per key"
+aggregation the monitor services rely on and replace_by() to keep only the
+latest records per key.
+"""
+
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+_FIELD_RE = re.compile(r'^[A-Za-z0-9_.]+$')
+
+
+def _field_expr(field):
+    """SQL expression for a (dotted) document field. Field names are validated, never bound."""
+    if not _FIELD_RE.match(field):
+        raise ValueError(f"Unsupported field name for local store: {field!r}")
+    return f"json_extract(doc, '$.{field}')"
+
+
+def _sql_value(value):
+    if isinstance(value, bool):
+        return 1 if value else 0
+    if isinstance(value, (dict, list)):
+        raise ValueError("Local store filters only support scalar values")
+    if value is not None and not isinstance(value, (int, float, str)):
+        return str(value)
+    return value
+
+
+def _normalize_sort(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction if direction is not None else 1)]
+    return list(key_or_list)
+
+
+class LocalCursor:
+    """Lazily executed query, mirroring the chaining style of a pymongo cursor."""
+
+    def __init__(self, collection, filter=None, projection=None):
+        self._collection = collection
+        self._filter = filter or {}
+        self._projection = projection
+        self._sort = []
+        self._limit = 0
+        self._skip = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def limit(self, n):
+        self._limit = int(n)
+        return self
+
+    def skip(self, n):
+        self._skip = int(n)
+        return self
+
+    def __iter__(self):
+        params = []
+        where = self._collection._compile_filter(self._filter, params)
+        sql = f'SELECT id, doc FROM "{self._collection.name}" WHERE {where}'
+        if self._sort:
+            order = ", ".join(f"{_field_expr(f)} {'DESC' if d == -1 else 'ASC'}" for f, d in self._sort)
+            sql += f" ORDER BY {order}"
+        if self._limit or self._skip:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([self._limit or -1, self._skip])
+        for row_id, raw in self._collection._store._execute(sql, params).fetchall():
+            yield self._collection._decode(row_id, raw, self._projection)
+
+
+class LocalCollection:
+    """A single collection (SQLite table) inside the local store."""
+
+    def __init__(self, store, name):
+        if not _FIELD_RE.match(name):
+            raise ValueError(f"Unsupported collection name: {name!r}")
+        self._store = store
+        self.name = name
+        store._execute(
+            f'CREATE TABLE IF NOT EXISTS "{name}" (id INTEGER PRIMARY KEY AUTOINCREMENT, doc TEXT NOT NULL)'
+        )
+
+    # ------------------------------------------------------------------
+    # Encoding helpers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _encode(doc):
+        doc = {k: v for k, v in doc.items() if k != '_id'}
+        return json.dumps(doc, default=str)
+
+    @staticmethod
+    def _decode(row_id, raw, projection=None):
+        doc = json.loads(raw)
+        doc['_id'] = row_id
+        if projection:
+            include = {k for k, v in projection.items() if v and k != '_id'}
+            exclude = {k for k, v in projection.items() if not v}
+            if include:
+                doc = {k: v for k, v in doc.items() if k in include or (k == '_id' and '_id' not in exclude)}
+            else:
+                doc = {k: v for k, v in doc.items() if k not in exclude}
+        return doc
+
+    def _compile_filter(self, flt, params):
+        """Translates a Mongo-style filter into a SQL WHERE clause (appending bound params)."""
+        clauses = []
+        for key, cond in (flt or {}).items():
+            if key in ("$or", "$and"):
+                parts = [f"({self._compile_filter(sub, params)})" for sub in cond]
+                joiner = " OR " if key == "$or" else " AND "
+                clauses.append(f"({joiner.join(parts) or '1'})")
+                continue
+
+            expr = _field_expr(key)
+            if isinstance(cond, dict) and any(k.startswith('$') for k in cond):
+                for op, value in cond.items():
+                    if op == "$exists":
+                        type_expr = expr.replace("json_extract", "json_type", 1)
+                        clauses.append(f"{type_expr} IS {'NOT NULL' if value else 'NULL'}")
+                    elif op in ("$gt", "$gte", "$lt", "$lte"):
+                        sym = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[op]
+                        clauses.append(f"{expr} {sym} ?")
+                        params.append(_sql_value(value))
+                    elif op == "$ne":
+                        if value is None:
+                            clauses.append(f"{expr} IS NOT NULL")
+                        else:
+                            clauses.append(f"({expr} IS NULL OR {expr} != ?)")
+                            params.append(_sql_value(value))
+                    elif op in ("$in", "$nin"):
+                        values = list(value)
+                        if not values:
+                            clauses.append("0" if op == "$in" else "1")
+                            continue
+                        marks = ", ".join("?" for _ in values)
+                        clauses.append(f"{expr} {'IN' if op == '$in' else 'NOT IN'} ({marks})")
+                        params.extend(_sql_value(v) for v in values)
+                    else:
+                        raise ValueError(f"Operator {op} is not supported by the local store")
+            elif cond is None:
+                clauses.append(f"{expr} IS NULL")
+            else:
+                clauses.append(f"{expr} = ?")
+                params.append(_sql_value(cond))
+        return " AND ".join(clauses) or "1"
+
+    # ------------------------------------------------------------------
+    # Read API
+    # ------------------------------------------------------------------
+    def find(self, filter=None, projection=None):
+        return LocalCursor(self, filter, projection)
+
+    def find_one(self, filter=None, projection=None, sort=None):
+        cursor = self.find(filter, projection).limit(1)
+        if sort:
+            cursor.sort(sort)
+        return next(iter(cursor), None)
+
+    def count_documents(self, filter=None):
+        params = []
+        where = self._compile_filter(filter, params)
+        return self._store._execute(f'SELECT COUNT(*) FROM "{self.name}" WHERE {where}', params).fetchone()[0]
+
+    def latest_by(self, group_field, sort_field, filter=None, projection=None):
+        """
+        Latest document per `group_field` ordered by `sort_field` — the local
+        equivalent of `$sort` + `$group: {$first: "$$ROOT"}`.
+        """
+        params = []
+        where = self._compile_filter(filter, params)
+        sql = (
+            f'SELECT id, doc FROM ('
+            f'  SELECT id, doc, ROW_NUMBER() OVER ('
+            f'    PARTITION BY {_field_expr(group_field)} ORDER BY {_field_expr(sort_field)} DESC'
+            f'  ) AS rn FROM "{self.name}" WHERE {where}'
+            f') WHERE rn = 1'
+        )
+        return [self._decode(row_id, raw, projection) for row_id, raw in self._store._execute(sql, params).fetchall()]
+
+    # ------------------------------------------------------------------
+    # Write API
+    # ------------------------------------------------------------------
+    def insert_one(self, doc):
+        cur = self._store._execute(f'INSERT INTO "{self.name}" (doc) VALUES (?)', [self._encode(doc)], commit=True)
+        return SimpleNamespace(inserted_id=cur.lastrowid)
+
+    def insert_many(self, docs):
+        rows = [(self._encode(d),) for d in docs]
+        if rows:
+            self._store._executemany(f'INSERT INTO "{self.name}" (doc) VALUES (?)', rows)
+        return SimpleNamespace(inserted_count=len(rows))
+
+    def replace_by(self, field, docs):
+        """
+        Replaces every document sharing a `field` value with the given ones in one
+        transaction, so the collection keeps only the latest documents per key.
+        """
+        rows = [(self._encode(d),) for d in docs]
+        keys = list({_sql_value(d.get(field)) for d in docs})
+        expr = _field_expr(field)
+        conn = self._store._conn()
+        with self._store._write_lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                conn.execute(f'DELETE FROM "{self.name}" WHERE {expr} IN ({", ".join("?" for _ in chunk)})', chunk)
+            conn.executemany(f'INSERT INTO "{self.name}" (doc) VALUES (?)', rows)
+            conn.commit()
+        return SimpleNamespace(inserted_count=len(rows))
+
+    def update_one(self, filter, update, upsert=False):
+        with self._store._write_lock:
+            existing = self.find_one(filter)
+            if existing is None:
+                if not upsert:
+                    return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+                # Equality fields seed the new document; None means "field absent"
+                doc = {k: v for k, v in filter.items()
+                       if not k.startswith('$') and not isinstance(v, dict) and v is not None}
+                doc.update(update.get("$setOnInsert", {}))
+                self._apply_update(doc, update)
+                result = self.insert_one(doc)
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=result.inserted_id)
+
+            row_id = existing.pop('_id')
+            self._apply_update(existing, update)
+            self._store._execute(f'UPDATE "{self.name}" SET doc = ? WHERE id = ?',
+                                 [self._encode(existing), row_id], commit=True)
+            return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+
+    @staticmethod
+    def _apply_update(doc, update):
+        for key, value in update.get("$set", {}).items():
+            doc[key] = value
+        for key, value in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + value
+        for key in update.get("$unset", {}):
+            doc.pop(key, None)
+
+    def delete_many(self, filter):
+        params = []
+        where = self._compile_filter(filter, params)
+        cur = self._store._execute(f'DELETE FROM "{self.name}" WHERE {where}', params, commit=True)
+        return SimpleNamespace(deleted_count=cur.rowcount)
+
+    def create_index(self, keys, unique=False):
+        """Creates a SQLite expression index; `keys` uses the pymongo [(field, direction)] form."""
+        keys = _normalize_sort(keys)
+        cols = ", ".join(f"{_field_expr(f)}{' DESC' if d == -1 else ''}" for f, d in keys)
+        name = f"ix_{self.name}_" + "_".join(f.replace('.', '_') for f, _ in keys)
+        self._store._execute(
+            f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{name}" ON "{self.name}" ({cols})',
+            commit=True
+        )
+        return name
+
+
+class LocalDocumentStore:
+    """SQLite (WAL mode) document store with one connection per thread."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._collections = {}
+        self._collections_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql, params=(), commit=False):
+        conn = self._conn()
+        if commit:
+            with self._write_lock:
+                cur = conn.execute(sql, params)
+                conn.commit()
+                return cur
+        return conn.execute(sql, params)
+
+    def _executemany(self, sql, rows):
+        conn = self._conn()
+        with self._write_lock:
+            conn.executemany(sql, rows)
+            conn.commit()
+
+    def collection(self, name):
+        with self._collections_lock:
+            coll = self._collections.get(name)
+            if coll is None:
+                coll = self._collections[name] = LocalCollection(self, name)
+            return coll
+
+    def __getitem__(self, name):
+        return self.collection(name)
+
+    def seed_from_json(self, name, path, flatten=None):
+        """
+        One-time import of a legacy JSON fallback file into an empty collection,
+        so data written by older versions is not lost on upgrade.
+        """
+        coll = self.collection(name)
+        if not os.path.exists(path) or coll.count_documents({}) > 0:
+            return 0
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            docs = flatten(data) if flatten else data
+            coll.insert_many(docs)
+            logger.info(f"[LOCAL STORE] Seeded {len(docs)} documents into {name} from {path}")
+            return len(docs)
+        except Exception as e:
+            logger.error(f"[LOCAL STORE] Could not seed {name} from {path}: {e}")
+            return 0
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
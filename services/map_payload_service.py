@@ -0,0 +1,236 @@
+"""
+Map Payload Service — precomputed, pre-compressed payloads for the APAC map.
+
+An offline build (scheduled job or scripts/build_map_payload.py) turns the
+stored GeoJSON into a compact one — Douglas-Peucker simplified, coordinates
+quantized to a fixed grid, only the properties the map reads — joins the
+current per-country stats, and stores identity/gzip/brotli variants with a
+strong ETag in `map_payloads`:
+
+- "apac_geo": the simplified FeatureCollection (countries.geo.json)
+- "apac_map": {"geo": ..., "stats": ...} in one response for the map pages
+
+Builds are skipped while the input data versions are unchanged. Workers keep
+the variants in memory until the `map_payloads` data version moves, so a
+request costs a dictionary lookup and a 304 when the client is current.
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from services.database_service import db_service
+from services.http_cache_service import compress_variants, strong_etag
+from services.stats_service import StatsService
+from services.model_registry_service import model_data_version_key, ADOPTION_MODEL
+
+logger = logging.getLogger(__name__)
+
+MAP_PAYLOADS = db_service.COLLECTION_REGISTRY["MAP_PAYLOADS"]
+GEOJSON_MAP = db_service.COLLECTION_REGISTRY["GEOJSON_MAP"]
+APAC_STATS = db_service.COLLECTION_REGISTRY["APAC_STATS"]
+EXTERNAL_STATS = db_service.COLLECTION_REGISTRY["EXTERNAL_STATS"]
+APAC_AI_STATS = db_service.COLLECTION_REGISTRY["APAC_AI_STATS"]
+
+GEO_PAYLOAD = "apac_geo"
+MAP_PAYLOAD = "apac_map"
+
+# Inputs each payload is derived from (data_versions keys)
+PAYLOAD_INPUTS = {
+    GEO_PAYLOAD: [GEOJSON_MAP],
+    MAP_PAYLOAD: [GEOJSON_MAP, APAC_STATS, APAC_AI_STATS, EXTERNAL_STATS, model_data_version_key(ADOPTION_MODEL)],
+}
+
+# Grid decimals (3 ~ 110 m) and simplification tolerance in degrees
+QUANTIZE_DECIMALS = int(os.getenv("MAP_QUANTIZE_DECIMALS", "3"))
+SIMPLIFY_TOLERANCE = float(os.getenv("MAP_SIMPLIFY_TOLERANCE", "0.01"))
+# Feature properties read by the map scripts
+KEEP_PROPERTIES = ("name", "ISO_A2", "ISO_A3")
+
+
+def _douglas_peucker(points, tolerance):
+    """Iterative Douglas-Peucker; returns the kept points (endpoints always kept)."""
+    if len(points) < 3:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    tol_sq = tolerance * tolerance
+    while stack:
+        start, end = stack.pop()
+        (x1, y1), (x2, y2) = points[start], points[end]
+        dx, dy = x2 - x1, y2 - y1
+        seg_sq = dx * dx + dy * dy
+        max_dist, index = -1.0, None
+        for i in range(start + 1, end):
+            px, py = points[i]
+            if seg_sq == 0:
+                dist = (px - x1) ** 2 + (py - y1) ** 2
+            else:
+                t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / seg_sq))
+                dist = (px - x1 - t * dx) ** 2 + (py - y1 - t * dy) ** 2
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tol_sq:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _quantize(ring, decimals):
+    points = []
+    for coord in ring:
+        point = (round(coord[0], decimals), round(coord[1], decimals))
+        if not points or point != points[-1]:
+            points.append(point)
+    return points
+
+
+def _simplify_ring(ring, tolerance, decimals):
+    """Simplified, quantized, closed ring; tiny rings keep their quantized shape instead of vanishing."""
+    points = _quantize(ring, decimals)
+    simplified = _douglas_peucker(points, tolerance)
+    if len(simplified) < 4:
+        simplified = points
+    if len(simplified) < 4:
+        simplified = _quantize(ring, decimals + 2)
+    if simplified and simplified[0] != simplified[-1]:
+        simplified.append(simplified[0])
+    return [list(p) for p in simplified]
+
+
+def simplify_geometry(geometry, tolerance=SIMPLIFY_TOLERANCE, decimals=QUANTIZE_DECIMALS):
+    if not geometry:
+        return geometry
+    kind = geometry.get("type")
+    if kind == "Polygon":
+        coords = [_simplify_ring(ring, tolerance, decimals) for ring in geometry["coordinates"]]
+    elif kind == "MultiPolygon":
+        coords = [[_simplify_ring(ring, tolerance, decimals) for ring in polygon]
+                  for polygon in geometry["coordinates"]]
+    else:
+        return geometry
+    return {"type": kind, "coordinates": coords}
+
+
+def simplify_feature_collection(collection, tolerance=SIMPLIFY_TOLERANCE, decimals=QUANTIZE_DECIMALS):
+    """Compact copy of a FeatureCollection: simplified geometry, only the properties the map uses."""
+    features = []
+    for feature in collection.get("features", []):
+        compact = {
+            "type": "Feature",
+            "properties": {k: v for k, v in (feature.get("properties") or {}).items() if k in KEEP_PROPERTIES},
+            "geometry": simplify_geometry(feature.get("geometry"), tolerance, decimals)
+        }
+        if "id" in feature:
+            compact["id"] = feature["id"]
+        features.append(compact)
+    return {"type": "FeatureCollection", "features": features}
+
+
+class MapPayloadService:
+    """Builds payloads offline and serves their pre-compressed variants from memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._payloads = {}       # payload id -> {"etag", "variants", "built_at"}
+        self._version = None
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    def build(self, force=False):
+        """Rebuilds the payloads whose inputs changed. Returns the ids that were rewritten."""
+        if not db_service.connect():
+            logger.error("Cannot build map payload: DB not connected")
+            return []
+
+        db = db_service._db
+        deps = sorted({dep for inputs in PAYLOAD_INPUTS.values() for dep in inputs})
+        versions = db_service.get_data_versions(deps)
+        recorded = {doc["_id"]: doc.get("inputs") for doc in db[MAP_PAYLOADS].find({}, {"inputs": 1})}
+        stale = [
+            payload_id for payload_id, inputs in PAYLOAD_INPUTS.items()
+            if force or recorded.get(payload_id) != {dep: versions.get(dep, 0) for dep in inputs}
+        ]
+        if not stale:
+            return []
+
+        geo_doc = db[GEOJSON_MAP].find_one({"id": "countries_map"})
+        if not geo_doc or "data" not in geo_doc:
+            logger.warning("[MAP] No GeoJSON in geojson_map_data; payload not built")
+            return []
+        started = datetime.now()
+        geo = simplify_feature_collection(geo_doc["data"])
+
+        written = []
+        for payload_id in stale:
+            if payload_id == GEO_PAYLOAD:
+                body = geo
+            else:
+                body = {"geo": geo, "stats": StatsService().get_all_apac_ipv6_stats()}
+            inputs = {dep: versions.get(dep, 0) for dep in PAYLOAD_INPUTS[payload_id]}
+            if self._store(payload_id, body, inputs):
+                written.append(payload_id)
+
+        if written:
+            db_service.bump_data_version(MAP_PAYLOADS)
+        logger.info(f"[MAP] Payloads {stale} built in {(datetime.now() - started).total_seconds():.2f}s "
+                    f"({len(written)} changed)")
+        return written
+
+    def _store(self, payload_id, body, inputs):
+        """Encodes and stores one payload; returns False when its content did not change."""
+        raw = json.dumps(body, separators=(",", ":"), sort_keys=True, default=str).encode("utf-8")
+        etag = strong_etag(raw)
+        coll = db_service._db[MAP_PAYLOADS]
+        current = coll.find_one({"_id": payload_id}, {"etag": 1})
+        if current and current.get("etag") == etag:
+            coll.update_one({"_id": payload_id}, {"$set": {"inputs": inputs}})
+            return False
+
+        variants = compress_variants(raw)
+        coll.replace_one({"_id": payload_id}, {
+            "_id": payload_id,
+            "etag": etag,
+            "inputs": inputs,
+            "built_at": datetime.now().isoformat(),
+            "sizes": {encoding: len(data) for encoding, data in variants.items()},
+            "variants": variants
+        }, upsert=True)
+        logger.info(f"[MAP] {payload_id}: " + ", ".join(f"{k}={len(v) // 1024}KB" for k, v in variants.items()))
+        return True
+
+    # ------------------------------------------------------------------
+    # Serve
+    # ------------------------------------------------------------------
+    def get(self, payload_id):
+        """{"etag", "variants", "built_at"} for a payload, or None if it was never built."""
+        if not db_service.connect():
+            return self._payloads.get(payload_id)
+        version = db_service.data_version_token(MAP_PAYLOADS)
+        with self._lock:
+            if version != self._version:
+                self._payloads = {}
+                self._version = version
+            cached = self._payloads.get(payload_id)
+        if cached is not None:
+            return cached
+
+        doc = db_service._db[MAP_PAYLOADS].find_one({"_id": payload_id})
+        if not doc:
+            return None
+        payload = {
+            "etag": doc["etag"],
+            "built_at": doc.get("built_at"),
+            "variants": {encoding: bytes(data) for encoding, data in doc["variants"].items()}
+        }
+        with self._lock:
+            if self._version == version:
+                self._payloads[payload_id] = payload
+        return payload
+
+
+map_payload_service = MapPayloadService()
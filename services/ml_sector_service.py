@@ -1,16 +1,15 @@
 import os
-import joblib
 import pandas as pd
 import dns.resolver
 import logging
 from ipwhois import IPWhois
 from sklearn.preprocessing import LabelEncoder
 from services.database_service import db_service
+from services.model_registry_service import model_registry, SECTOR_MODEL
 
 class MLSectorService:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.model = None
         self.model_path = os.path.join(os.getcwd(), 'models', 'ipv6_final_model.pkl')
         
         # Encoders initialization
@@ -24,21 +23,30 @@ class MLSectorService:
         self._load_model()
 
     def _load_model(self):
-        try:
-            if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
-                self.logger.info(f"[OK] XGBoost Sector Model loaded from {self.model_path}")
-            else:
-                self.logger.warning(f"[WARN] XGBoost Model not found at {self.model_path}")
-        except Exception as e:
-            self.logger.error(f"[ERROR] Failed to load XGBoost Model: {e}")
+        """Serves the active registry version (or the legacy pickle), hot-swapped on activation."""
+        loaded = model_registry.register(SECTOR_MODEL, legacy_paths=[self.model_path], warmup=self._warm_up)
+        if loaded is not None:
+            self.logger.info(f"[OK] XGBoost Sector Model {loaded.version} loaded from {loaded.source}")
+        else:
+            self.logger.warning(f"[WARN] XGBoost Model not found at {self.model_path}")
+
+    def _warm_up(self, model):
+        """Dummy prediction so a freshly swapped model is fully initialised before serving."""
+        model.predict(pd.DataFrame([{"sector": 0, "ipv4": 0, "country": 0, "asn": 0, "bgp_degree": 0}]))
+
+    @property
+    def model(self):
+        loaded = model_registry.get(SECTOR_MODEL)
+        return loaded.model if loaded else None
 
     def classify_domain(self, domain):
         """
         Extracts features and predicts sector/readiness for a domain.
         Features: sector, ipv4, country, asn, bgp_degree
         """
-        if self.model is None:
+        # Pin one model version for the whole classification
+        loaded = model_registry.get(SECTOR_MODEL)
+        if loaded is None:
             return {"error": "ML Model not initialized"}
 
         features = {
@@ -101,14 +109,15 @@ class MLSectorService:
 
             # 5. Prediction
             # 1 = IPv6 Ready, 0 = IPv4 Only
-            pred = self.model.predict(X)[0]
+            pred = loaded.model.predict(X)[0]
             
             return {
                 "domain": domain,
                 "features": features,
                 "prediction_label": "IPv6 Ready" if pred == 1 else "IPv4 Only",
                 "is_ready": bool(pred),
-                "confidence": 0.92 # Static confidence for now or extracted from predict_proba if available
+                "confidence": 0.92, # Static confidence for now or extracted from predict_proba if available
+                "model_version": loaded.version
             }
         except Exception as e:
             self.logger.error(f"Prediction failed for {domain}: {e}")
@@ -0,0 +1,105 @@
+"""
+Model Artifact Service — dependency-free serving of linear models.
+
+The consensus model is a Ridge regression, so serving it only needs its
+coefficients. Training exports a small, versioned JSON artifact next to the
+pickle:
+
+    {
+      "format": "linear-v1",
+      "model_type": "Ridge",
+      "version": "20261018T120000Z",
+      "features": ["APNIC", "Google", "Cloudflare", "IPv6_Pulse"],
+      "coefficients": [...],
+      "intercept": 0.0,
+      "metadata": {"trained_at": ..., "r2": ..., "countries": [...], ...}
+    }
+
+LinearModelArtifact evaluates it with a single NumPy matrix-vector product,
+so web workers never import scikit-learn, pandas or joblib for the linear case.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime, timezone
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = "linear-v1"
+
+
+class LinearModelArtifact:
+    """Coefficients, intercept and feature order of a fitted linear model."""
+
+    def __init__(self, features, coefficients, intercept, version=None, model_type="linear", metadata=None):
+        self.features = list(features)
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.version = version
+        self.model_type = model_type
+        self.metadata = metadata or {}
+        if self.coefficients.shape != (len(self.features),):
+            raise ValueError(
+                f"Artifact has {self.coefficients.size} coefficients for {len(self.features)} features"
+            )
+
+    def predict(self, matrix):
+        """Predictions for an (n, len(features)) matrix whose columns follow self.features."""
+        return np.asarray(matrix, dtype=np.float64) @ self.coefficients + self.intercept
+
+    # ------------------------------------------------------------------
+    # Serialisation
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_estimator(cls, model, features, metadata=None, version=None):
+        """Builds an artifact from a fitted scikit-learn linear estimator (coef_/intercept_)."""
+        coefficients = np.ravel(model.coef_)
+        intercept = np.ravel(np.asarray(model.intercept_, dtype=np.float64))
+        return cls(
+            features, coefficients, intercept[0] if intercept.size else 0.0,
+            version=version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+            model_type=type(model).__name__,
+            metadata=metadata
+        )
+
+    def to_dict(self):
+        return {
+            "format": ARTIFACT_FORMAT,
+            "model_type": self.model_type,
+            "version": self.version,
+            "features": self.features,
+            "coefficients": [float(c) for c in self.coefficients],
+            "intercept": self.intercept,
+            "metadata": self.metadata
+        }
+
+    def save(self, path):
+        """Writes the artifact atomically (temp file + rename)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported model artifact format: {data.get('format')!r}")
+        return cls(
+            data["features"], data["coefficients"], data["intercept"],
+            version=data.get("version"),
+            model_type=data.get("model_type", "linear"),
+            metadata=data.get("metadata")
+        )
+
+
+def is_linear_estimator(model):
+    """True for fitted estimators that a coefficient artifact reproduces exactly."""
+    return hasattr(model, "coef_") and hasattr(model, "intercept_") and np.ndim(model.coef_) <= 1
@@ -0,0 +1,324 @@
+"""
+Model Registry Service — versioned, hot-swappable models for the ML services.
+
+Layout (shared by every worker on the same volume):
+
+    models/registry/<name>/<version>/model.json    linear coefficient artifact, or
+    models/registry/<name>/<version>/model.pkl     any joblib-pickled estimator
+    models/registry/<name>/<version>/metadata.json training metadata
+    models/registry/<name>/ACTIVE                  the version currently served
+
+Activating a version (admin endpoint or training script) loads and warms the
+new model first, then swaps a single reference, so requests never wait on a
+load. Other workers pick the new ACTIVE pointer up through a polling watcher.
+Each activation bumps the `model:<name>` data version, which derived caches
+(predictions, dashboard sections) use to invalidate exactly what the model fed.
+
+Models that have never been published fall back to their legacy files under
+models/ so existing deployments keep working.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import threading
+from datetime import datetime, timezone
+from services.database_service import db_service
+from services.model_artifact_service import LinearModelArtifact
+
+logger = logging.getLogger(__name__)
+
+ADOPTION_MODEL = "ipv6_adoption"
+SECTOR_MODEL = "sector_classifier"
+
+ARTIFACT_FILES = ("model.json", "model.pkl")
+_VERSION_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+
+def model_data_version_key(name):
+    """data_versions key bumped whenever `name` is activated."""
+    return f"model:{name}"
+
+
+class LoadedModel:
+    """An immutable, warmed model instance together with its identity."""
+
+    def __init__(self, name, version, model, metadata=None, source=None):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.metadata = metadata or {}
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+
+    def describe(self):
+        return {"version": self.version, "source": self.source, "loaded_at": self.loaded_at}
+
+
+def _load_file(path):
+    if path.endswith(".json"):
+        return LinearModelArtifact.load(path)
+    # Only non-linear models pay for the scikit-learn/joblib import
+    import joblib
+    return joblib.load(path)
+
+
+class ModelRegistry:
+    """Per-process view of the on-disk registry with atomic in-process swaps."""
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv("MODEL_REGISTRY_PATH", os.path.join(os.getcwd(), 'models', 'registry'))
+        self.poll_interval = float(os.getenv("MODEL_REGISTRY_POLL_INTERVAL", "10"))
+        self._specs = {}        # name -> {"legacy": [paths], "warmup": callable}
+        self._active = {}       # name -> LoadedModel
+        self._listeners = {}    # name -> [callback(LoadedModel)]
+        self._lock = threading.RLock()
+        self._watcher = None
+        self._watcher_pid = None
+
+    # ------------------------------------------------------------------
+    # Serving API
+    # ------------------------------------------------------------------
+    def register(self, name, legacy_paths=(), warmup=None):
+        """Declares a model and loads its active version (or legacy file) right away."""
+        with self._lock:
+            self._specs[name] = {"legacy": list(legacy_paths), "warmup": warmup}
+        version = self.active_version(name)
+        loaded = None
+        if version:
+            try:
+                loaded = self._load(name, version)
+            except Exception as e:
+                logger.error(f"[MODELS] Active {name} {version} failed to load, trying legacy files: {e}")
+        if loaded is None:
+            loaded = self._load_legacy(name)
+        if loaded is not None:
+            self._swap(name, loaded)
+        return loaded
+
+    def get(self, name):
+        """The LoadedModel currently served for `name` (None when nothing is available)."""
+        self._ensure_watcher()
+        return self._active.get(name)
+
+    def is_registered(self, name):
+        """True when `name` was declared with register() in this process."""
+        return name in self._specs
+
+    def on_swap(self, name, callback):
+        """Calls callback(loaded_model) after every swap of `name`."""
+        with self._lock:
+            self._listeners.setdefault(name, []).append(callback)
+
+    # ------------------------------------------------------------------
+    # Registry management
+    # ------------------------------------------------------------------
+    def _model_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def active_version(self, name):
+        try:
+            with open(os.path.join(self._model_dir(name), "ACTIVE"), 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self, name):
+        """Published versions of `name`, newest first, with their metadata."""
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        active = self.active_version(name)
+        result = []
+        for version in sorted(os.listdir(model_dir), reverse=True):
+            path = os.path.join(model_dir, version)
+            if not os.path.isdir(path) or version.startswith('.'):
+                continue
+            metadata = {}
+            try:
+                with open(os.path.join(path, "metadata.json"), 'r') as f:
+                    metadata = json.load(f)
+            except (FileNotFoundError, ValueError):
+                pass
+            result.append({"version": version, "active": version == active, "metadata": metadata})
+        return result
+
+    def publish(self, name, artifact_path, metadata=None, version=None, activate=True):
+        """
+        Copies a trained artifact (.json coefficient file or .pkl) into a new
+        version directory and optionally activates it. Returns the version.
+        """
+        ext = os.path.splitext(artifact_path)[1]
+        if ext not in (".json", ".pkl"):
+            raise ValueError(f"Unsupported model artifact: {artifact_path}")
+        version = version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        if not _VERSION_RE.match(version):
+            raise ValueError(f"Invalid model version: {version!r}")
+        target = os.path.join(self._model_dir(name), version)
+        if os.path.exists(target):
+            raise ValueError(f"{name} version {version} already exists")
+
+        # Build in a hidden directory and rename, so watchers never see a half-written version
+        staging = os.path.join(self._model_dir(name), f".{version}.tmp")
+        os.makedirs(staging, exist_ok=True)
+        shutil.copy2(artifact_path, os.path.join(staging, f"model{ext}"))
+        with open(os.path.join(staging, "metadata.json"), 'w') as f:
+            json.dump({"published_at": datetime.now(timezone.utc).isoformat(), **(metadata or {})},
+                      f, indent=2, default=str)
+        os.rename(staging, target)
+        logger.info(f"[MODELS] Published {name} {version}")
+
+        if activate:
+            self.activate(name, version)
+        return version
+
+    def activate(self, name, version):
+        """
+        Loads and warms `version`, points ACTIVE at it and swaps it in. Raises
+        (leaving the current model in place) when the version cannot be loaded.
+        """
+        if not _VERSION_RE.match(version or "") or not os.path.isdir(os.path.join(self._model_dir(name), version)):
+            raise KeyError(f"Unknown {name} version: {version}")
+        loaded = self._load(name, version)
+
+        pointer = os.path.join(self._model_dir(name), "ACTIVE")
+        tmp_pointer = f"{pointer}.tmp.{os.getpid()}"
+        with open(tmp_pointer, 'w') as f:
+            f.write(version)
+        os.replace(tmp_pointer, pointer)
+
+        self._swap(name, loaded)
+        db_service.bump_data_version(model_data_version_key(name))
+        logger.info(f"[MODELS] Activated {name} {version}")
+        return loaded
+
+    def reload(self, name):
+        """Swaps in the ACTIVE version when it differs from the one loaded here."""
+        version = self.active_version(name)
+        current = self._active.get(name)
+        if not version or (current is not None and current.version == version):
+            return False
+        try:
+            self._swap(name, self._load(name, version))
+            logger.info(f"[MODELS] Hot-swapped {name} to {version}")
+            return True
+        except Exception as e:
+            logger.error(f"[MODELS] Could not load {name} {version}; keeping {current.version if current else 'none'}: {e}")
+            return False
+
+    def ensure_current(self, name):
+        """
+        Loads the ACTIVE version now instead of waiting for the watcher. Derived
+        views call this before computing under a freshly read `model:<name>`
+        stamp (activate() writes ACTIVE before bumping it); False when the
+        served version still differs from ACTIVE.
+        """
+        self.reload(name)
+        version = self.active_version(name)
+        current = self._active.get(name)
+        return version is None or (current is not None and current.version == version)
+
+    # ------------------------------------------------------------------
+    # Loading and swapping
+    # ------------------------------------------------------------------
+    def _load(self, name, version):
+        path = os.path.join(self._model_dir(name), version)
+        for filename in ARTIFACT_FILES:
+            artifact = os.path.join(path, filename)
+            if os.path.exists(artifact):
+                break
+        else:
+            raise FileNotFoundError(f"No model artifact in {path}")
+
+        metadata = {}
+        metadata_path = os.path.join(path, "metadata.json")
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+        model = _load_file(artifact)
+        metadata = {**getattr(model, "metadata", {}), **metadata}
+        return self._warm(LoadedModel(name, version, model, metadata, source=artifact))
+
+    def _load_legacy(self, name):
+        for path in self._specs.get(name, {}).get("legacy", []):
+            if not os.path.exists(path):
+                continue
+            try:
+                model = _load_file(path)
+                version = getattr(model, "version", None) or f"legacy-{int(os.path.getmtime(path))}"
+                # Legacy files served before the registry existed; a failing warm-up is not fatal
+                return self._warm(LoadedModel(name, version, model, getattr(model, "metadata", {}), source=path),
+                                  strict=False)
+            except Exception as e:
+                logger.error(f"[MODELS] Failed to load legacy {name} model {path}: {e}")
+        logger.warning(f"[MODELS] No model available for {name}")
+        return None
+
+    def _warm(self, loaded, strict=True):
+        """
+        Runs the registered warm-up so the first real request pays no lazy-init
+        cost. A version that cannot even score a dummy row is rejected.
+        """
+        warmup = self._specs.get(loaded.name, {}).get("warmup")
+        if warmup is not None:
+            started = time.time()
+            try:
+                warmup(loaded.model)
+            except Exception as e:
+                if strict:
+                    raise
+                logger.warning(f"[MODELS] Warm-up of {loaded.name} {loaded.version} failed: {e}")
+                return loaded
+            logger.info(f"[MODELS] Warmed {loaded.name} {loaded.version} in {time.time() - started:.3f}s")
+        return loaded
+
+    def _swap(self, name, loaded):
+        with self._lock:
+            self._active[name] = loaded
+            listeners = list(self._listeners.get(name, []))
+        for callback in listeners:
+            try:
+                callback(loaded)
+            except Exception as e:
+                logger.error(f"[MODELS] Swap listener for {name} failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Watcher
+    # ------------------------------------------------------------------
+    def _ensure_watcher(self):
+        """Starts the ACTIVE-pointer watcher once per process (threads do not survive a fork)."""
+        pid = os.getpid()
+        if self._watcher_pid == pid and self._watcher is not None and self._watcher.is_alive():
+            return
+        with self._lock:
+            if self._watcher_pid == pid and self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watcher_pid = pid
+            self._watcher = threading.Thread(target=self._watch_loop, name="model-registry-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            for name in list(self._specs):
+                try:
+                    self.reload(name)
+                except Exception as e:
+                    logger.debug(f"[MODELS] Watch check failed for {name}: {e}")
+
+    def describe(self):
+        """Loaded version per model in this worker plus the published versions."""
+        return {
+            name: {
+                "loaded": self._active[name].describe() if name in self._active else None,
+                "active": self.active_version(name),
+                "versions": self.versions(name)
+            }
+            for name in list(self._specs)
+        }
+
+
+model_registry = ModelRegistry()
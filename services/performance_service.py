@@ -2,9 +2,10 @@ from services.database_service import db_service
 import logging
 
 class PerformanceService:
-    def __init__(self):
-        self.db_connected = db_service.connect()
-        
+    @property
+    def db_connected(self):
+        return db_service.connect()
+
     def calculate_performance_tax(self, ipv4_rtt, ipv6_rtt):
         """
         Calculate translation latency overhead percentage.
@@ -0,0 +1,280 @@
+"""
+Query Monitor Service — pymongo command monitoring for the platform.
+
+Every command sent through the shared MongoClient is attributed to the Flask
+route or background job that issued it. The service keeps:
+- Per-origin latency histograms per (command, collection)
+- A queries-per-request histogram per route, so N+1 patterns stand out
+- A sampled slow-query log (slow_queries.log)
+
+Attribution uses a context variable, which pymongo's synchronous listeners
+see because `started` events fire in the calling thread.
+"""
+
+import os
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000]
+# Upper bounds of the queries-per-request histogram buckets
+QUERY_COUNT_BUCKETS = [1, 2, 5, 10, 25, 50, 100]
+
+_origin = contextvars.ContextVar("query_origin", default="background")
+_request_counter = contextvars.ContextVar("query_request_counter", default=None)
+
+
+def _bucket_index(value, bounds):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+def _bucket_labels(bounds, unit=""):
+    return [f"<={b}{unit}" for b in bounds] + [f">{bounds[-1]}{unit}"]
+
+
+def _command_shape(command_name, command):
+    """Returns the field names a command filters/pipelines on (never the values)."""
+    try:
+        if command_name == "find":
+            return {"filter": sorted(command.get("filter", {}).keys()),
+                    "sort": list(command.get("sort", {}).keys())}
+        if command_name == "aggregate":
+            return {"pipeline": [next(iter(stage)) for stage in command.get("pipeline", [])]}
+        if command_name in ("count", "countDocuments"):
+            return {"filter": sorted(command.get("query", {}).keys())}
+        if command_name in ("update", "delete"):
+            key = "updates" if command_name == "update" else "deletes"
+            ops = command.get(key, [])
+            return {"filter": sorted(ops[0].get("q", {}).keys()) if ops else [], "ops": len(ops)}
+        if command_name == "insert":
+            return {"documents": len(command.get("documents", []))}
+    except Exception:
+        pass
+    return {}
+
+
+def _documents_returned(command_name, reply):
+    """Best-effort count of documents returned or affected by a command."""
+    try:
+        cursor = reply.get("cursor")
+        if cursor is not None:
+            return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+        if "n" in reply:
+            return int(reply["n"])
+    except Exception:
+        pass
+    return 0
+
+
+class _LatencyStats:
+    __slots__ = ("count", "total_ms", "max_ms", "docs", "failures", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.docs = 0
+        self.failures = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, duration_ms, docs, failed=False):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.docs += docs
+        if failed:
+            self.failures += 1
+        self.buckets[_bucket_index(duration_ms, LATENCY_BUCKETS_MS)] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0,
+            "max_ms": round(self.max_ms, 2),
+            "total_ms": round(self.total_ms, 2),
+            "documents": self.docs,
+            "failures": self.failures,
+            "histogram": dict(zip(_bucket_labels(LATENCY_BUCKETS_MS, "ms"), self.buckets))
+        }
+
+
+class QueryMonitorService(monitoring.CommandListener):
+    """Command listener that aggregates per-origin query timings in memory."""
+
+    # Commands that are driver housekeeping rather than application queries
+    IGNORED_COMMANDS = {"ping", "hello", "isMaster", "ismaster", "saslStart", "saslContinue",
+                        "buildInfo", "endSessions", "killCursors"}
+
+    def __init__(self):
+        self.enabled = os.getenv("QUERY_MONITOR_ENABLED", "true").lower() != "false"
+        self.slow_ms = float(os.getenv("SLOW_QUERY_MS", "100"))
+        self.sample_rate = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "0.5"))
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._latency = {}          # origin -> "command:collection" -> _LatencyStats
+        self._per_request = {}      # origin -> [requests, total_queries, max_queries, buckets]
+        self._slow_count = 0
+        self._since = datetime.now().isoformat()
+
+        self._slow_log = logging.getLogger("slow_queries")
+        if not self._slow_log.handlers:
+            try:
+                handler = logging.FileHandler(os.getenv("SLOW_QUERY_LOG", "slow_queries.log"))
+                handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+                self._slow_log.addHandler(handler)
+            except Exception as e:
+                logger.warning(f"Slow-query log file unavailable: {e}")
+
+    # ------------------------------------------------------------------
+    # Origin attribution
+    # ------------------------------------------------------------------
+    def begin_request(self, origin):
+        """Marks the current context as serving `origin` (a route or job name)."""
+        _origin.set(origin)
+        _request_counter.set([0])
+
+    def end_request(self):
+        """Records the number of queries issued by the current request."""
+        counter = _request_counter.get()
+        origin = _origin.get()
+        _request_counter.set(None)
+        _origin.set("background")
+        if counter is None or not self.enabled:
+            return
+
+        queries = counter[0]
+        with self._lock:
+            entry = self._per_request.setdefault(
+                origin, [0, 0, 0, [0] * (len(QUERY_COUNT_BUCKETS) + 1)]
+            )
+            entry[0] += 1
+            entry[1] += queries
+            entry[2] = max(entry[2], queries)
+            entry[3][_bucket_index(queries, QUERY_COUNT_BUCKETS)] += 1
+
+    @contextmanager
+    def track(self, origin):
+        """Attributes every query issued inside the block to `origin` (e.g. a scheduled job)."""
+        token_origin = _origin.set(origin)
+        token_counter = _request_counter.set([0])
+        try:
+            yield
+        finally:
+            self.end_request()
+            _origin.reset(token_origin)
+            _request_counter.reset(token_counter)
+
+    # ------------------------------------------------------------------
+    # pymongo CommandListener interface
+    # ------------------------------------------------------------------
+    def started(self, event):
+        if not self.enabled or event.command_name in self.IGNORED_COMMANDS:
+            return
+
+        command = event.command
+        collection = command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = command.get("collection")
+        if not isinstance(collection, str):
+            collection = "-"
+
+        counter = _request_counter.get()
+        if counter is not None:
+            counter[0] += 1
+
+        with self._lock:
+            self._inflight[(event.request_id, event.connection_id)] = (
+                _origin.get(), collection, event.database_name,
+                _command_shape(event.command_name, command)
+            )
+
+    def succeeded(self, event):
+        self._finish(event, _documents_returned(event.command_name, event.reply), failed=False)
+
+    def failed(self, event):
+        self._finish(event, 0, failed=True)
+
+    def _finish(self, event, docs, failed):
+        if not self.enabled:
+            return
+        with self._lock:
+            info = self._inflight.pop((event.request_id, event.connection_id), None)
+            if info is None:
+                return
+            origin, collection, database, shape = info
+            duration_ms = event.duration_micros / 1000.0
+
+            key = f"{event.command_name}:{collection}"
+            stats = self._latency.setdefault(origin, {}).get(key)
+            if stats is None:
+                stats = self._latency[origin][key] = _LatencyStats()
+            stats.record(duration_ms, docs, failed)
+
+            is_slow = duration_ms >= self.slow_ms
+            if is_slow:
+                self._slow_count += 1
+
+        if is_slow and random.random() < self.sample_rate:
+            self._slow_log.warning(
+                f"{duration_ms:.1f}ms origin={origin} command={event.command_name} "
+                f"collection={database}.{collection} docs={docs} shape={shape}"
+                + (" FAILED" if failed else "")
+            )
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def get_stats(self):
+        """Snapshot of all per-origin histograms, busiest origins first."""
+        with self._lock:
+            origins = []
+            for origin in set(self._latency) | set(self._per_request):
+                commands = {k: v.to_dict() for k, v in self._latency.get(origin, {}).items()}
+                entry = {
+                    "origin": origin,
+                    "total_queries": sum(c["count"] for c in commands.values()),
+                    "total_ms": round(sum(c["total_ms"] for c in commands.values()), 2),
+                    "commands": commands
+                }
+                per_request = self._per_request.get(origin)
+                if per_request:
+                    requests, total, peak, buckets = per_request
+                    entry["requests"] = requests
+                    entry["queries_per_request"] = {
+                        "avg": round(total / requests, 2) if requests else 0,
+                        "max": peak,
+                        "histogram": dict(zip(_bucket_labels(QUERY_COUNT_BUCKETS), buckets))
+                    }
+                origins.append(entry)
+
+            origins.sort(key=lambda o: o["total_ms"], reverse=True)
+            return {
+                "since": self._since,
+                "slow_query_threshold_ms": self.slow_ms,
+                "slow_query_sample_rate": self.sample_rate,
+                "slow_queries": self._slow_count,
+                "origins": origins
+            }
+
+    def reset(self):
+        """Clears all collected statistics."""
+        with self._lock:
+            self._latency.clear()
+            self._per_request.clear()
+            self._slow_count = 0
+            self._since = datetime.now().isoformat()
+
+
+# Global singleton
+query_monitor = QueryMonitorService()
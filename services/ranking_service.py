@@ -0,0 +1,127 @@
+"""
+Ranking Service — readiness scores and rankings for the monitored sectors.
+
+All countries are scored in one vectorized pass over the latest scan per
+domain (one projected read of the flags the formula uses, np.bincount per
+country), cached until the scan collection's data version moves, and indexed
+by country so a comparison or a report reads two entries instead of
+re-scoring the region.
+
+Score formula (unchanged): IPv6 DNS 40%, IPv6 Web 40%, DNSSEC 20%.
+"""
+
+import copy
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+from services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+SCORE_FIELDS = ["domain", "country", "ipv6_dns", "ipv6_web", "dnssec"]
+WEIGHTS = {"ipv6_dns": 0.4, "ipv6_web": 0.4, "dnssec": 0.2}
+
+
+def readiness_level(score):
+    if score >= 80:
+        return "High"
+    if score >= 50:
+        return "Moderate"
+    return "Low"
+
+
+def score_countries(countries, dns, web, sec):
+    """
+    Per-country scores from parallel arrays (one entry per domain). Returns
+    the ranking rows, highest score first, without ranks.
+    """
+    codes, inverse = np.unique(np.asarray(countries, dtype=str), return_inverse=True)
+    totals = np.bincount(inverse, minlength=len(codes)).astype(np.float64)
+    counts = {
+        "ipv6_dns": np.bincount(inverse, weights=np.asarray(dns, dtype=np.float64), minlength=len(codes)),
+        "ipv6_web": np.bincount(inverse, weights=np.asarray(web, dtype=np.float64), minlength=len(codes)),
+        "dnssec": np.bincount(inverse, weights=np.asarray(sec, dtype=np.float64), minlength=len(codes)),
+    }
+    pct = {field: count / totals * 100 for field, count in counts.items()}
+    missing = {field: (totals - count) / totals * 100 for field, count in counts.items()}
+    scores = sum(pct[field] * weight for field, weight in WEIGHTS.items())
+
+    rows = []
+    for i, code in enumerate(codes):
+        rows.append({
+            "country": str(code),
+            "score": round(float(scores[i]), 1),
+            "total_domains": int(totals[i]),
+            # Failure Analysis (Percentages for UI)
+            "breakdown": {
+                "missing_dns_pct": round(float(missing["ipv6_dns"][i])),
+                "web_unreachable_pct": round(float(missing["ipv6_web"][i])),
+                "missing_dnssec_pct": round(float(missing["dnssec"][i]))
+            }
+        })
+    rows.sort(key=lambda row: (-row["score"], row["country"]))
+    return rows
+
+
+class SectorRankingEngine:
+    """Cached ranking for one monitor service (government or education scans)."""
+
+    def __init__(self, monitor_service, collection_key, with_levels=True):
+        self.monitor_service = monitor_service
+        self.collection = db_service.COLLECTION_REGISTRY[collection_key]
+        self.with_levels = with_levels
+        self._lock = threading.Lock()
+        self._version = None
+        self._ranking = None
+        self._index = {}
+
+    def _current_version(self):
+        try:
+            return db_service.data_version_token(self.collection) if db_service.connect() else None
+        except Exception:
+            return None
+
+    def _compute(self):
+        countries, dns, web, sec = [], [], [], []
+        for scan in self.monitor_service.iter_results(fields=SCORE_FIELDS):
+            if scan.get("country") is None:
+                continue
+            countries.append(scan["country"])
+            dns.append(bool(scan.get("ipv6_dns")))
+            web.append(bool(scan.get("ipv6_web")))
+            sec.append(bool(scan.get("dnssec")))
+        if not countries:
+            return None
+
+        rows = score_countries(countries, dns, web, sec)
+        for idx, row in enumerate(rows):
+            if self.with_levels:
+                row["level"] = readiness_level(row["score"])
+            row["rank"] = idx + 1
+        return {"generated_at": datetime.now().isoformat(), "ranking": rows}
+
+    def _snapshot(self):
+        """The cached ranking for the current data version, recomputed at most once per version."""
+        version = self._current_version()
+        with self._lock:
+            if version is not None and version == self._version and self._ranking is not None:
+                return self._ranking, self._index
+            ranking = self._compute()
+            index = {row["country"]: row for row in ranking["ranking"]} if ranking else {}
+            if version is not None:
+                self._version, self._ranking, self._index = version, ranking, index
+            if ranking:
+                logger.info(f"[RANKING] {self.collection}: scored {len(index)} countries")
+            return ranking, index
+
+    def ranking(self):
+        """{"generated_at", "ranking": [...]} ({} when there are no scans); callers get their own copy."""
+        ranking, _ = self._snapshot()
+        return copy.deepcopy(ranking) if ranking else {}
+
+    def country(self, country_code):
+        """Ranking row for one country, or None."""
+        _, index = self._snapshot()
+        row = index.get((country_code or "").upper())
+        return copy.deepcopy(row) if row else None
@@ -0,0 +1,230 @@
+"""
+Read Cache Service — per-worker read-through cache for slowly changing collections.
+
+Query results for the hot reference collections are held in memory per
+process and invalidated per collection:
+- Primary: a MongoDB change stream on the database (needs a replica set, which
+  Atlas always provides); rename events from swap_collection() are included.
+- Fallback: one poll per second of the `data_versions` stamps that writers bump
+  through MongoDBService.bump_data_version().
+
+A max-age bound protects against writes that bypass both mechanisms, and
+each collection keeps at most READ_CACHE_MAX_ENTRIES queries (least recently
+used first out), since filter values can come from request parameters.
+"""
+
+import os
+import copy
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Server error codes meaning "change streams are not available on this deployment"
+CHANGE_STREAM_UNSUPPORTED = {40573, 40324, 136}
+
+
+def _freeze(value):
+    """Stable, hashable representation of a filter/projection/sort."""
+    if value is None:
+        return None
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class ReadThroughCache:
+    """Caches find() results for a fixed set of collections, invalidated by change events."""
+
+    def __init__(self, db_service, collections):
+        self._db_service = db_service
+        self.collections = set(collections)
+        self.max_age = float(os.getenv("READ_CACHE_MAX_AGE", "600"))
+        self.max_entries = int(os.getenv("READ_CACHE_MAX_ENTRIES", "256"))
+        self.poll_interval = float(os.getenv("READ_CACHE_POLL_INTERVAL", "1"))
+        self.enabled = os.getenv("READ_CACHE_ENABLED", "true").lower() != "false"
+
+        self._lock = threading.Lock()
+        self._entries = {}        # collection -> OrderedDict {query key: (stored_at, docs)}, LRU order
+        self._generation = {}     # collection -> int, bumped on every invalidation
+        self._versions = {}       # collection -> last seen data_versions stamp (polling mode)
+        self._watcher = None
+        self._watcher_pid = None
+        self._stop = threading.Event()
+        self.mode = "idle"
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "watch_errors": 0}
+
+    # ------------------------------------------------------------------
+    # Read API
+    # ------------------------------------------------------------------
+    def find(self, collection, filter=None, projection=None, sort=None, limit=0, copy_result=True):
+        """
+        Cached equivalent of list(db[collection].find(...).sort(...).limit(...)).
+        Read-only callers can pass copy_result=False to skip the defensive deep copy.
+        """
+        if not self.enabled or collection not in self.collections:
+            return self._query(collection, filter, projection, sort, limit)
+
+        self._ensure_watcher()
+        key = (_freeze(filter), _freeze(projection), _freeze(sort), limit)
+        now = time.time()
+        with self._lock:
+            entries = self._entries.get(collection, {})
+            entry = entries.get(key)
+            if entry is not None and now - entry[0] < self.max_age:
+                entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return copy.deepcopy(entry[1]) if copy_result else entry[1]
+            if entry is not None:
+                del entries[key]
+            self._stats["misses"] += 1
+            generation = self._generation.get(collection, 0)
+
+        docs = self._query(collection, filter, projection, sort, limit)
+
+        with self._lock:
+            # Skip storing if the collection changed while we were reading it
+            if self._generation.get(collection, 0) == generation:
+                self._store(collection, key, now, docs)
+        return copy.deepcopy(docs) if copy_result else docs
+
+    def _store(self, collection, key, now, docs):
+        """Adds an entry, dropping expired ones and then the least recently used beyond the cap."""
+        entries = self._entries.setdefault(collection, OrderedDict())
+        entries[key] = (now, docs)
+        for stale_key in [k for k, (stored_at, _) in entries.items() if now - stored_at >= self.max_age]:
+            del entries[stale_key]
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def find_one(self, collection, filter=None, projection=None, sort=None, copy_result=True):
+        docs = self.find(collection, filter, projection, sort, limit=1, copy_result=copy_result)
+        return docs[0] if docs else None
+
+    def _query(self, collection, filter, projection, sort, limit):
+        cursor = self._db_service._db[collection].find(filter or {}, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    def invalidate(self, collection=None):
+        """Drops cached results for one collection (or all of them)."""
+        with self._lock:
+            targets = [collection] if collection else list(self.collections)
+            for name in targets:
+                self._entries.pop(name, None)
+                self._generation[name] = self._generation.get(name, 0) + 1
+            self._stats["invalidations"] += 1
+
+    def generation(self, collection):
+        """Counter bumped on every invalidation of `collection`, for keying derived caches."""
+        self._ensure_watcher()
+        with self._lock:
+            return self._generation.get(collection, 0)
+
+    def _ensure_watcher(self):
+        """Starts the invalidation thread once per process (it does not survive a fork)."""
+        pid = os.getpid()
+        if self._watcher_pid == pid and self._watcher is not None and self._watcher.is_alive():
+            return
+        with self._lock:
+            if self._watcher_pid == pid and self._watcher is not None and self._watcher.is_alive():
+                return
+            if self._watcher_pid != pid:
+                # Inherited entries may predate writes the parent never saw
+                self._entries.clear()
+                self._versions.clear()
+            self._watcher_pid = pid
+            self._stop = threading.Event()
+            self._watcher = threading.Thread(target=self._watch_loop, name="read-cache-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch_loop(self):
+        resume_token = None
+        while not self._stop.is_set():
+            try:
+                resume_token = self._watch_changes(resume_token)
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    logger.info(f"[READ CACHE] Change streams unavailable ({e.code}); polling data versions")
+                    self._poll_versions()
+                    return
+                self._on_watch_error(e)
+                resume_token = None
+            except PyMongoError as e:
+                self._on_watch_error(e)
+            except Exception as e:
+                self._on_watch_error(e)
+                resume_token = None
+
+    def _on_watch_error(self, error):
+        with self._lock:
+            self._stats["watch_errors"] += 1
+        logger.warning(f"[READ CACHE] Change stream interrupted: {error}")
+        # Events may have been missed while the stream was down
+        self.invalidate()
+        self._stop.wait(2)
+
+    def _watch_changes(self, resume_token):
+        db = self._db_service._db
+        if db is None:
+            self._stop.wait(5)
+            return resume_token
+
+        names = sorted(self.collections)
+        pipeline = [{"$match": {"$or": [{"ns.coll": {"$in": names}}, {"to.coll": {"$in": names}}]}}]
+        with db.watch(pipeline, resume_after=resume_token, max_await_time_ms=1000) as stream:
+            self.mode = "change_stream"
+            if resume_token is None:
+                # Nothing is replayed without a resume token: drop entries cached before the stream opened
+                self.invalidate()
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    continue
+                resume_token = stream.resume_token
+                if change.get("operationType") in ("invalidate", "dropDatabase"):
+                    self.invalidate()
+                    return None
+                for ns in (change.get("ns"), change.get("to")):
+                    if ns and ns.get("coll") in self.collections:
+                        self.invalidate(ns["coll"])
+        return resume_token
+
+    def _poll_versions(self):
+        self.mode = "polling"
+        while not self._stop.wait(self.poll_interval):
+            try:
+                stamps = self._db_service.get_data_versions(self.collections)
+            except Exception as e:
+                logger.debug(f"[READ CACHE] Version poll failed: {e}")
+                continue
+            for name, version in stamps.items():
+                previous = self._versions.get(name)
+                self._versions[name] = version
+                # The first poll also invalidates: writes may have landed before polling began
+                if previous != version:
+                    self.invalidate(name)
+
+    def stop(self):
+        self._stop.set()
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = {name: len(entries) for name, entries in self._entries.items()}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0
+        stats["mode"] = self.mode
+        stats["collections"] = sorted(self.collections)
+        return stats
@@ -0,0 +1,184 @@
+"""
+Scan Results Service — latest-scan-per-domain queries for the monitor APIs.
+
+Domains are keyset-paged first (on the gov_domains / edu_domains registry's
+(country, domain) / domain indexes), and the latest scans are fetched one
+batch of domains at a time with the status filter and field projection
+pushed into the query, so a page costs a page of work and a stream starts
+after its first batch:
+
+    GET /gov-monitor/api/results                          legacy {country: [scans]}
+    GET /gov-monitor/api/results?country=IN&status=ready  filtered, still grouped
+    GET /gov-monitor/api/results?limit=500&cursor=<dom>   {"data", "next_cursor"}
+    GET /gov-monitor/api/results?format=ndjson            one scan per line, streamed
+
+As before, the grouped (legacy) shape answers an unknown `country` with every
+country's results, and `fields` there only gains `country` for the grouping;
+the paged and streamed shapes filter strictly and project exactly `fields`.
+"""
+
+import re
+import json
+import logging
+from flask import Response, jsonify, request, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Aggregation cursor batch; bounds per-request memory while streaming
+STREAM_BATCH_SIZE = 500
+
+SCAN_STATUSES = ("ready", "partial", "missing", "error")
+_FIELD_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def parse_fields(raw):
+    """`fields=a,b` as a projection list (domain is always included for the cursor); None for all fields."""
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    invalid = [f for f in fields if not _FIELD_RE.match(f)]
+    if invalid:
+        raise ValueError(f"Invalid field name(s): {', '.join(invalid)}")
+    return ["domain"] + [f for f in dict.fromkeys(fields) if f != "domain"]
+
+
+def latest_scans_pipeline(domains, status=None, fields=None):
+    """Aggregation yielding the latest scan of each of `domains` (one page batch), ordered by domain."""
+    pipeline = [
+        {"$match": {"domain": {"$in": domains}}},
+        # Index order: the $group below sees each domain's newest scan first
+        {"$sort": {"domain": 1, "checked_at": -1}},
+        {"$group": {"_id": "$domain", "latest": {"$first": "$$ROOT"}}},
+        {"$replaceRoot": {"newRoot": "$latest"}},
+    ]
+    if status:
+        pipeline.append({"$match": {"status": {"$in": status}}})
+    pipeline.append({"$sort": {"domain": 1}})
+    if fields:
+        pipeline.append({"$project": {"_id": 0, **{f: 1 for f in fields}}})
+    else:
+        pipeline.append({"$project": {"_id": 0}})
+    return pipeline
+
+
+def _domain_batches(registry, collection, country=None, after=None):
+    """
+    Domain names in order, a batch at a time, keyset-paged on the registry's
+    unique domain index (one entry per domain). Before a registry exists the
+    names are grouped from the scans themselves, still after `after` only.
+    """
+    use_registry = registry.find_one({}, {"_id": 1}) is not None
+    last = after
+    while True:
+        query = {"country": country} if country else {}
+        if last:
+            query["domain"] = {"$gt": last}
+        if use_registry:
+            cursor = registry.find(query, {"_id": 0, "domain": 1}).sort("domain", 1).limit(STREAM_BATCH_SIZE)
+            batch = [doc["domain"] for doc in cursor if doc.get("domain")]
+        else:
+            batch = [doc["_id"] for doc in collection.aggregate([
+                {"$match": query}, {"$group": {"_id": "$domain"}}, {"$sort": {"_id": 1}}, {"$limit": STREAM_BATCH_SIZE}
+            ]) if doc["_id"]]
+        if not batch:
+            return
+        yield batch
+        if len(batch) < STREAM_BATCH_SIZE:
+            return
+        last = batch[-1]
+
+
+def iter_latest_scans(collection, registry, country=None, status=None, fields=None, after=None, limit=None):
+    """
+    Latest scan per domain ordered by domain. Domains are keyset-paged from the
+    domain registry (`registry`, e.g. gov_domains) and their latest scans
+    fetched one batch of domains at a time, so a page reads a page of domains
+    whatever the size of the fleet or of the scan history.
+    """
+    produced = 0
+    for batch in _domain_batches(registry, collection, country, after):
+        if limit and not status:
+            batch = batch[:limit - produced]
+        for scan in collection.aggregate(latest_scans_pipeline(batch, status, fields), batchSize=len(batch)):
+            yield scan
+            produced += 1
+            if limit and produced >= limit:
+                return
+
+
+def filter_latest_scans(scans, status=None, fields=None, after=None, limit=None):
+    """Local-store equivalent of the tail of latest_scans_pipeline() for the fallback path."""
+    scans = sorted((s for s in scans if not after or s.get("domain", "") > after),
+                   key=lambda s: s.get("domain", ""))
+    if status:
+        scans = [s for s in scans if s.get("status") in status]
+    if limit:
+        scans = scans[:limit]
+    for scan in scans:
+        scan.pop("_id", None)
+        if fields:
+            for key in [k for k in scan if k not in fields]:
+                del scan[key]
+    return scans
+
+
+def results_response(service):
+    """
+    Serves a monitor service's /api/results from its iter_results(): grouped by
+    country (legacy), a keyset page, or an NDJSON stream.
+    """
+    args = request.args
+    country = (args.get("country") or "").upper() or None
+    status = [s.strip().lower() for s in args.get("status", "").split(",") if s.strip()] or None
+    try:
+        fields = parse_fields(args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if status and any(s not in SCAN_STATUSES for s in status):
+        return jsonify({"error": f"status must be one of {', '.join(SCAN_STATUSES)}"}), 400
+    grouped = "limit" not in args and "cursor" not in args and args.get("format") != "ndjson"
+    strip_country = bool(grouped and fields and "country" not in fields)
+    if strip_country:
+        fields.append("country")   # the grouped shape needs it; removed again below
+
+    after = args.get("cursor") or None
+    limit = args.get("limit", type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if args.get("format") == "ndjson":
+        scans = service.iter_results(country=country, status=status, fields=fields, after=after, limit=limit)
+
+        def generate():
+            for scan in scans:
+                yield json.dumps(scan, default=str, separators=(",", ":")) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    if limit is not None or after:
+        limit = limit or DEFAULT_PAGE_SIZE
+        # One extra row tells whether another page exists
+        page = list(service.iter_results(country=country, status=status, fields=fields, after=after, limit=limit + 1))
+        has_more = len(page) > limit
+        page = page[:limit]
+        return jsonify({
+            "data": page,
+            "limit": limit,
+            "next_cursor": page[-1]["domain"] if has_more and page else None
+        })
+
+    results = _grouped(service.iter_results(country=country, status=status, fields=fields), strip_country)
+    if country and not results:
+        # Legacy behaviour: an unknown country gets the full result set
+        results = _grouped(service.iter_results(status=status, fields=fields), strip_country)
+    return jsonify(results)
+
+
+def _grouped(scans, strip_country=False):
+    results = {}
+    for scan in scans:
+        key = scan.pop("country", None) if strip_country else scan.get("country")
+        results.setdefault(key, []).append(scan)
+    return results
@@ -0,0 +1,226 @@
+"""
+Single-Flight Service — stampede protection for expensive computations.
+
+- DistributedLock: a lease-based mutex stored in MongoDB (`distributed_locks`),
+  so only one worker across all processes/hosts runs a rebuild at a time.
+  Leases expire on their own, so a crashed holder never blocks forever.
+- run_in_background() / refresh_in_background(): run a refresh on a daemon
+  thread, at most one per name and process (the latter also under the lock).
+- coalesce(): in-process request coalescing. Concurrent calls with the same
+  arguments share one in-flight computation, so a traffic spike costs one
+  query per distinct call instead of one per concurrent user.
+"""
+
+import os
+import copy
+import inspect
+import uuid
+import socket
+import logging
+import functools
+import threading
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+LOCKS_COLLECTION = db_service.COLLECTION_REGISTRY["DISTRIBUTED_LOCKS"]
+
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+_background = set()
+_background_guard = threading.Lock()
+_flights = {}
+_flights_guard = threading.Lock()
+_flight_stats = {}   # name -> {"calls", "coalesced", "timeouts"}
+
+
+def _local_lock(name):
+    with _local_locks_guard:
+        lock = _local_locks.get(name)
+        if lock is None:
+            lock = _local_locks[name] = threading.Lock()
+        return lock
+
+
+class DistributedLock:
+    """
+    Mongo-backed lease. Usage:
+
+        with DistributedLock("dashboard_cache_rebuild", ttl=300) as acquired:
+            if acquired:
+                rebuild()
+    """
+
+    def __init__(self, name, ttl=120):
+        self.name = name
+        self.ttl = ttl
+        # Unique per acquisition; the PID is part of it so forked children never share a lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._local = _local_lock(name)
+        self.acquired = False
+
+    def acquire(self):
+        # Threads of this process coordinate locally first (no round trip)
+        if not self._local.acquire(blocking=False):
+            return False
+        if not db_service.connect():
+            # No shared store: the in-process lock is the best we can do
+            self.acquired = True
+            return True
+
+        now = datetime.utcnow()
+        try:
+            db_service._db[LOCKS_COLLECTION].find_one_and_update(
+                {"_id": self.name, "$or": [{"expires_at": {"$lte": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "acquired_at": now,
+                          "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True
+            )
+            self.acquired = True
+        except DuplicateKeyError:
+            # Another owner holds an unexpired lease
+            self.acquired = False
+        except Exception as e:
+            logger.warning(f"[LOCK] Could not acquire {self.name}: {e}")
+            self.acquired = False
+
+        if not self.acquired:
+            self._local.release()
+        return self.acquired
+
+    def release(self):
+        if not self.acquired:
+            return
+        self.acquired = False
+        try:
+            if db_service.is_connected:
+                db_service._db[LOCKS_COLLECTION].delete_one({"_id": self.name, "owner": self.owner})
+        except Exception as e:
+            logger.warning(f"[LOCK] Could not release {self.name} (lease will expire): {e}")
+        finally:
+            self._local.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def run_single_flight(name, func, ttl=120):
+    """Runs func() only if no other worker is running `name`. Returns (ran, result)."""
+    with DistributedLock(name, ttl) as acquired:
+        if not acquired:
+            return False, None
+        return True, func()
+
+
+def run_in_background(name, func):
+    """Starts func() on a daemon thread unless a thread for `name` is already running in this process."""
+    with _background_guard:
+        if name in _background:
+            return False
+        _background.add(name)
+
+    def runner():
+        try:
+            func()
+        except Exception as e:
+            logger.error(f"[SINGLE FLIGHT] Background refresh {name} failed: {e}")
+        finally:
+            with _background_guard:
+                _background.discard(name)
+
+    threading.Thread(target=runner, name=f"refresh-{name}", daemon=True).start()
+    return True
+
+
+def refresh_in_background(name, func, ttl=120):
+    """Like run_in_background(), with func() additionally guarded by the `name` lock."""
+    return run_in_background(name, lambda: run_single_flight(name, func, ttl))
+
+
+class _Flight:
+    """One in-flight computation and the callers waiting for it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+def _count_flight(name, stat):
+    with _flights_guard:
+        stats = _flight_stats.setdefault(name, {"calls": 0, "coalesced": 0, "timeouts": 0})
+        stats[stat] += 1
+
+
+def coalescing_stats():
+    """Calls and coalesced (shared) calls per decorated function in this process."""
+    with _flights_guard:
+        return {name: dict(stats) for name, stats in _flight_stats.items()}
+
+
+def coalesce(name, key_func=None, wait_timeout=30):
+    """
+    Decorator: concurrent calls with equal arguments run `func` once and share
+    its result (or exception). Nothing is cached; the next call after the
+    flight lands computes afresh. By default the key is the bound arguments,
+    excluding `self`, so per-request service instances still coalesce;
+    `key_func(*args, **kwargs)` overrides it. Callers that joined a flight, and
+    the caller that ran it, each get their own copy of a shared result. A
+    waiter that outlives `wait_timeout` computes on its own.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        params = list(signature.parameters)
+        skip_self = bool(params) and params[0] == "self"
+
+        def make_key(args, kwargs):
+            if key_func is not None:
+                return (name, key_func(*args, **kwargs))
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            items = list(bound.arguments.items())[1 if skip_self else 0:]
+            return (name, repr(items))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            with _flights_guard:
+                flight = _flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = _flights[key] = _Flight()
+                else:
+                    flight.waiters += 1
+            _count_flight(name, "calls")
+
+            if not leader:
+                if not flight.done.wait(wait_timeout):
+                    _count_flight(name, "timeouts")
+                    logger.warning(f"[SINGLE FLIGHT] Timed out waiting for {name}; computing locally")
+                    return func(*args, **kwargs)
+                _count_flight(name, "coalesced")
+                if flight.error is not None:
+                    raise flight.error
+                return copy.deepcopy(flight.result)
+
+            try:
+                flight.result = func(*args, **kwargs)
+            except Exception as e:
+                flight.error = e
+                raise
+            finally:
+                with _flights_guard:
+                    _flights.pop(key, None)
+                    shared = flight.waiters > 0
+                flight.done.set()
+            # The stored result stays pristine for the waiters copying it
+            return copy.deepcopy(flight.result) if shared else flight.result
+        return wrapper
+    return decorator
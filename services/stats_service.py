@@ -6,6 +6,8 @@ import time
 from datetime import datetime
 from services.database_service import db_service
 from services.inference_service import inference_service
+from services.ai_adoption_service import ai_adoption_service
+from services.single_flight_service import run_in_background, coalesce
 
 class StatsService:
     CACHE_DIR = '.cache'
@@ -121,12 +123,18 @@ class StatsService:
         """Calculates population-weighted regional aggregate for APAC."""
         if not db_service.connect():
             return None
+
+        # Materialized with the per-country AI stats (see ai_adoption_service)
+        regional = ai_adoption_service.get('APAC')
+        if regional:
+            return regional
+        run_in_background("apac_ai_build", ai_adoption_service.refresh)
             
         try:
             from services.external_data_service import external_data_service
             all_benchmarks = external_data_service.get_benchmarks('ALL')
             
-            cursor = db_service.apac_stats.find()
+            cursor = db_service.cached_find(db_service.COLLECTION_REGISTRY["APAC_STATS"], copy_result=False)
             
             total_pop = 0
             weighted_ai = 0
@@ -134,14 +142,17 @@ class StatsService:
             # Source accumulators
             source_totals = {"APNIC": 0, "Google": 0, "Cloudflare": 0, "Pulse": 0}
             source_counts = {"APNIC": 0, "Google": 0, "Cloudflare": 0, "Pulse": 0}
+
+            # AI Inference (one batched prediction for all countries)
+            predictions = inference_service.predict_batch(
+                [r["country_code"] for r in cursor], [r["ipv6_adoption"] for r in cursor]
+            )
             
             for record in cursor:
                 cc = record["country_code"]
                 raw_adoption = record["ipv6_adoption"]
                 pop = self.POPULATIONS.get(cc, 1)
-                
-                # AI Inference
-                ai_data = inference_service.get_optimized_adoption(cc, raw_adoption)
+                ai_data = predictions[cc]
                 
                 weighted_ai += (ai_data * pop)
                 total_pop += pop
@@ -187,10 +198,15 @@ class StatsService:
         if location_code == 'APAC':
             return self.get_regional_aggregate_stats()
 
-        # 1. Try MongoDB
+        # 1. Try MongoDB: materialized AI stats first, live inference until the view is built
         if db_service.connect():
             try:
-                record = db_service.apac_stats.find_one({"country_code": location_code})
+                materialized = ai_adoption_service.get(location_code)
+                if materialized:
+                    return materialized
+
+                record = db_service.cached_find_one(db_service.COLLECTION_REGISTRY["APAC_STATS"],
+                                                    {"country_code": location_code}, copy_result=False)
                 if record:
                     raw_adoption = record.get("ipv6_adoption", 0)
                     ai_data = inference_service.get_optimized_adoption(location_code, raw_adoption, include_metrics=True)
@@ -251,23 +267,32 @@ class StatsService:
             logging.error(f"Error reading normalized stats: {e}")
             return None
 
+    @coalesce("all_apac_ipv6_stats")
     def get_all_apac_ipv6_stats(self):
         """
         Returns the full normalized IPv6 stats dataset for all APAC countries from MongoDB
         with automatic JSON fallback. Used for map coloring.
         """
-        # 1. Try MongoDB
+        # 1. Try MongoDB: materialized AI stats first, live inference until the view is built
         if db_service.connect():
             try:
-                cursor = db_service.apac_stats.find()
+                materialized = ai_adoption_service.get_all()
+                if materialized:
+                    return materialized
+                run_in_background("apac_ai_build", ai_adoption_service.refresh)
+
+                cursor = db_service.cached_find(db_service.COLLECTION_REGISTRY["APAC_STATS"], copy_result=False)
                 results = {}
                 from services.external_data_service import external_data_service
                 all_benchmarks = external_data_service.get_benchmarks('ALL')
+                predictions = inference_service.predict_batch(
+                    [r["country_code"] for r in cursor], [r["ipv6_adoption"] for r in cursor], include_metrics=True
+                )
                 
                 for record in cursor:
                     c_code = record["country_code"]
                     raw_adoption = record["ipv6_adoption"]
-                    ai_data = inference_service.get_optimized_adoption(c_code, raw_adoption, include_metrics=True)
+                    ai_data = predictions[c_code]
                     results[c_code] = {
                         "country": c_code,
                         "ipv6_adoption": ai_data["prediction"],
@@ -297,10 +322,13 @@ class StatsService:
             stats_dict = data.get('stats', {})
             from services.external_data_service import external_data_service
             all_benchmarks = external_data_service.get_benchmarks('ALL')
+            predictions = inference_service.predict_batch(
+                list(stats_dict), [c.get("ipv6_adoption", 0) for c in stats_dict.values()], include_metrics=True
+            )
             
             for c_code, c_data in stats_dict.items():
                 raw_adoption = c_data.get("ipv6_adoption", 0)
-                ai_data = inference_service.get_optimized_adoption(c_code, raw_adoption, include_metrics=True)
+                ai_data = predictions[c_code]
                 stats_dict[c_code]["ipv6_adoption"] = ai_data["prediction"]
                 stats_dict[c_code]["ai_confidence"] = ai_data["confidence"]
                 stats_dict[c_code]["ai_explanation"] = ai_data["explanation"]
@@ -29,13 +29,13 @@ async function initDashboardMap() {
     }).setView([18, 115], 4);
 
     try {
-        const [resGeo, resStats] = await Promise.all([
-            fetch('/lab/api/map/countries.geo.json'),
-            fetch('/lab/api/apac/all_stats')
-        ]);
+        // Single pre-compressed payload: simplified GeoJSON + stats (revalidated via ETag)
+        const resPayload = await fetch('/lab/api/map/payload.json');
+        if (!resPayload.ok) throw new Error(`HTTP ${resPayload.status}`);
+        const payload = await resPayload.json();
 
-        const geoData = await resGeo.json();
-        const statsData = await resStats.json();
+        const geoData = payload.geo;
+        const statsData = payload.stats;
 
         dashboardDataCache = statsData;
 
@@ -6,6 +6,8 @@ let isVerifying = false;
 let benchmarkChart = null;
 let totalISPPages = 1;
 let totalISPRecords = 0;
+// next_cursor per page number, so Next/Previous are keyset seeks on the server
+let ispPageCursors = {};
 let searchDebounceTimer = null;
 let currentSearchQuery = '';
 
@@ -112,10 +114,14 @@ async function loadCountryData() {
 
     try {
         // Build URL with server-side pagination params
+        if (currentISPPage === 1) ispPageCursors = {};
         let url = `/api/asn?country=${currentCountry}&filter=${currentFilter}&page=${currentISPPage}&per_page=${ISP_PER_PAGE}`;
         if (currentSearchQuery) {
             url += `&search=${encodeURIComponent(currentSearchQuery)}`;
         }
+        if (ispPageCursors[currentISPPage]) {
+            url += `&cursor=${encodeURIComponent(ispPageCursors[currentISPPage])}`;
+        }
 
         const response = await fetch(url);
         if (!response.ok) throw new Error(`API Error: ${response.status}`);
@@ -127,6 +133,7 @@ async function loadCountryData() {
         totalISPRecords = result.total || 0;
         totalISPPages = result.total_pages || 1;
         currentISPPage = result.page || 1;
+        if (result.next_cursor) ispPageCursors[currentISPPage + 1] = result.next_cursor;
 
         console.log(`Loaded page ${currentISPPage}/${totalISPPages} (${pageData.length} of ${totalISPRecords} ASNs) for ${currentCountry}`);
 
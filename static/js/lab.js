@@ -106,14 +106,13 @@ async function initMap() {
     // Fetch GeoJSON (using a simplified Asia/World dataset)
     // We will use a reliable public source for country shapes
     try {
-        // Parallel Fetch: GeoJSON + Stats
-        const [resGeo, resStats] = await Promise.all([
-            fetch('/lab/api/map/countries.geo.json'),
-            fetch('/lab/api/apac/all_stats')
-        ]);
-
-        const geoData = await resGeo.json();
-        const statsData = await resStats.json();
+        // Single pre-compressed payload: simplified GeoJSON + stats (revalidated via ETag)
+        const resPayload = await fetch('/lab/api/map/payload.json');
+        if (!resPayload.ok) throw new Error(`HTTP ${resPayload.status}`);
+        const payload = await resPayload.json();
+
+        const geoData = payload.geo;
+        const statsData = payload.stats;
 
         // Cache stats globally for styling
         apacDataCache = statsData; // e.g. { "IN": { ipv6_adoption: 60.5 }, ... }